@@ -1,10 +1,34 @@
+import atexit
 import os
+import weakref
 from flask import Flask
 from flask_login import LoginManager
 from flask_migrate import Migrate
-from app.models import db, Usuario
+from app.models import db
 from config import config
 
+# Apps do processo com últimos acessos a descarregar na saída (referência
+# fraca: um app descartado, como os dos testes, não fica vivo por isso)
+_apps = weakref.WeakSet()
+
+
+def _descarregar_acessos(app, forcar=False):
+    from app.services.auth_service import AuthService
+    try:
+        AuthService.descarregar_acessos(forcar=forcar)
+    except Exception:
+        app.logger.warning('Falha ao gravar os últimos acessos', exc_info=True)
+
+
+@atexit.register
+def _descarregar_acessos_na_saida():
+    for app in list(_apps):
+        if app.config.get('TESTING'):
+            continue  # banco temporário, possivelmente já apagado
+        with app.app_context():
+            _descarregar_acessos(app, forcar=True)
+
+
 def create_app():
     app = Flask(__name__)
 
@@ -28,10 +52,16 @@ def create_app():
 
     @login_manager.user_loader
     def load_user(user_id):
-        return Usuario.query.get(int(user_id))
+        from app.services.auth_service import AuthService
+        return AuthService.carregar_identidade(int(user_id))
+
+    # Últimos acessos em buffer: descarrega ao fim das requisições quando o
+    # lote vence, e o que sobrar quando o processo termina
+    app.teardown_request(lambda exc: _descarregar_acessos(app))
+    _apps.add(app)
 
     # Registrar blueprints
-    from app.blueprints import main_bp, produtos_bp, movimentos_bp, caixa_bp, relatorios_bp
+    from app.blueprints import main_bp, produtos_bp, movimentos_bp, caixa_bp, relatorios_bp, eventos_bp
     from app.blueprints.auth import auth_bp
 
     app.register_blueprint(auth_bp)
@@ -40,9 +70,23 @@ def create_app():
     app.register_blueprint(movimentos_bp)
     app.register_blueprint(caixa_bp)
     app.register_blueprint(relatorios_bp)
+    app.register_blueprint(eventos_bp)
+
+    # Comandos do `flask` CLI
+    from app.commands import register_commands
+    register_commands(app)
 
     # Criar tabelas e usuários padrão
     with app.app_context():
+        # Perfil de produção do SQLite (WAL, busy_timeout etc.), antes da primeira conexão
+        from app.utils.sqlite import aplicar_pragmas
+        aplicar_pragmas(db.engine, app.config.get('SQLITE_PRAGMAS'))
+
+        # Consultas e tempo de banco por requisição (Server-Timing e orçamentos)
+        if app.config.get('SQL_INSTRUMENTACAO', True):
+            from app.utils.instrumentacao import instrumentar
+            instrumentar(app, db.engine)
+
         db.create_all()
 
         # Criar usuários padrão se não existirem
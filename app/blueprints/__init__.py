@@ -3,5 +3,6 @@ from .produtos import produtos_bp
 from .movimentos import movimentos_bp
 from .caixa import caixa_bp
 from .relatorios import relatorios_bp
+from .eventos import eventos_bp
 
-__all__ = ['main_bp', 'produtos_bp', 'movimentos_bp', 'caixa_bp', 'relatorios_bp']
+__all__ = ['main_bp', 'produtos_bp', 'movimentos_bp', 'caixa_bp', 'relatorios_bp', 'eventos_bp']
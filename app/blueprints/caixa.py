@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required
-from app.models import db, Produto, Movimento
-from app.services import CaixaService, ProdutoService, MovimentoService
+from app.models import db, Produto
+from app.services import CaixaService, ProdutoService
 
 caixa_bp = Blueprint('caixa', __name__, url_prefix='/caixa')
 
@@ -83,33 +83,13 @@ def finalizar():
             flash('Abra o caixa antes de vender!', 'danger')
             return redirect(url_for('caixa.index'))
 
-        total_venda = 0
-        for p_id, qtd_venda in zip(produto_ids, quantidades):
-            produto = Produto.query.get(p_id)
-            if not produto: continue
-            
-            # ATUALIZAÇÃO CRÍTICA: Lê o estoque real do PostgreSQL agora
-            db.session.refresh(produto)
-            qtd_venda = int(qtd_venda)
-
-            if produto.qtd < qtd_venda:
-                db.session.rollback()
-                flash(f'Estoque insuficiente para {produto.nome} (Disponível: {produto.qtd})', 'danger')
-                return redirect(url_for('caixa.index'))
-
-            # Baixa no estoque real
-            produto.qtd -= qtd_venda
-            total_venda += (produto.valor_venda * qtd_venda)
-            
-            # Registra no histórico de movimentação
-            MovimentoService.registrar_saida(produto.id, qtd_venda, f"Venda PDV - Caixa #{caixa.id}")
-
-        # Registra no financeiro do caixa
-        CaixaService.registrar_venda(caixa.id, total_venda, forma_pagamento)
-        
-        db.session.commit()
+        # Baixa de estoque, movimentos e financeiro numa única transação
+        itens = list(zip(produto_ids, quantidades))
+        total_venda = CaixaService.finalizar_venda(caixa.id, itens, forma_pagamento)
         flash(f'Venda de R$ {total_venda:.2f} finalizada com sucesso!', 'success')
-        
+
+    except ValueError as e:
+        flash(str(e), 'danger')
     except Exception as e:
         db.session.rollback()
         flash(f'Erro técnico ao finalizar: {str(e)}', 'danger')
@@ -139,6 +119,6 @@ def fechar():
 @caixa_bp.route('/historico')
 @login_required
 def historico():
-    # Agora puxa os dados do Movimento conforme corrigido anteriormente
-    historico_caixa = CaixaService.listar_historico_fechamentos() 
-    return render_template('caixa/historico.html', historico=historico_caixa)
\ No newline at end of file
+    # Agora puxa os dados do Movimento conforme corrigido anteriormente (paginado por cursor)
+    historico_caixa, proximo_cursor = CaixaService.listar_historico_fechamentos(cursor=request.args.get('cursor'))
+    return render_template('caixa/historico.html', historico=historico_caixa, proximo_cursor=proximo_cursor)
\ No newline at end of file
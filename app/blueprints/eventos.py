@@ -0,0 +1,46 @@
+import json
+import queue
+import time
+from flask import Blueprint, Response, current_app, stream_with_context
+from flask_login import login_required
+from app.services import EventoService
+
+eventos_bp = Blueprint('eventos', __name__)
+
+
+def _formatar(tipo, dados):
+    return f"event: {tipo}\ndata: {json.dumps(dados, default=str)}\n\n"
+
+
+@eventos_bp.route('/eventos')
+@login_required
+def stream():
+    """
+    Server-Sent Events com as mudanças de estoque e caixa. A conexão ocupa
+    uma thread do worker enquanto está aberta, por isso é encerrada depois de
+    EVENTOS_DURACAO_MAXIMA segundos; o EventSource do navegador reconecta sozinho.
+    """
+    heartbeat = current_app.config.get('EVENTOS_HEARTBEAT', 15)
+    duracao = current_app.config.get('EVENTOS_DURACAO_MAXIMA', 300)
+    fila = EventoService.assinar()
+
+    def gerar():
+        fim = time.monotonic() + duracao
+        try:
+            # Tempo de reconexão e um primeiro evento para o cliente saber que está ligado
+            yield f"retry: 3000\n{_formatar('conectado', {})}"
+            while time.monotonic() < fim:
+                try:
+                    evento = fila.get(timeout=min(heartbeat, max(fim - time.monotonic(), 0.1)))
+                except queue.Empty:
+                    yield ": ping\n\n"  # mantém proxies e o navegador com a conexão aberta
+                    continue
+                yield _formatar(evento['tipo'], evento['dados'])
+        finally:
+            EventoService.cancelar(fila)
+
+    return Response(
+        stream_with_context(gerar()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -1,12 +1,12 @@
 from flask import Blueprint, render_template
 from flask_login import login_required
-from app.services import RelatorioService, ProdutoService
+from app.services import DashboardService
 
 main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/')
 @login_required
 def index():
-    dashboard = RelatorioService.dashboard()
-    produtos = ProdutoService.listar_produtos()
-    return render_template('dashboard.html', dashboard=dashboard, produtos=produtos)
+    # Snapshot em memória, recalculado em segundo plano (ver DashboardService)
+    dashboard = DashboardService.obter()
+    return render_template('dashboard.html', dashboard=dashboard)
@@ -1,59 +1,108 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required
 from datetime import datetime
-from app.models import db  # Importante para o db.session.commit()
+from app.models import db  # rollback em caso de erro inesperado
 from app.services import MovimentoService, ProdutoService, CaixaService
 
 # 1. DEFINIÇÃO DO BLUEPRINT
 movimentos_bp = Blueprint('movimentos', __name__, url_prefix='/movimentos')
 
+# Paginação por cursor (keyset) da listagem
+POR_PAGINA = 50
+LIMITE_MAXIMO = 500
+
+def _filtros_listagem():
+    """Lê os filtros comuns da listagem (HTML e JSON) a partir da query string."""
+    data_inicio_str = request.args.get('data_inicio')
+    data_fim_str = request.args.get('data_fim')
+
+    return {
+        'produto_id': request.args.get('produto_id', type=int),
+        'tipo': request.args.get('tipo') or None,
+        'data_inicio': datetime.fromisoformat(data_inicio_str) if data_inicio_str else None,
+        'data_fim': datetime.fromisoformat(data_fim_str) if data_fim_str else None,
+        'cursor': request.args.get('cursor'),
+        'limite': max(1, min(request.args.get('limite', POR_PAGINA, type=int), LIMITE_MAXIMO)),
+    }
+
 @movimentos_bp.route('/')
 @login_required
 def listar():
-    data_inicio_str = request.args.get('data_inicio')
-    data_fim_str = request.args.get('data_fim')
-    produto_id = request.args.get('produto_id')
-    tipo = request.args.get('tipo')
+    movimentos, proximo_cursor = MovimentoService.paginar_movimentos(**_filtros_listagem())
 
-    data_inicio = datetime.fromisoformat(data_inicio_str) if data_inicio_str else None
-    data_fim = datetime.fromisoformat(data_fim_str) if data_fim_str else None
+    # Mantém os filtros atuais no link da próxima página
+    filtros = request.args.to_dict()
+    filtros.pop('cursor', None)
 
-    movimentos = MovimentoService.listar_movimentos(
-        produto_id=produto_id,
-        tipo=tipo,
-        data_inicio=data_inicio,
-        data_fim=data_fim
+    produtos = ProdutoService.listar_produtos()
+    return render_template(
+        'movimentos/lista.html',
+        movimentos=movimentos,
+        produtos=produtos,
+        proximo_cursor=proximo_cursor,
+        filtros=filtros
     )
 
-    produtos = ProdutoService.listar_produtos()
-    return render_template('movimentos/lista.html', movimentos=movimentos, produtos=produtos)
+@movimentos_bp.route('/api')
+@login_required
+def listar_json():
+    movimentos, proximo_cursor = MovimentoService.paginar_movimentos(**_filtros_listagem())
+    return jsonify({
+        'movimentos': [m.to_dict() for m in movimentos],
+        'proximo_cursor': proximo_cursor
+    })
+
+def _mensagem_erro(resultado):
+    """Primeira mensagem de erro de um lote recusado, para o flash."""
+    erros = resultado.erros
+    return erros[0].mensagem if erros else 'Lote não aplicado'
+
+@movimentos_bp.route('/lote', methods=['POST'])
+@login_required
+def lote():
+    """
+    Entradas ou saídas em lote (recebimento de mercadoria, inventário).
+    JSON: {"tipo": "entrada"|"saida", "motivo": ..., "observacao": ..., "forma_pagamento": ...,
+           "linhas": [{"produto_id": 1, "quantidade": 10, "valor_unitario": 2.5}, ...]}
+    Aplica tudo numa transação; 422 com o status de cada linha se alguma falhar.
+    """
+    dados = request.get_json(silent=True) or {}
+    linhas = dados.get('linhas')
+    if not isinstance(linhas, list) or not linhas:
+        return jsonify({'erro': 'Informe as linhas do lote'}), 400
+
+    # Normalizado aqui como em registrar_lote: " SAIDA " também é venda e vai para o caixa
+    tipo = str(dados.get('tipo') or 'entrada').strip().lower()
+    caixa = CaixaService.obter_caixa_aberto() if tipo == 'saida' else None
+    try:
+        resultado = MovimentoService.registrar_lote(
+            tipo, linhas,
+            motivo=dados.get('motivo'),
+            observacao=dados.get('observacao'),
+            caixa_id=caixa.id if caixa else None,
+            forma_pagamento=dados.get('forma_pagamento')
+        )
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+
+    return jsonify(resultado.to_dict()), 200 if resultado.aplicado else 422
 
 @movimentos_bp.route('/entrada', methods=['GET', 'POST'])
 @login_required
 def entrada():
     if request.method == 'POST':
         try:
-            produto_id = int(request.form.get('produto_id'))
-            quantidade = int(request.form.get('quantidade'))
-            observacao = request.form.get('observacao', 'Entrada manual')
-            
-            # Tratamento do Valor Unitário
-            valor_raw = request.form.get('valor_unitario')
-            if valor_raw and valor_raw.strip():
-                valor_unitario = float(valor_raw.replace(',', '.'))
-            else:
-                produto = ProdutoService.obter_produto(produto_id)
-                valor_unitario = produto.valor_custo if produto.valor_custo else 0.0
-
-            # Chama o serviço (que agora não dá commit sozinho)
-            MovimentoService.registrar_entrada(produto_id, quantidade, valor_unitario, observacao)
-            
-            # Único ponto de salvamento no banco de dados
-            db.session.commit()
-            
-            flash('Entrada manual registrada com sucesso!', 'success')
-            return redirect(url_for('movimentos.listar'))
-            
+            resultado = MovimentoService.registrar_lote('entrada', [(
+                request.form.get('produto_id'),
+                request.form.get('quantidade'),
+                request.form.get('valor_unitario')
+            )], motivo='Entrada manual', observacao=request.form.get('observacao') or None)
+
+            if resultado.aplicado:
+                flash('Entrada manual registrada com sucesso!', 'success')
+                return redirect(url_for('movimentos.listar'))
+            flash(f'Erro ao registrar entrada: {_mensagem_erro(resultado)}', 'error')
+
         except Exception as e:
             db.session.rollback()
             flash(f'Erro ao registrar entrada: {str(e)}', 'error')
@@ -66,44 +115,24 @@ def entrada():
 def saida():
     if request.method == 'POST':
         try:
-            produto_id = int(request.form.get('produto_id'))
-            quantidade = int(request.form.get('quantidade'))
-            observacao = request.form.get('observacao', 'Saída manual')
-            forma_pagamento = request.form.get('forma_pagamento')
-            
-            valor_raw = request.form.get('valor_unitario')
-            if valor_raw and valor_raw.strip():
-                valor_unitario = float(valor_raw.replace(',', '.'))
-            else:
-                produto = ProdutoService.obter_produto(produto_id)
-                valor_unitario = produto.valor_venda if produto.valor_venda else 0.0
-
-            # Registra o histórico de movimento
-            movimento = MovimentoService.registrar_saida(produto_id, quantidade, valor_unitario, observacao)
-
-            # Lógica Financeira do Caixa
+            # Lógica Financeira do Caixa: com caixa aberto, a saída entra como venda
             caixa = CaixaService.obter_caixa_aberto()
-            if caixa:
-                # O valor total do movimento gerado
-                valor_total = movimento.quantidade * movimento.valor_unitario
-                produto_obj = ProdutoService.obter_produto(produto_id)
-                
-                CaixaService.registrar_movimento(
-                    caixa_id=caixa.id,
-                    tipo='entrada', # Dinheiro entrando no caixa pela venda
-                    categoria='venda',
-                    descricao=f'Saída manual: {produto_obj.nome} (x{quantidade})',
-                    valor=valor_total,
-                    forma_pagamento=forma_pagamento
-                )
-
-            db.session.commit()
-            flash('Saída registrada com sucesso!', 'success')
-            return redirect(url_for('movimentos.listar'))
-            
+            resultado = MovimentoService.registrar_lote('saida', [(
+                request.form.get('produto_id'),
+                request.form.get('quantidade'),
+                request.form.get('valor_unitario')
+            )], motivo='Saída manual', observacao=request.form.get('observacao') or None,
+                caixa_id=caixa.id if caixa else None,
+                forma_pagamento=request.form.get('forma_pagamento'))
+
+            if resultado.aplicado:
+                flash('Saída registrada com sucesso!', 'success')
+                return redirect(url_for('movimentos.listar'))
+            flash(f'Erro ao registrar saída: {_mensagem_erro(resultado)}', 'error')
+
         except Exception as e:
             db.session.rollback()
             flash(f'Erro ao registrar saída: {str(e)}', 'error')
 
     produtos = ProdutoService.listar_produtos()
-    return render_template('movimentos/saida.html', produtos=produtos)
\ No newline at end of file
+    return render_template('movimentos/saida.html', produtos=produtos)
@@ -1,7 +1,8 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+import io
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required
-from app.services import ProdutoService, MovimentoService
-from app.models import Produto
+from app.services import ProdutoService, MovimentoService, ImportacaoService
+from app.utils import gerente_required
 
 produtos_bp = Blueprint('produtos', __name__, url_prefix='/produtos')
 
@@ -24,8 +25,7 @@ def estoque_baixo():
 def search():
     query = request.args.get('q', '')
     if query:
-        # Busca direta no model para agilidade, mas o ideal seria via Service
-        produtos = Produto.query.filter(Produto.nome.ilike(f'%{query}%')).limit(10).all()
+        produtos = ProdutoService.buscar_produtos(query, limite=10)
     else:
         produtos = ProdutoService.listar_produtos()[:10]
     return render_template('produtos/_table_rows.html', produtos=produtos)
@@ -77,6 +77,26 @@ def editar(id):
 
     return render_template('produtos/form.html', produto=produto)
 
+@produtos_bp.route('/importar', methods=['GET', 'POST'])
+@gerente_required
+def importar():
+    """ Importação de produtos em massa por CSV (lido em streaming, gravado em lotes) """
+    resultado = None
+    if request.method == 'POST':
+        arquivo = request.files.get('arquivo')
+        if not arquivo or not arquivo.filename:
+            flash('Selecione um arquivo CSV.', 'warning')
+            return render_template('produtos/importar.html', resultado=None)
+
+        try:
+            texto = io.TextIOWrapper(arquivo.stream, encoding='utf-8-sig', newline='')
+            resultado = ImportacaoService.importar_produtos(texto)
+            flash(f'{resultado.inseridos} produto(s) inserido(s) e {resultado.atualizados} atualizado(s).', 'success')
+        except (ValueError, UnicodeDecodeError) as e:
+            flash(f'Erro na importação: {str(e)}', 'danger')
+
+    return render_template('produtos/importar.html', resultado=resultado)
+
 
 ## --- OPERAÇÕES DE ESTOQUE E EXCLUSÃO ---
 
@@ -85,28 +105,32 @@ def editar(id):
 def update_qtd(id):
     """ Rota otimizada para requisições HTMX de reposição rápida """
     try:
-        val = request.form.get('qtd_adicional')
-        if not val or int(val) <= 0:
-            return 'Quantidade inválida', 400
-            
-        quantidade = int(val)
-
-        # 1. Atualiza estoque no banco
-        if ProdutoService.atualizar_estoque(id, quantidade):
-            # 2. Registra o movimento para histórico/auditoria
-            MovimentoService.registrar_entrada(
-                produto_id=id, 
-                quantidade=quantidade, 
-                motivo="Reposição via painel de produto"
-            )
-            return '', 204 # Sucesso silencioso para HTMX
-            
-        return 'Erro ao atualizar banco', 500
-        
+        qtd = int(request.form.get('qtd_adicional') or 0)
     except ValueError:
-        return 'Insira um número inteiro', 400
-    except Exception as e:
-        return f'Erro: {str(e)}', 500
+        return jsonify({'erro': 'Insira um número inteiro'}), 400
+    if qtd <= 0:
+        return jsonify({'erro': 'Quantidade inválida'}), 400
+
+    try:
+        # Saldo e movimento de auditoria na mesma transação
+        resultado = MovimentoService.registrar_lote(
+            'entrada', [(id, qtd)], motivo="Reposição via painel de produto"
+        )
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+
+    if resultado.aplicado:
+        return '', 204 # Sucesso silencioso para HTMX
+
+    # 404 só para produto inexistente; saldo insuficiente é conflito com o estado atual
+    mensagem = resultado.erros[0].mensagem
+    if mensagem == 'Produto não encontrado':
+        status = 404
+    elif mensagem.startswith('Estoque insuficiente'):
+        status = 409
+    else:
+        status = 400
+    return jsonify({'erro': mensagem}), status
 
 @produtos_bp.route('/<int:id>/excluir', methods=['POST'])
 @login_required
@@ -1,10 +1,55 @@
-from flask import Blueprint, render_template, request
+from flask import Blueprint, render_template, request, abort, jsonify, send_file, url_for, Response, stream_with_context
 from flask_login import login_required
-from datetime import datetime
-from app.services import RelatorioService
+from datetime import datetime, time
+from markupsafe import escape
+from app.services import RelatorioService, ExportacaoService, TarefaService
+from app.services.exportacao_service import COLUNAS_MOVIMENTO, COLUNAS_MOVIMENTO_CAIXA
+from app.utils.datas import agora_utc
 
 relatorios_bp = Blueprint('relatorios', __name__, url_prefix='/relatorios')
 
+# Linhas por página no detalhamento dos relatórios (os totais cobrem o período inteiro)
+POR_PAGINA = 50
+
+def _datas_personalizadas():
+    data_inicio_str = request.args.get('data_inicio')
+    data_fim_str = request.args.get('data_fim')
+
+    data_inicio = datetime.fromisoformat(data_inicio_str) if data_inicio_str else None
+    data_fim = datetime.fromisoformat(data_fim_str) if data_fim_str else None
+    return data_inicio, data_fim
+
+def _intervalo_exportacao():
+    """Mesmo período de /relatorios/movimentos: 'periodo' pré-definido ou datas livres."""
+    periodo = request.args.get('periodo', 'dia')
+    if periodo in ('dia', 'semana', 'mes'):
+        return RelatorioService.intervalo_periodo(periodo)
+
+    data_inicio, data_fim = _datas_personalizadas()
+    if not data_inicio:
+        data_inicio = agora_utc().replace(hour=0, minute=0, second=0, microsecond=0)
+    if not data_fim:
+        data_fim = agora_utc()
+    return data_inicio, data_fim
+
+def _resposta_exportacao(nome, linhas, colunas, formato):
+    if formato not in ExportacaoService.FORMATOS:
+        abort(404)
+
+    pedacos = ExportacaoService.serializar(linhas, colunas, formato)
+    nome_arquivo = f"{nome}.{formato}"
+    mimetype = ExportacaoService.FORMATOS[formato]
+    if request.args.get('gzip', type=int):
+        pedacos = ExportacaoService.comprimir(pedacos)
+        nome_arquivo += '.gz'
+        mimetype = 'application/gzip'
+
+    return Response(
+        stream_with_context(pedacos),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{nome_arquivo}"'}
+    )
+
 @relatorios_bp.route('/')
 @login_required
 def index():
@@ -13,28 +58,28 @@ def index():
 @relatorios_bp.route('/estoque')
 @login_required
 def estoque():
-    relatorio = RelatorioService.relatorio_estoque()
+    pagina = request.args.get('pagina', 1, type=int)
+    try:
+        relatorio = RelatorioService.relatorio_estoque(pagina, POR_PAGINA, request.args.get('ordem', 'valor'))
+    except ValueError:
+        abort(400)
     return render_template('relatorios/estoque.html', relatorio=relatorio)
 
 @relatorios_bp.route('/movimentos')
 @login_required
 def movimentos():
     periodo = request.args.get('periodo', 'dia')
+    pagina = request.args.get('pagina', 1, type=int)
 
     if periodo == 'dia':
-        relatorio = RelatorioService.relatorio_diario()
+        relatorio = RelatorioService.relatorio_diario(pagina, POR_PAGINA)
     elif periodo == 'semana':
-        relatorio = RelatorioService.relatorio_semanal()
+        relatorio = RelatorioService.relatorio_semanal(pagina, POR_PAGINA)
     elif periodo == 'mes':
-        relatorio = RelatorioService.relatorio_mensal()
+        relatorio = RelatorioService.relatorio_mensal(pagina, POR_PAGINA)
     else:
-        data_inicio_str = request.args.get('data_inicio')
-        data_fim_str = request.args.get('data_fim')
-
-        data_inicio = datetime.fromisoformat(data_inicio_str) if data_inicio_str else None
-        data_fim = datetime.fromisoformat(data_fim_str) if data_fim_str else None
-
-        relatorio = RelatorioService.relatorio_movimentos(data_inicio, data_fim)
+        data_inicio, data_fim = _datas_personalizadas()
+        relatorio = RelatorioService.relatorio_movimentos(data_inicio, data_fim, pagina, POR_PAGINA)
 
     return render_template('relatorios/movimentos.html', relatorio=relatorio, periodo=periodo)
 
@@ -54,3 +99,77 @@ def caixa():
         relatorio = RelatorioService.relatorio_caixa()
 
     return render_template('relatorios/caixa.html', relatorio=relatorio)
+
+
+@relatorios_bp.route('/exportar/movimentos.<formato>')
+@login_required
+def exportar_movimentos(formato):
+    data_inicio, data_fim = _intervalo_exportacao()
+    linhas = ExportacaoService.linhas_movimentos(data_inicio, data_fim)
+    nome = f"movimentos_{data_inicio:%Y%m%d}_{data_fim:%Y%m%d}"
+    return _resposta_exportacao(nome, linhas, COLUNAS_MOVIMENTO, formato)
+
+@relatorios_bp.route('/exportar/caixa.<formato>')
+@login_required
+def exportar_caixa(formato):
+    data_inicio, data_fim = _intervalo_exportacao()
+    linhas = ExportacaoService.linhas_movimentos_caixa(data_inicio, data_fim, request.args.get('caixa_id', type=int))
+    nome = f"caixa_{data_inicio:%Y%m%d}_{data_fim:%Y%m%d}"
+    return _resposta_exportacao(nome, linhas, COLUNAS_MOVIMENTO_CAIXA, formato)
+
+
+def _data_formulario(valor, fim=False):
+    """Aceita data (AAAA-MM-DD, o dia inteiro) ou data e hora ISO."""
+    data = datetime.fromisoformat(valor)
+    if fim and len(valor) == 10:
+        data = datetime.combine(data.date(), time.max)
+    return data
+
+def _resposta_tarefa(tarefa, status=200):
+    if request.headers.get('HX-Request'):
+        return render_template('relatorios/_tarefa.html', tarefa=tarefa), status
+    resposta = jsonify(tarefa)
+    resposta.status_code = status
+    resposta.headers['Location'] = url_for('relatorios.tarefa', tarefa_id=tarefa['id'])
+    return resposta
+
+@relatorios_bp.route('/tarefas', methods=['POST'])
+@login_required
+def criar_tarefa():
+    """Agenda o relatório em segundo plano; pedidos iguais recebem a mesma tarefa."""
+    dados = request.get_json(silent=True) or request.form
+    try:
+        tarefa = TarefaService.solicitar(
+            dados.get('tipo', 'movimentos'),
+            dados.get('formato', 'csv'),
+            _data_formulario(dados.get('data_inicio', '')),
+            _data_formulario(dados.get('data_fim', ''), fim=True)
+        )
+    except ValueError as e:
+        if request.headers.get('HX-Request'):
+            # O htmx não troca o conteúdo em respostas 4xx
+            return f'<div class="alert alert-danger">{escape(str(e))}</div>'
+        return jsonify({'erro': str(e)}), 400
+    return _resposta_tarefa(tarefa, 202)
+
+@relatorios_bp.route('/tarefas/<tarefa_id>')
+@login_required
+def tarefa(tarefa_id):
+    tarefa = TarefaService.obter(tarefa_id)
+    if not tarefa:
+        abort(404)
+    return _resposta_tarefa(tarefa)
+
+@relatorios_bp.route('/tarefas/<tarefa_id>/download')
+@login_required
+def baixar_tarefa(tarefa_id):
+    caminho, tarefa = TarefaService.arquivo_resultado(tarefa_id)
+    if not caminho:
+        abort(404)
+    inicio = datetime.fromisoformat(tarefa['parametros']['data_inicio'])
+    fim = datetime.fromisoformat(tarefa['parametros']['data_fim'])
+    return send_file(
+        caminho,
+        as_attachment=True,
+        download_name=f"{tarefa['tipo']}_{inicio:%Y%m%d}_{fim:%Y%m%d}.{tarefa['formato']}"
+    )
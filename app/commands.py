@@ -0,0 +1,62 @@
+from datetime import date
+import click
+from app.services import CaixaService, ResumoService, ImportacaoService, DadosSinteticosService
+
+
+def register_commands(app):
+    """Registra os comandos de manutenção no `flask` CLI."""
+
+    @app.cli.command('recalcular-caixa')
+    @click.option('--caixa-id', type=int, default=None, help='Recalcula apenas este caixa.')
+    def recalcular_caixa(caixa_id):
+        """Reconstrói os totais de entradas/saídas dos caixas a partir dos movimentos."""
+        atualizados = CaixaService.recalcular_totais(caixa_id)
+        click.echo(f"✓ Totais recalculados para {atualizados} caixa(s)")
+
+    @app.cli.command('reconstruir-resumo')
+    @click.option('--desde', default=None, help='Primeiro dia (AAAA-MM-DD). Padrão: todo o histórico.')
+    @click.option('--ate', default=None, help='Último dia (AAAA-MM-DD).')
+    def reconstruir_resumo(desde, ate):
+        """Reconstrói a projeção movimento_resumo_diario a partir da tabela movimento."""
+        dia_inicio = date.fromisoformat(desde) if desde else None
+        dia_fim = date.fromisoformat(ate) if ate else None
+        linhas = ResumoService.reconstruir(dia_inicio, dia_fim)
+        click.echo(f"✓ Resumo diário reconstruído ({linhas} linha(s))")
+
+    @app.cli.command('importar-produtos')
+    @click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--lote', type=int, default=1000, show_default=True, help='Linhas por transação.')
+    def importar_produtos(arquivo, lote):
+        """Importa (ou atualiza pelo nome) produtos de um CSV."""
+        with open(arquivo, encoding='utf-8-sig', newline='') as f:
+            resultado = ImportacaoService.importar_produtos(f, lote=lote)
+        click.echo(f"✓ {resultado.inseridos} produto(s) inserido(s), {resultado.atualizados} atualizado(s)")
+        if resultado.ignorados:
+            click.echo(f"✗ {resultado.ignorados} linha(s) ignorada(s):")
+            for numero, mensagem in resultado.erros:
+                click.echo(f"  linha {numero}: {mensagem}")
+
+    @app.cli.command('seed')
+    @click.option('--semente', type=int, default=42, show_default=True, help='Mesma semente, mesmos dados.')
+    @click.option('--dias', type=int, default=365, show_default=True, help='Dias de histórico.')
+    @click.option('--ate', default=None, help='Último dia (AAAA-MM-DD). Padrão: ontem.')
+    @click.option('--produtos', type=int, default=2000, show_default=True)
+    @click.option('--vendas-por-dia', type=int, default=300, show_default=True, help='Média de cupons por dia.')
+    @click.option('--terminais', type=int, default=3, show_default=True, help='Caixas abertos por dia.')
+    @click.option('--lote', type=int, default=50000, show_default=True, help='Linhas por INSERT.')
+    @click.option('--limpar', is_flag=True, help='Apaga produtos, movimentos e caixas existentes antes de gerar.')
+    def seed(semente, dias, ate, produtos, vendas_por_dia, terminais, lote, limpar):
+        """Gera um histórico sintético da loja (produtos, vendas, reposições e caixas)."""
+        if DadosSinteticosService.possui_dados():
+            if not limpar:
+                raise click.ClickException('O banco já tem produtos, movimentos ou caixas; use --limpar para substituí-los.')
+            DadosSinteticosService.limpar()
+        resultado = DadosSinteticosService.gerar(
+            semente=semente, dias=dias, ate=date.fromisoformat(ate) if ate else None, produtos=produtos,
+            vendas_por_dia=vendas_por_dia, terminais=terminais, lote=lote,
+        )
+        linhas = resultado.produtos + resultado.caixas + resultado.movimentos + resultado.movimentos_caixa
+        click.echo(f"✓ {resultado.produtos} produto(s), {resultado.caixas} caixa(s), "
+                   f"{resultado.movimentos} movimento(s), {resultado.movimentos_caixa} lançamento(s) de caixa")
+        click.echo(f"✓ {linhas} linha(s) em {resultado.segundos:.1f}s ({linhas / max(resultado.segundos, 1e-9):,.0f}/s), "
+                   f"assinatura {resultado.assinatura}")
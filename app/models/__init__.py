@@ -3,8 +3,9 @@ from flask_sqlalchemy import SQLAlchemy
 db = SQLAlchemy()
 
 from .produto import Produto
-from .movimento import Movimento
+from .movimento import Movimento, MovimentoResumoDiario
 from .caixa import Caixa, MovimentoCaixa
 from .usuario import Usuario
+from .busca import criar_indice_busca
 
-__all__ = ['db', 'Produto', 'Movimento', 'Caixa', 'MovimentoCaixa', 'Usuario']
+__all__ = ['db', 'Produto', 'Movimento', 'MovimentoResumoDiario', 'Caixa', 'MovimentoCaixa', 'Usuario', 'criar_indice_busca']
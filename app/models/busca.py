@@ -0,0 +1,45 @@
+from sqlalchemy import event
+from .produto import Produto
+
+# Índice de busca por nome dos produtos ativos.
+# SQLite: tabela FTS5 com remoção de acentos e índices de prefixo de 1 a 3 letras
+# (a busca roda a cada tecla), mantida por triggers em produto.
+# PostgreSQL: índice GIN parcial sobre to_tsvector('simple', f_unaccent(nome)).
+# Os triggers/índice acompanham qualquer INSERT/UPDATE/DELETE, inclusive em lote.
+DDL_BUSCA = {
+    'sqlite': [
+        "DROP TABLE IF EXISTS produto_busca",
+        "CREATE VIRTUAL TABLE produto_busca USING fts5(nome, tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3')",
+        """CREATE TRIGGER IF NOT EXISTS produto_busca_ai AFTER INSERT ON produto WHEN new.ativo BEGIN
+            INSERT INTO produto_busca(rowid, nome) VALUES (new.id, new.nome);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS produto_busca_au AFTER UPDATE OF nome, ativo ON produto BEGIN
+            DELETE FROM produto_busca WHERE rowid = old.id;
+            INSERT INTO produto_busca(rowid, nome) SELECT new.id, new.nome WHERE new.ativo;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS produto_busca_ad AFTER DELETE ON produto BEGIN
+            DELETE FROM produto_busca WHERE rowid = old.id;
+        END""",
+        "INSERT INTO produto_busca(rowid, nome) SELECT id, nome FROM produto WHERE ativo",
+    ],
+    'postgresql': [
+        "CREATE EXTENSION IF NOT EXISTS unaccent",
+        # unaccent() não é IMMUTABLE; o wrapper permite usá-lo no índice
+        """CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+            LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+            AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$""",
+        """CREATE INDEX IF NOT EXISTS ix_produto_busca ON produto
+            USING gin (to_tsvector('simple'::regconfig, f_unaccent(nome))) WHERE ativo""",
+    ],
+}
+
+
+def criar_indice_busca(connection):
+    """Cria (ou recria) o índice de busca para o banco da conexão."""
+    for sql in DDL_BUSCA.get(connection.dialect.name, []):
+        connection.exec_driver_sql(sql)
+
+
+@event.listens_for(Produto.__table__, 'after_create')
+def _criar_apos_tabela(target, connection, **kw):
+    criar_indice_busca(connection)
@@ -3,6 +3,10 @@ from . import db
 
 class Caixa(db.Model):
     __tablename__ = 'caixa'
+    __table_args__ = (
+        # Parcial no PostgreSQL (só caixas abertos); índice simples nos demais bancos
+        db.Index('ix_caixa_status_aberto', 'status', postgresql_where=db.text("status = 'aberto'")),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     data_abertura = db.Column(db.DateTime, default=datetime.utcnow)
@@ -14,20 +18,24 @@ class Caixa(db.Model):
     observacao_abertura = db.Column(db.String(200))
     usuario_abertura_id = db.Column(db.Integer, db.ForeignKey('usuario.id'))
 
+    # Totais mantidos incrementalmente por CaixaService.registrar_movimento
+    # (reconstruíveis com `flask recalcular-caixa`)
+    soma_entradas = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    soma_saidas = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+
     movimentos = db.relationship('MovimentoCaixa', backref='caixa', lazy=True, cascade='all, delete-orphan')
 
     @property
     def total_entradas(self):
-        # Calcula a soma em tempo real. Não precisa de setter!
-        return sum(m.valor for m in self.movimentos if m.tipo == 'entrada')
+        return self.soma_entradas or 0.0
 
     @property
     def total_saidas(self):
-        return sum(m.valor for m in self.movimentos if m.tipo == 'saida')
+        return self.soma_saidas or 0.0
 
     @property
     def saldo_calculado(self):
-        return self.saldo_inicial + self.total_entradas - self.total_saidas
+        return (self.saldo_inicial or 0.0) + self.total_entradas - self.total_saidas
     
     @property
     def saldo_atual(self):
@@ -56,6 +64,10 @@ class Caixa(db.Model):
 
 class MovimentoCaixa(db.Model):
     __tablename__ = 'movimento_caixa'
+    __table_args__ = (
+        db.Index('ix_movimento_caixa_caixa_data', 'caixa_id', 'data'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     caixa_id = db.Column(db.Integer, db.ForeignKey('caixa.id'), nullable=False)
     tipo = db.Column(db.String(10), nullable=False)
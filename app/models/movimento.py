@@ -3,6 +3,11 @@ from . import db
 
 class Movimento(db.Model):
     __tablename__ = 'movimento'
+    __table_args__ = (
+        db.Index('ix_movimento_data', 'data'),
+        db.Index('ix_movimento_produto_data', 'produto_id', 'data'),
+        db.Index('ix_movimento_tipo_data', 'tipo', 'data'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     produto_id = db.Column(db.Integer, db.ForeignKey('produto.id'), nullable=False)
@@ -32,3 +37,18 @@ class Movimento(db.Model):
             'data': self.data.isoformat() if self.data else None,
             'observacao': self.observacao
         }
+
+
+class MovimentoResumoDiario(db.Model):
+    """Projeção diária dos movimentos por produto e tipo, mantida na escrita pelo ResumoService."""
+    __tablename__ = 'movimento_resumo_diario'
+
+    dia = db.Column(db.Date, primary_key=True)
+    produto_id = db.Column(db.Integer, db.ForeignKey('produto.id'), primary_key=True)
+    tipo = db.Column(db.String(10), primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    valor_total = db.Column(db.Float, nullable=False, default=0.0)
+    registros = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<MovimentoResumoDiario {self.dia} {self.produto_id} {self.tipo}>'
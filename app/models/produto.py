@@ -1,7 +1,14 @@
+from sqlalchemy import Float, and_, case, cast, func, literal_column
+from sqlalchemy.ext.hybrid import hybrid_property
 from . import db
 
 class Produto(db.Model):
     __tablename__ = 'produto'
+    __table_args__ = (
+        db.Index('ix_produto_ativo_nome', 'ativo', 'nome'),
+        # Parcial no PostgreSQL (só ativos); índice simples nos demais bancos
+        db.Index('ix_produto_nome_ativos', 'nome', postgresql_where=db.text('ativo')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
@@ -26,11 +33,21 @@ class Produto(db.Model):
             return ((self.valor_venda - self.valor_compra) / self.valor_compra) * 100
         return 0.0
 
-    @property
+    @hybrid_property
     def estoque_baixo(self):
         """Retorna True se o estoque estiver igual ou abaixo do mínimo"""
         return (self.qtd or 0) <= (self.estoque_minimo or 0)
 
+    @estoque_baixo.expression
+    def estoque_baixo(cls):
+        # Mesma regra no SQL: saldo ou mínimo nulos contam como zero
+        return func.coalesce(cls.qtd, 0) <= func.coalesce(cls.estoque_minimo, 0)
+
+    @classmethod
+    def filtro_estoque_baixo(cls):
+        """Predicado único de 'estoque baixo' dos relatórios: produto ativo no mínimo ou abaixo dele."""
+        return and_(cls.ativo == True, cls.estoque_baixo)
+
     # --- COMPATIBILIDADE (GETTER/SETTER) ---
 
     @property
@@ -58,4 +75,26 @@ class Produto(db.Model):
             'estoque_baixo': self.estoque_baixo,
             'margem_lucro': self.margem_lucro,
             'ativo': self.ativo
-        }
\ No newline at end of file
+        }
+
+
+# --- ORDENAÇÕES DO RELATÓRIO DE ESTOQUE ---
+# Cada chave tem um índice de expressão (ativo, expressão, id), então a página
+# ordenada sai do índice sem ordenar o catálogo. Constantes como literal_column
+# para o SQL da consulta ser idêntico ao do índice (parâmetros não casam).
+ORDENACOES_ESTOQUE = {
+    'valor': Produto.qtd * Produto.valor_compra,
+    'margem': case(
+        (Produto.valor_compra > literal_column('0'),
+         (Produto.valor_venda - Produto.valor_compra) * literal_column('100.0') / Produto.valor_compra),
+        else_=literal_column('0.0')
+    ),
+    # Quantas vezes o estoque mínimo cabem no saldo atual
+    'cobertura': case(
+        (Produto.estoque_minimo > literal_column('0'), cast(Produto.qtd, Float) / Produto.estoque_minimo),
+        else_=cast(Produto.qtd, Float)
+    ),
+}
+
+for _chave, _expressao in ORDENACOES_ESTOQUE.items():
+    db.Index(f'ix_produto_{_chave}', Produto.ativo, _expressao, Produto.id)
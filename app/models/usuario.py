@@ -1,5 +1,7 @@
 from datetime import datetime
+from functools import lru_cache
 from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app, has_app_context
 from flask_login import UserMixin
 from . import db
 
@@ -19,12 +21,33 @@ class Usuario(UserMixin, db.Model):
     def __repr__(self):
         return f'<Usuario {self.username}>'
 
+    @staticmethod
+    def metodo_hash():
+        """Método de hash de senha do ambiente (config SENHA_HASH_METODO)."""
+        if has_app_context():
+            return current_app.config.get('SENHA_HASH_METODO', 'scrypt:32768:8:1')
+        return 'scrypt:32768:8:1'
+
     def set_senha(self, senha):
-        self.senha_hash = generate_password_hash(senha)
+        self.senha_hash = generate_password_hash(senha, method=self.metodo_hash())
 
     def verificar_senha(self, senha):
         return check_password_hash(self.senha_hash, senha)
 
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def prefixo_hash(metodo):
+        """
+        Prefixo que o werkzeug grava para o método, com os parâmetros
+        expandidos ('scrypt' vira 'scrypt:32768:8:1'). Calculado uma vez por
+        método e processo, com o hash de um valor qualquer.
+        """
+        return generate_password_hash('', method=metodo).split('$', 1)[0]
+
+    def precisa_rehash(self):
+        """True se o hash guardado usa parâmetros diferentes dos configurados."""
+        return self.senha_hash.split('$', 1)[0] != self.prefixo_hash(self.metodo_hash())
+
     @property
     def is_admin(self):
         return self.tipo == 'admin'
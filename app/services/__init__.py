@@ -1,7 +1,15 @@
+from .catalogo_service import CatalogoService
 from .produto_service import ProdutoService
 from .movimento_service import MovimentoService
 from .caixa_service import CaixaService
 from .relatorio_service import RelatorioService
 from .auth_service import AuthService
+from .resumo_service import ResumoService
+from .exportacao_service import ExportacaoService
+from .importacao_service import ImportacaoService
+from .dashboard_service import DashboardService
+from .eventos_service import EventoService
+from .tarefa_service import TarefaService
+from .dados_sinteticos_service import DadosSinteticosService
 
-__all__ = ['ProdutoService', 'MovimentoService', 'CaixaService', 'RelatorioService', 'AuthService']
+__all__ = ['ProdutoService', 'MovimentoService', 'CaixaService', 'RelatorioService', 'AuthService', 'ResumoService', 'ExportacaoService', 'CatalogoService', 'ImportacaoService', 'DashboardService', 'EventoService', 'TarefaService', 'DadosSinteticosService']
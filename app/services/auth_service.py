@@ -1,7 +1,120 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import bindparam, update
+from werkzeug.security import check_password_hash
 from app.models import db
 from app.models.usuario import Usuario
 
+# Pool dos hashes de senha, criado sob demanda em cada processo (depois do fork)
+_executor_hash = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+class BufferAcessos:
+    """
+    Últimos acessos ainda não gravados, por id de usuário (write-behind).
+    Vários logins do mesmo usuário entre duas descargas viram um UPDATE só.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pendentes = {}
+        self.desde = None
+
+    def registrar(self, user_id, momento):
+        with self.lock:
+            if not self.pendentes:
+                self.desde = time.monotonic()
+            self.pendentes[user_id] = momento
+
+    def vencido(self, lote, intervalo):
+        # Leitura sem lock: no pior caso a descarga fica para a próxima requisição
+        return bool(self.pendentes) and (
+            len(self.pendentes) >= lote or time.monotonic() - self.desde >= intervalo
+        )
+
+    def retirar(self):
+        with self.lock:
+            pendentes, self.pendentes, self.desde = self.pendentes, {}, None
+        return pendentes
+
+    def devolver(self, pendentes):
+        """Recoloca um lote que não pôde ser gravado, sem apagar acessos mais novos."""
+        with self.lock:
+            if not self.pendentes:
+                self.desde = time.monotonic()
+            for user_id, momento in pendentes.items():
+                self.pendentes[user_id] = max(momento, self.pendentes.get(user_id, momento))
+
+
+@dataclass(frozen=True)
+class UsuarioIdentidade(UserMixin):
+    """
+    Cópia imutável do usuário logado, usada como current_user.
+    Não guarda o hash da senha; verificar_senha consulta o banco.
+    """
+    id: int
+    username: str
+    nome_completo: str
+    email: str
+    tipo: str
+    ativo: bool
+    data_criacao: datetime = None
+    ultimo_acesso: datetime = None
+
+    @classmethod
+    def de_usuario(cls, usuario):
+        return cls(
+            id=usuario.id,
+            username=usuario.username,
+            nome_completo=usuario.nome_completo,
+            email=usuario.email,
+            tipo=usuario.tipo,
+            ativo=bool(usuario.ativo),
+            data_criacao=usuario.data_criacao,
+            ultimo_acesso=AuthService.ultimo_acesso(usuario)
+        )
+
+    @property
+    def is_active(self):
+        return self.ativo
+
+    @property
+    def is_admin(self):
+        return self.tipo == 'admin'
+
+    @property
+    def is_gerente(self):
+        return self.tipo in ['admin', 'gerente']
+
+    @property
+    def is_operador(self):
+        return self.tipo == 'operador'
+
+    def verificar_senha(self, senha):
+        usuario = db.session.get(Usuario, self.id)
+        return bool(usuario and usuario.verificar_senha(senha))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'username': self.username,
+            'nome_completo': self.nome_completo,
+            'email': self.email,
+            'tipo': self.tipo,
+            'ativo': self.ativo,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None,
+            'ultimo_acesso': self.ultimo_acesso.isoformat() if self.ultimo_acesso else None
+        }
+
+
 class AuthService:
     @staticmethod
     def criar_usuario(username, senha, nome_completo, email, tipo='operador'):
@@ -25,15 +138,120 @@ class AuthService:
 
     @staticmethod
     def autenticar(username, senha):
+        """
+        Confere a senha no pool de hash e registra o acesso no buffer (sem
+        commit). Se o hash guardado não usa o SENHA_HASH_METODO atual, a senha
+        é refeita com os parâmetros novos, aproveitando que está em mãos.
+        """
         usuario = Usuario.query.filter_by(username=username, ativo=True).first()
 
-        if usuario and usuario.verificar_senha(senha):
-            usuario.ultimo_acesso = datetime.utcnow()
-            db.session.commit()
+        if usuario and AuthService._verificar_hash(usuario.senha_hash, senha):
+            if usuario.precisa_rehash():
+                usuario.set_senha(senha)
+                db.session.commit()
+
+            AuthService._buffer_acessos().registrar(usuario.id, datetime.utcnow())
+            AuthService.invalidar_identidade(usuario.id)
             return usuario
 
         return None
 
+    @staticmethod
+    def _verificar_hash(senha_hash, senha):
+        """
+        check_password_hash em um pool limitado a SENHA_HASH_THREADS por
+        processo: scrypt/pbkdf2 liberam o GIL, então as demais threads do
+        worker seguem atendendo, e uma rajada de logins não ocupa todos os
+        núcleos.
+        """
+        global _executor_hash, _executor_pid
+
+        if _executor_pid != os.getpid():
+            with _executor_lock:
+                if _executor_pid != os.getpid():
+                    _executor_hash = ThreadPoolExecutor(
+                        max_workers=current_app.config.get('SENHA_HASH_THREADS', 2),
+                        thread_name_prefix='senha-hash'
+                    )
+                    _executor_pid = os.getpid()
+
+        return _executor_hash.submit(check_password_hash, senha_hash, senha).result()
+
+    @staticmethod
+    def _buffer_acessos():
+        return current_app.extensions.setdefault('acessos', BufferAcessos())
+
+    @staticmethod
+    def ultimo_acesso(usuario):
+        """ultimo_acesso do usuário, considerando o que ainda está no buffer."""
+        pendente = AuthService._buffer_acessos().pendentes.get(usuario.id)
+        return pendente or usuario.ultimo_acesso
+
+    @staticmethod
+    def descarregar_acessos(forcar=False):
+        """
+        Grava os últimos acessos pendentes num único UPDATE em lote, fora da
+        sessão da requisição. Sem forcar, só grava se o buffer atingiu
+        ULTIMO_ACESSO_LOTE usuários ou ULTIMO_ACESSO_INTERVALO segundos.
+        Retorna quantos usuários foram atualizados.
+        """
+        buffer = AuthService._buffer_acessos()
+        if not forcar and not buffer.vencido(
+            current_app.config.get('ULTIMO_ACESSO_LOTE', 50),
+            current_app.config.get('ULTIMO_ACESSO_INTERVALO', 30)
+        ):
+            return 0
+
+        pendentes = buffer.retirar()
+        if not pendentes:
+            return 0
+
+        instrucao = (
+            update(Usuario.__table__)
+            .where(Usuario.__table__.c.id == bindparam('b_id'))
+            .values(ultimo_acesso=bindparam('b_ultimo_acesso'))
+        )
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(instrucao, [
+                    {'b_id': user_id, 'b_ultimo_acesso': momento}
+                    for user_id, momento in pendentes.items()
+                ])
+        except Exception:
+            buffer.devolver(pendentes)
+            raise
+        return len(pendentes)
+
+    @staticmethod
+    def carregar_identidade(user_id):
+        """
+        user_loader do Flask-Login. Mantém por USUARIO_CACHE_TTL segundos uma
+        UsuarioIdentidade por id, então a maioria das requisições não consulta
+        a tabela usuario. Usuários inativos não são carregados: um usuário
+        desativado perde o acesso em no máximo um TTL nos demais workers
+        (no worker que desativou, na hora).
+        """
+        cache = current_app.extensions.setdefault('usuarios', {})
+        agora = time.monotonic()
+
+        entrada = cache.get(user_id)
+        if entrada and entrada[0] > agora:
+            return entrada[1]
+
+        usuario = db.session.get(Usuario, user_id)
+        identidade = UsuarioIdentidade.de_usuario(usuario) if usuario and usuario.ativo else None
+        cache[user_id] = (agora + current_app.config.get('USUARIO_CACHE_TTL', 60), identidade)
+        return identidade
+
+    @staticmethod
+    def invalidar_identidade(user_id=None):
+        """Remove um usuário (ou todos) do cache de identidades deste worker."""
+        cache = current_app.extensions.setdefault('usuarios', {})
+        if user_id is None:
+            cache.clear()
+        else:
+            cache.pop(user_id, None)
+
     @staticmethod
     def listar_usuarios():
         return Usuario.query.all()
@@ -59,6 +277,7 @@ class AuthService:
                 setattr(usuario, key, value)
 
         db.session.commit()
+        AuthService.invalidar_identidade(usuario.id)
         return usuario
 
     @staticmethod
@@ -67,6 +286,7 @@ class AuthService:
         if usuario:
             usuario.ativo = False
             db.session.commit()
+            AuthService.invalidar_identidade(usuario.id)
             return True
         return False
 
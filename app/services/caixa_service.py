@@ -1,8 +1,54 @@
 from datetime import datetime
-from app.models import db, Caixa, MovimentoCaixa, Movimento
+from types import SimpleNamespace
+from typing import NamedTuple
+from sqlalchemy import case, func, insert, select, update
+from app.models import db, Caixa, MovimentoCaixa, Movimento, Produto
+from app.services.resumo_service import ResumoService
+from app.services.catalogo_service import CatalogoService
+from app.services.eventos_service import EventoService
+from app.utils.sqlite import repetir_se_ocupado
+from app.utils.datas import agora_utc
+
+
+class LancamentoLinha(NamedTuple):
+    """Lançamento de caixa (movimento_caixa) lido por projeção de colunas, sem entidade no identity map."""
+    id: int
+    caixa_id: int
+    tipo: str
+    categoria: str
+    descricao: str
+    valor: float
+    data: datetime
+    forma_pagamento: str
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'caixa_id': self.caixa_id,
+            'tipo': self.tipo,
+            'categoria': self.categoria,
+            'descricao': self.descricao,
+            'valor': self.valor,
+            'data': self.data.isoformat() if self.data else None,
+            'forma_pagamento': self.forma_pagamento
+        }
+
 
 class CaixaService:
     @staticmethod
+    def selecionar_lancamentos():
+        """SELECT das colunas de LancamentoLinha; o chamador filtra e ordena."""
+        return select(
+            MovimentoCaixa.id, MovimentoCaixa.caixa_id, MovimentoCaixa.tipo, MovimentoCaixa.categoria,
+            MovimentoCaixa.descricao, MovimentoCaixa.valor, MovimentoCaixa.data, MovimentoCaixa.forma_pagamento
+        )
+
+    @staticmethod
+    def ler_lancamentos(stmt):
+        return [LancamentoLinha(*linha) for linha in db.session.execute(stmt)]
+
+    @staticmethod
+    @repetir_se_ocupado
     def abrir_caixa(saldo_inicial=0.0, observacao_abertura=None):
         """Abre um novo turno de caixa se não houver um aberto."""
         caixa_aberto = CaixaService.obter_caixa_aberto()
@@ -14,7 +60,7 @@ class CaixaService:
             saldo_inicial=float(saldo_inicial),
             status='aberto',
             observacao_abertura=observacao_abertura,
-            data_abertura=datetime.utcnow()
+            data_abertura=agora_utc()
         )
         db.session.add(caixa)
         db.session.commit()
@@ -32,6 +78,88 @@ class CaixaService:
             forma_pagamento=forma_pagamento
         )
 
+    @staticmethod
+    @repetir_se_ocupado
+    def finalizar_venda(caixa_id, itens, forma_pagamento):
+        """
+        Fecha a venda do PDV numa única transação e retorna o total.
+        'itens' é uma lista de (produto_id, quantidade). Os produtos são lidos
+        num único IN e as baixas são um único UPDATE com CASE condicionado a
+        qtd >= n, então dois terminais vendendo o mesmo item não deixam o
+        estoque negativo, e o número de consultas não cresce com o carrinho.
+        """
+        quantidades = {}
+        for produto_id, quantidade in itens:
+            qtd_int = int(quantidade)
+            if qtd_int <= 0:
+                raise ValueError("A quantidade deve ser maior que zero")
+            quantidades[int(produto_id)] = quantidades.get(int(produto_id), 0) + qtd_int
+
+        if not quantidades:
+            raise ValueError("Nenhum produto válido no carrinho")
+
+        produtos = {p.id: p for p in Produto.query.filter(Produto.id.in_(quantidades)).all()}
+        # Como no registrar_lote: item desconhecido ou inativo recusa a venda inteira
+        for produto_id in sorted(quantidades):
+            if produto_id not in produtos:
+                raise ValueError(f"Produto não encontrado: #{produto_id}")
+            if not produtos[produto_id].ativo:
+                raise ValueError(f"Produto inativo: {produtos[produto_id].nome}")
+        agora = agora_utc()
+
+        try:
+            delta = case(quantidades, value=Produto.id)
+            resultado = db.session.execute(
+                update(Produto)
+                .where(Produto.id.in_(quantidades), Produto.qtd >= delta)
+                .values(qtd=Produto.qtd - delta)
+                .execution_options(synchronize_session=False)
+            )
+            if resultado.rowcount != len(quantidades):
+                saldos = dict(db.session.execute(
+                    select(Produto.id, Produto.qtd).where(Produto.id.in_(quantidades))
+                ).all())
+                produto_id = min((p for p, n in quantidades.items() if (saldos.get(p) or 0) < n), default=None)
+                if produto_id is None:
+                    # Uma entrada concorrente repôs o item entre o UPDATE e a leitura
+                    raise ValueError("Estoque alterado durante a venda, tente novamente")
+                raise ValueError(
+                    f"Estoque insuficiente para {produtos[produto_id].nome} (Disponível: {saldos.get(produto_id) or 0})"
+                )
+
+            linhas = []
+            total_venda = 0.0
+            for produto_id in sorted(produtos):
+                produto = produtos[produto_id]
+                qtd_venda = quantidades[produto_id]
+
+                valor_unitario = float(produto.valor_venda or 0)
+                total_venda += valor_unitario * qtd_venda
+                linhas.append({
+                    'produto_id': produto_id,
+                    'tipo': 'saida',
+                    'quantidade': qtd_venda,
+                    'valor_unitario': valor_unitario,
+                    'motivo': f"Venda PDV - Caixa #{caixa_id}",
+                    'data': agora
+                })
+
+            db.session.execute(insert(Movimento.__table__), linhas)
+            CatalogoService.marcar_alterado()
+            ResumoService.acumular([SimpleNamespace(**linha) for linha in linhas])
+            CaixaService.registrar_venda(caixa_id, total_venda, forma_pagamento)
+            # Os objetos ainda têm a qtd de antes das baixas (synchronize_session=False)
+            EventoService.agendar_estoque('saida', [
+                (p.id, p.nome, p.qtd, p.qtd - quantidades[p.id], p.estoque_minimo)
+                for p in (produtos[linha['produto_id']] for linha in linhas)
+            ], total_venda)
+
+            db.session.commit()
+            return total_venda
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
     @staticmethod
     def registrar_movimento(caixa_id, tipo, categoria, descricao, valor, forma_pagamento=None):
         """Registra qualquer entrada ou saída financeira no caixa aberto."""
@@ -46,14 +174,33 @@ class CaixaService:
             descricao=descricao,
             valor=float(valor),
             forma_pagamento=forma_pagamento,
-            data=datetime.utcnow()
+            data=agora_utc()
         )
         
         db.session.add(movimento)
+
+        # Atualiza o total persistido na mesma transação. O incremento é feito
+        # no próprio UPDATE para não perder somas entre workers concorrentes.
+        coluna = Caixa.soma_entradas if tipo == 'entrada' else Caixa.soma_saidas
+        Caixa.query.filter(Caixa.id == caixa_id).update(
+            {coluna: func.coalesce(coluna, 0) + movimento.valor},
+            synchronize_session='fetch'
+        )
+        EventoService.agendar(
+            'caixa',
+            caixa_id=caixa.id,
+            tipo=tipo,
+            categoria=categoria,
+            valor=movimento.valor,
+            total_entradas=caixa.total_entradas,
+            total_saidas=caixa.total_saidas,
+            saldo=caixa.saldo_calculado
+        )
         # O commit é controlado pela rota para garantir integridade total.
         return movimento
 
     @staticmethod
+    @repetir_se_ocupado
     def fechar_caixa(caixa_id, observacao=None):
         """Encerra o turno do caixa e congela o saldo final para histórico."""
         caixa = Caixa.query.get(caixa_id)
@@ -62,12 +209,39 @@ class CaixaService:
 
         caixa.saldo_final = caixa.saldo_calculado # Salva o estado atual
         caixa.status = 'fechado'
-        caixa.data_fechamento = datetime.utcnow()
+        caixa.data_fechamento = agora_utc()
         caixa.observacao = observacao
-        
+        EventoService.agendar('caixa', caixa_id=caixa.id, status='fechado', saldo=caixa.saldo_final)
+
         db.session.commit()
         return caixa
 
+    @staticmethod
+    def recalcular_totais(caixa_id=None):
+        """Reconstrói soma_entradas/soma_saidas a partir de movimento_caixa."""
+        def soma(tipo):
+            return db.session.query(
+                func.coalesce(func.sum(MovimentoCaixa.valor), 0.0)
+            ).filter(
+                MovimentoCaixa.caixa_id == Caixa.id,
+                MovimentoCaixa.tipo == tipo
+            ).scalar_subquery()
+
+        query = Caixa.query
+        if caixa_id:
+            query = query.filter(Caixa.id == caixa_id)
+
+        try:
+            atualizados = query.update(
+                {Caixa.soma_entradas: soma('entrada'), Caixa.soma_saidas: soma('saida')},
+                synchronize_session=False
+            )
+            db.session.commit()
+            return atualizados
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
     @staticmethod
     def obter_caixa_aberto():
         """MÉTODO QUE ESTAVA FALTANDO: Retorna o caixa com status 'aberto'."""
@@ -78,6 +252,7 @@ class CaixaService:
         """Retorna o histórico de operações do turno atual."""
         return MovimentoCaixa.query.filter_by(caixa_id=caixa_id).order_by(MovimentoCaixa.data.desc()).all()
     @staticmethod
-    def listar_historico_fechamentos():
-       from app.models import Movimento # Importação interna para evitar conflitos
-       return Movimento.query.order_by(Movimento.id.desc()).all()
\ No newline at end of file
+    def listar_historico_fechamentos(cursor=None, limite=50):
+        """Histórico de movimentos paginado por keyset. Retorna (movimentos, proximo_cursor)."""
+        from app.services.movimento_service import MovimentoService # Importação interna para evitar conflitos
+        return MovimentoService.paginar_movimentos(cursor=cursor, limite=limite)
\ No newline at end of file
@@ -0,0 +1,115 @@
+import os
+import time
+from typing import NamedTuple
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from flask_sqlalchemy.session import Session
+from app.models import db, Produto
+from app.utils.versao import ler_versao, trocar_versao
+
+
+class ProdutoResumo(NamedTuple):
+    """Linha imutável do catálogo, com os mesmos atributos que as telas leem de Produto."""
+    id: int
+    nome: str
+    qtd: int
+    valor_compra: float
+    valor_venda: float
+    estoque_minimo: int
+    ativo: bool
+
+    @property
+    def quantidade(self):
+        return self.qtd
+
+    @property
+    def margem_lucro(self):
+        if self.valor_compra and self.valor_compra > 0:
+            return ((self.valor_venda - self.valor_compra) / self.valor_compra) * 100
+        return 0.0
+
+    @property
+    def estoque_baixo(self):
+        return (self.qtd or 0) <= (self.estoque_minimo or 0)
+
+    def to_dict(self):
+        dados = self._asdict()
+        dados.update(quantidade=self.qtd, estoque_baixo=self.estoque_baixo, margem_lucro=self.margem_lucro)
+        return dados
+
+
+class CatalogoService:
+    """
+    Cache em memória do catálogo (ProdutoService.listar_produtos), um por app.
+    A versão fica num arquivo compartilhado entre os workers: cada leitura faz
+    só um os.stat, e qualquer commit que altere produtos troca o arquivo
+    (ver os eventos de sessão no fim deste módulo).
+    """
+
+    @staticmethod
+    def _arquivo_versao():
+        caminho = current_app.config.get('CATALOGO_VERSAO_ARQUIVO')
+        return caminho or os.path.join(current_app.instance_path, 'catalogo.versao')
+
+    @staticmethod
+    def versao():
+        """Token da versão atual do catálogo (muda a cada invalidação)."""
+        return ler_versao(CatalogoService._arquivo_versao())
+
+    @staticmethod
+    def invalidar():
+        """Troca o arquivo de versão; todos os workers recarregam na próxima leitura."""
+        trocar_versao(CatalogoService._arquivo_versao())
+        current_app.extensions.get('catalogo', {}).clear()
+
+    @staticmethod
+    def listar(incluir_inativos=False):
+        """Produtos ordenados por nome, lidos do cache enquanto a versão não mudar."""
+        cache = current_app.extensions.setdefault('catalogo', {})
+        versao = CatalogoService.versao()
+        ttl = current_app.config.get('CATALOGO_CACHE_TTL', 300)
+
+        entrada = cache.get(incluir_inativos)
+        if entrada and versao is not None and entrada[0] == versao and time.monotonic() - entrada[1] < ttl:
+            return entrada[2]
+
+        if versao is None:
+            CatalogoService.invalidar()
+            versao = CatalogoService.versao()
+
+        query = db.session.query(
+            Produto.id, Produto.nome, Produto.qtd, Produto.valor_compra,
+            Produto.valor_venda, Produto.estoque_minimo, Produto.ativo
+        )
+        if not incluir_inativos:
+            query = query.filter(Produto.ativo == True)
+        produtos = tuple(ProdutoResumo(*linha) for linha in query.order_by(Produto.nome.asc()))
+
+        cache[incluir_inativos] = (versao, time.monotonic(), produtos)
+        return produtos
+
+    @staticmethod
+    def marcar_alterado():
+        """Para alterações fora do ORM (UPDATE em lote): invalida no próximo commit."""
+        db.session.info['catalogo_alterado'] = True
+
+
+# Qualquer flush que mexa em Produto marca a sessão; a versão só muda depois
+# do commit, para nenhum worker recarregar (e guardar) dados não confirmados.
+@event.listens_for(Session, 'after_flush')
+def _produto_alterado(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Produto):
+            session.info['catalogo_alterado'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_apos_commit(session):
+    if session.info.pop('catalogo_alterado', False) and has_app_context():
+        CatalogoService.invalidar()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_marca(session):
+    session.info.pop('catalogo_alterado', None)
@@ -0,0 +1,277 @@
+import hashlib
+import math
+import random
+import time as relogio
+from bisect import bisect_left
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+from typing import NamedTuple
+from sqlalchemy import bindparam, insert, select, text, update
+from app.models import db, Produto, Movimento, Caixa, MovimentoCaixa, MovimentoResumoDiario
+from app.services.resumo_service import ResumoService
+from app.services.catalogo_service import CatalogoService
+from app.services.dashboard_service import DashboardService
+from app.utils.datas import hoje_utc
+
+# Linhas por INSERT em lote
+LOTE = 50_000
+
+CATEGORIAS = ['Arroz', 'Feijão', 'Açúcar', 'Café', 'Leite', 'Óleo', 'Macarrão', 'Farinha', 'Sabão', 'Biscoito',
+              'Detergente', 'Refrigerante', 'Suco', 'Molho', 'Sal', 'Manteiga', 'Iogurte', 'Papel', 'Shampoo', 'Sabonete']
+MARCAS = ['Tio João', 'Camil', 'União', 'Pilão', 'Italac', 'Liza', 'Renata', 'Dona Benta', 'Ypê', 'Piraquê',
+          'Nestlé', 'Qualy', 'Tang', 'Quero', 'Cisne', 'Neve', 'Dove', 'Omo', 'Kicaldo', 'Vigor']
+EMBALAGENS = ['200g', '500g', '1kg', '2kg', '5kg', '350ml', '1L', '2L', 'un', 'cx 12']
+
+# Sazonalidade: volume de vendas relativo por mês, dia da semana (segunda = 0) e hora
+FATOR_MES = {1: 0.85, 2: 0.85, 3: 0.95, 4: 0.95, 5: 1.0, 6: 1.0, 7: 1.05, 8: 0.95, 9: 0.95, 10: 1.0, 11: 1.1, 12: 1.4}
+FATOR_SEMANA = [0.9, 0.85, 0.9, 0.95, 1.15, 1.35, 0.6]
+PESO_HORA = {7: 2, 8: 4, 9: 6, 10: 8, 11: 10, 12: 11, 13: 9, 14: 7, 15: 7, 16: 8, 17: 10, 18: 11, 19: 8, 20: 5, 21: 3}
+FORMAS_PAGAMENTO = ['dinheiro', 'cartao', 'pix']
+PESO_FORMAS = [25, 45, 30]
+QUANTIDADES = [1, 2, 3, 4, 6]
+PESO_QUANTIDADES = [62, 20, 9, 5, 4]
+# Expoente da distribuição de Pareto da popularidade (1,16 ~ 80% das vendas em 20% dos itens)
+ALFA_PARETO = 1.16
+ITENS_MEDIO = 3.0
+
+
+class ResultadoSemente(NamedTuple):
+    produtos: int
+    caixas: int
+    movimentos: int
+    movimentos_caixa: int
+    assinatura: str  # hash do conteúdo gerado: a mesma semente e o mesmo período dão a mesma assinatura
+    segundos: float
+
+    def to_dict(self):
+        return self._asdict()
+
+
+class _Lotes:
+    """Buffers de linhas por tabela, gravados com INSERT em lote fora da unit of work do ORM."""
+
+    def __init__(self, lote):
+        self.lote = lote
+        self.tabelas = {
+            'caixa': (Caixa.__table__, []),
+            'movimento': (Movimento.__table__, []),
+            'movimento_caixa': (MovimentoCaixa.__table__, []),
+        }
+        self.contagem = dict.fromkeys(self.tabelas, 0)
+        self.assinatura = hashlib.sha256()
+
+    def adicionar(self, nome, linha):
+        self.tabelas[nome][1].append(linha)
+        self.assinatura.update(repr(sorted(linha.items())).encode())
+
+    def gravar(self, forcar=False):
+        if not forcar and all(len(linhas) < self.lote for _, linhas in self.tabelas.values()):
+            return
+        with db.engine.begin() as conn:
+            # Caixas antes dos seus lançamentos (chave estrangeira)
+            for nome, (tabela, linhas) in self.tabelas.items():
+                for inicio in range(0, len(linhas), self.lote):
+                    conn.execute(insert(tabela), linhas[inicio:inicio + self.lote])
+                self.contagem[nome] += len(linhas)
+                linhas.clear()
+
+
+class DadosSinteticosService:
+    """
+    Histórico sintético de uma loja para benchmarks e planejamento de
+    capacidade: catálogo com popularidade de Pareto, vendas em vários
+    terminais seguindo o mês, o dia da semana e a hora, reposição quando o
+    saldo cai abaixo do mínimo e sangrias de caixa. Tudo sai de um
+    random.Random(semente): a mesma semente e o mesmo período geram
+    exatamente os mesmos dados.
+    """
+
+    # Tabelas preenchidas pelo gerador, na ordem segura para apagar
+    TABELAS = (MovimentoCaixa.__table__, Caixa.__table__, MovimentoResumoDiario.__table__,
+               Movimento.__table__, Produto.__table__)
+
+    @staticmethod
+    def possui_dados():
+        """True se alguma das tabelas do gerador já tem linhas (os ids gerados colidiriam)."""
+        return any(
+            db.session.execute(select(tabela).limit(1)).first()
+            for tabela in DadosSinteticosService.TABELAS
+        )
+
+    @staticmethod
+    def limpar():
+        """Apaga catálogo, movimentos e caixas (os usuários ficam)."""
+        with db.engine.begin() as conn:
+            for tabela in DadosSinteticosService.TABELAS:
+                conn.execute(tabela.delete())
+
+    @staticmethod
+    def _ajustar_sequencias(conn):
+        """
+        Produtos e caixas entram com ids explícitos; no PostgreSQL a sequência
+        ficaria para trás e o próximo INSERT normal repetiria um id.
+        """
+        if conn.dialect.name != 'postgresql':
+            return
+        for tabela in (Produto.__table__, Caixa.__table__, Movimento.__table__, MovimentoCaixa.__table__):
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{tabela.name}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {tabela.name}), 0) + 1, false)"
+            ))
+
+    @staticmethod
+    def _catalogo(rnd, n_produtos, vendas_por_dia):
+        produtos = []
+        pesos = [rnd.paretovariate(ALFA_PARETO) for _ in range(n_produtos)]
+        soma_pesos = sum(pesos)
+        unidades_por_venda = ITENS_MEDIO * sum(q * p for q, p in zip(QUANTIDADES, PESO_QUANTIDADES)) / sum(PESO_QUANTIDADES)
+        for i, peso in enumerate(pesos, start=1):
+            valor_compra = round(math.exp(rnd.gauss(2.3, 0.8)), 2)
+            # Demanda diária esperada define o mínimo (2 dias) e o lote de reposição (1 semana)
+            demanda = vendas_por_dia * unidades_por_venda * peso / soma_pesos
+            minimo = math.ceil(demanda * 2) + 2
+            produtos.append({
+                'id': i,
+                'nome': f"{rnd.choice(CATEGORIAS)} {rnd.choice(MARCAS)} {rnd.choice(EMBALAGENS)} #{i}",
+                'qtd': minimo * rnd.randint(3, 6),
+                'valor_compra': valor_compra,
+                'valor_venda': round(valor_compra * rnd.uniform(1.2, 1.8), 2),
+                'estoque_minimo': minimo,
+                'ativo': True,
+                '_reposicao': math.ceil(demanda * 7) + 10,
+            })
+        return produtos, list(accumulate(pesos))
+
+    @staticmethod
+    def gerar(semente=42, dias=365, ate=None, produtos=2000, vendas_por_dia=300, terminais=3, lote=LOTE):
+        """
+        Gera o histórico de 'dias' dias terminando em 'ate' (padrão: ontem) e
+        grava com INSERTs em lote. Espera as tabelas vazias (ver possui_dados()
+        e limpar()).
+        Ao final reconstrói o resumo diário e invalida os caches.
+        """
+        inicio_execucao = relogio.perf_counter()
+        ate = ate or hoje_utc() - timedelta(days=1)
+        rnd = random.Random(semente)
+        catalogo, acumulados = DadosSinteticosService._catalogo(rnd, produtos, vendas_por_dia)
+        total_pesos = acumulados[-1]
+        saldos = [p['qtd'] for p in catalogo]
+        pendentes = set()
+        horas = list(PESO_HORA)
+        acumulado_horas = list(accumulate(PESO_HORA.values()))
+
+        with db.engine.begin() as conn:
+            conn.execute(insert(Produto.__table__), [
+                {chave: valor for chave, valor in p.items() if not chave.startswith('_')} for p in catalogo
+            ])
+
+        lotes = _Lotes(lote)
+        for p in catalogo:
+            lotes.assinatura.update(repr((p['id'], p['nome'], p['qtd'], p['valor_venda'])).encode())
+
+        caixa_id = 0
+        for deslocamento in range(dias - 1, -1, -1):
+            dia = ate - timedelta(days=deslocamento)
+            abertura = datetime.combine(dia, time(7, 0))
+
+            # Reposição no início do dia (exceto domingo) dos itens que cruzaram o mínimo
+            if dia.weekday() != 6 and pendentes:
+                for indice in sorted(pendentes):
+                    produto = catalogo[indice]
+                    saldos[indice] += produto['_reposicao']
+                    lotes.adicionar('movimento', {
+                        'produto_id': produto['id'], 'tipo': 'entrada', 'quantidade': produto['_reposicao'],
+                        'valor_unitario': produto['valor_compra'], 'motivo': 'Reposição',
+                        'data': abertura + timedelta(minutes=rnd.randint(0, 90)), 'observacao': None,
+                    })
+                pendentes.clear()
+
+            caixas = []
+            for terminal in range(terminais):
+                caixa_id += 1
+                caixas.append({
+                    'id': caixa_id, 'data_abertura': abertura + timedelta(minutes=terminal),
+                    'data_fechamento': datetime.combine(dia, time(22, 0)) + timedelta(minutes=terminal),
+                    'saldo_inicial': 200.0, 'status': 'fechado', 'observacao_abertura': f'Terminal {terminal + 1}',
+                    'soma_entradas': 0.0, 'soma_saidas': 0.0,
+                })
+
+            fator = FATOR_MES[dia.month] * FATOR_SEMANA[dia.weekday()] * rnd.uniform(0.85, 1.15)
+            n_vendas = max(int(rnd.gauss(vendas_por_dia * fator, math.sqrt(vendas_por_dia * fator))), 0)
+            momentos = sorted(
+                datetime.combine(dia, time(rnd.choices(horas, cum_weights=acumulado_horas)[0], rnd.randrange(60), rnd.randrange(60)))
+                for _ in range(n_vendas)
+            )
+
+            for momento in momentos:
+                caixa = caixas[rnd.randrange(terminais)]
+                n_itens = 1 + min(int(rnd.expovariate(1 / (ITENS_MEDIO - 1))), 19)
+                itens = {}
+                for _ in range(n_itens):
+                    indice = bisect_left(acumulados, rnd.random() * total_pesos)
+                    itens[indice] = itens.get(indice, 0) + rnd.choices(QUANTIDADES, PESO_QUANTIDADES)[0]
+
+                total = 0.0
+                for indice, quantidade in sorted(itens.items()):
+                    if saldos[indice] < quantidade:
+                        continue  # ruptura: o item não foi vendido
+                    produto = catalogo[indice]
+                    saldos[indice] -= quantidade
+                    if saldos[indice] <= produto['estoque_minimo']:
+                        pendentes.add(indice)
+                    total += quantidade * produto['valor_venda']
+                    lotes.adicionar('movimento', {
+                        'produto_id': produto['id'], 'tipo': 'saida', 'quantidade': quantidade,
+                        'valor_unitario': produto['valor_venda'], 'motivo': f"Venda PDV - Caixa #{caixa['id']}",
+                        'data': momento, 'observacao': None,
+                    })
+                if not total:
+                    continue
+
+                forma = rnd.choices(FORMAS_PAGAMENTO, PESO_FORMAS)[0]
+                total = round(total, 2)
+                caixa['soma_entradas'] += total
+                lotes.adicionar('movimento_caixa', {
+                    'caixa_id': caixa['id'], 'tipo': 'entrada', 'categoria': 'venda',
+                    'descricao': f'Venda PDV - {forma}', 'valor': total, 'data': momento, 'forma_pagamento': forma,
+                })
+
+            for caixa in caixas:
+                # Sangria no fim do turno quando o caixa passou de R$ 1.000
+                if caixa['soma_entradas'] > 1000 and rnd.random() < 0.7:
+                    valor = round(caixa['soma_entradas'] * rnd.uniform(0.3, 0.6), 2)
+                    caixa['soma_saidas'] += valor
+                    lotes.adicionar('movimento_caixa', {
+                        'caixa_id': caixa['id'], 'tipo': 'saida', 'categoria': 'sangria', 'descricao': 'Sangria',
+                        'valor': valor, 'data': caixa['data_fechamento'] - timedelta(minutes=5), 'forma_pagamento': 'dinheiro',
+                    })
+                caixa['soma_entradas'] = round(caixa['soma_entradas'], 2)
+                caixa['soma_saidas'] = round(caixa['soma_saidas'], 2)
+                caixa['saldo_final'] = round(caixa['saldo_inicial'] + caixa['soma_entradas'] - caixa['soma_saidas'], 2)
+                lotes.adicionar('caixa', caixa)
+
+            lotes.gravar()
+        lotes.gravar(forcar=True)
+
+        # Saldo final de cada produto, coerente com o livro de movimentos
+        with db.engine.begin() as conn:
+            tabela = Produto.__table__
+            conn.execute(
+                update(tabela).where(tabela.c.id == bindparam('b_id')).values(qtd=bindparam('b_qtd')),
+                [{'b_id': p['id'], 'b_qtd': saldo} for p, saldo in zip(catalogo, saldos)]
+            )
+            DadosSinteticosService._ajustar_sequencias(conn)
+        lotes.assinatura.update(repr(saldos).encode())
+
+        ResumoService.reconstruir()
+        CatalogoService.invalidar()
+        DashboardService.invalidar()
+
+        return ResultadoSemente(
+            produtos=len(catalogo),
+            caixas=lotes.contagem['caixa'],
+            movimentos=lotes.contagem['movimento'],
+            movimentos_caixa=lotes.contagem['movimento_caixa'],
+            assinatura=lotes.assinatura.hexdigest()[:16],
+            segundos=relogio.perf_counter() - inicio_execucao,
+        )
@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from typing import NamedTuple
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from flask_sqlalchemy.session import Session
+from app.models import db, Produto, Movimento, MovimentoResumoDiario, Caixa, MovimentoCaixa
+from app.services.relatorio_service import RelatorioService
+from app.services.catalogo_service import CatalogoService
+from app.utils.versao import ler_versao, trocar_versao
+
+# Tabelas que alimentam o dashboard: escrever nelas desatualiza o snapshot
+TABELAS_DASHBOARD = {m.__table__.name for m in (Produto, Movimento, MovimentoResumoDiario, Caixa, MovimentoCaixa)}
+
+
+class Snapshot(NamedTuple):
+    versao: tuple
+    calculado_em: float  # time.monotonic()
+    dados: dict
+
+
+class EstadoDashboard:
+    """Snapshot atual e o cálculo em andamento (no máximo um por worker)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.calculo = None  # threading.Event do cálculo em andamento
+        self.pendente = False  # houve commit durante o cálculo em andamento
+
+    def iniciar_calculo(self, adiar=False):
+        """
+        Retorna (evento, True) para quem deve calcular e (evento, False) para quem
+        espera. Com adiar, quem encontra um cálculo em andamento deixa pedida uma
+        rodada a mais, feita quando ele terminar.
+        """
+        with self.lock:
+            if self.calculo is not None:
+                self.pendente = self.pendente or adiar
+                return self.calculo, False
+            # A versão é lida no início do cálculo: pedidos anteriores já entram nele
+            self.pendente = False
+            self.calculo = threading.Event()
+            return self.calculo, True
+
+    def concluir_calculo(self, snapshot=None):
+        """Publica o snapshot e retorna True se quem chama segue com o cálculo para a rodada pedida."""
+        with self.lock:
+            if snapshot is not None:
+                self.snapshot = snapshot
+            repetir = self.pendente and snapshot is not None
+            self.pendente = False
+            evento, self.calculo = self.calculo, (threading.Event() if repetir else None)
+        evento.set()
+        return repetir
+
+
+class DashboardService:
+    """
+    Dashboard servido de um snapshot em memória, um por app (stale-while-revalidate).
+    Quem lê recebe o último snapshot na hora; se ele passou de DASHBOARD_INTERVALO
+    segundos ou os dados mudaram, um recálculo roda em segundo plano. Sem snapshot
+    (ou mais velho que DASHBOARD_IDADE_MAXIMA), a requisição espera o cálculo, e
+    requisições simultâneas esperam o mesmo cálculo em vez de repetir as consultas.
+    """
+
+    @staticmethod
+    def _estado():
+        return current_app.extensions.setdefault('dashboard', EstadoDashboard())
+
+    @staticmethod
+    def _arquivo_versao():
+        # Ao lado da versão do catálogo, no diretório já compartilhado pelos workers
+        return os.path.join(os.path.dirname(CatalogoService._arquivo_versao()), 'dashboard.versao')
+
+    @staticmethod
+    def versao():
+        return ler_versao(DashboardService._arquivo_versao())
+
+    @staticmethod
+    def invalidar():
+        """Marca o dashboard como desatualizado em todos os workers."""
+        trocar_versao(DashboardService._arquivo_versao())
+
+    @staticmethod
+    def obter():
+        estado = DashboardService._estado()
+        snapshot = estado.snapshot
+        if snapshot is not None:
+            idade = time.monotonic() - snapshot.calculado_em
+            if snapshot.versao == DashboardService.versao() and idade < current_app.config.get('DASHBOARD_INTERVALO', 10):
+                return snapshot.dados
+            if idade < current_app.config.get('DASHBOARD_IDADE_MAXIMA', 60):
+                DashboardService.recalcular_em_segundo_plano()
+                return snapshot.dados
+
+        evento, lider = estado.iniciar_calculo()
+        if not lider:
+            evento.wait(current_app.config.get('DASHBOARD_ESPERA_MAXIMA', 30))
+            if estado.snapshot is not None:
+                return estado.snapshot.dados
+            # O cálculo do outro falhou: tenta nesta requisição
+            return RelatorioService.dashboard()
+        return DashboardService._calcular(estado).dados
+
+    @staticmethod
+    def _calcular(estado):
+        """Roda as consultas (quem chama já detém o cálculo) e publica o snapshot."""
+        snapshot = None
+        try:
+            # Versão lida antes das consultas: uma escrita no meio força outro recálculo
+            versao = DashboardService.versao()
+            if versao is None:
+                DashboardService.invalidar()
+                versao = DashboardService.versao()
+            snapshot = Snapshot(versao, time.monotonic(), RelatorioService.dashboard())
+            return snapshot
+        finally:
+            if estado.concluir_calculo(snapshot):
+                DashboardService._calcular_em_thread(estado)
+
+    @staticmethod
+    def recalcular_em_segundo_plano():
+        """
+        Dispara o recálculo numa thread. Com um cálculo já em andamento neste
+        worker, só marca que ele deve rodar mais uma vez ao terminar: uma rajada
+        de commits custa no máximo dois cálculos, não um por commit.
+        """
+        estado = DashboardService._estado()
+        _, lider = estado.iniciar_calculo(adiar=True)
+        if lider:
+            DashboardService._calcular_em_thread(estado)
+
+    @staticmethod
+    def _calcular_em_thread(estado):
+        """Roda numa thread o cálculo que quem chama já detém."""
+        app = current_app._get_current_object()
+
+        def calcular():
+            with app.app_context():
+                try:
+                    DashboardService._calcular(estado)
+                except Exception:
+                    app.logger.warning('Falha ao recalcular o dashboard', exc_info=True)
+                finally:
+                    db.session.remove()
+
+        threading.Thread(target=calcular, name='dashboard', daemon=True).start()
+
+
+# Escritas nas tabelas do dashboard, pelo ORM (flush) ou em lote (session.execute
+# de INSERT/UPDATE/DELETE), marcam a sessão; depois do commit a versão muda.
+@event.listens_for(Session, 'after_flush')
+def _dashboard_alterado(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if obj.__table__.name in TABELAS_DASHBOARD:
+            session.info['dashboard_alterado'] = True
+            return
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _dashboard_alterado_em_lote(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        tabela = getattr(orm_execute_state.statement, 'table', None)
+        if getattr(tabela, 'name', None) in TABELAS_DASHBOARD:
+            orm_execute_state.session.info['dashboard_alterado'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_dashboard(session):
+    if session.info.pop('dashboard_alterado', False) and has_app_context():
+        DashboardService.invalidar()
+        # Só recalcula já se este worker serve o dashboard; os demais recalculam ao ler
+        if DashboardService._estado().snapshot is not None:
+            DashboardService.recalcular_em_segundo_plano()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_marca_dashboard(session):
+    session.info.pop('dashboard_alterado', None)
@@ -0,0 +1,217 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from flask_sqlalchemy.session import Session
+from app.models import db
+
+# Quantos produtos um evento de estoque lista (o total e os alertas vêm sempre)
+MAX_PRODUTOS_EVENTO = 50
+
+
+class BrokerMemoria:
+    """
+    Distribui os eventos só dentro do processo: servidor de desenvolvimento
+    ou um único worker. Cada conexão SSE é uma fila assinante.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.assinantes = set()
+
+    def assinar(self):
+        fila = queue.Queue(maxsize=100)
+        with self.lock:
+            self.assinantes.add(fila)
+        return fila
+
+    def cancelar(self, fila):
+        with self.lock:
+            self.assinantes.discard(fila)
+
+    def distribuir(self, eventos):
+        with self.lock:
+            assinantes = list(self.assinantes)
+        for fila in assinantes:
+            for evento in eventos:
+                try:
+                    fila.put_nowait(evento)
+                except queue.Full:
+                    pass  # conexão parada: descarta em vez de segurar quem publica
+
+    def publicar(self, evento):
+        self.distribuir([evento])
+
+
+class BrokerArquivo(BrokerMemoria):
+    """
+    Substituto local de um broker (Redis pub/sub etc.) para vários workers na
+    mesma máquina: quem publica acrescenta uma linha JSON num arquivo
+    compartilhado (O_APPEND, uma escrita por evento) e cada worker tem uma
+    thread que acompanha o arquivo e distribui as linhas novas às suas conexões.
+    O arquivo é trocado ao passar de EVENTOS_MAX_BYTES; quem acompanha lê o
+    restante do antigo antes de abrir o novo (duas trocas dentro de um mesmo
+    intervalo de leitura perdem os eventos do arquivo do meio).
+    """
+
+    def __init__(self, caminho, intervalo=0.25, max_bytes=1024 * 1024):
+        super().__init__()
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.max_bytes = max_bytes
+        self.pid = None
+
+    def publicar(self, evento):
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        linha = (json.dumps(evento, default=str) + '\n').encode('utf-8')
+        fd = os.open(self.caminho, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, linha)
+            tamanho = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if tamanho > self.max_bytes:
+            temporario = f"{self.caminho}.{uuid.uuid4().hex}"
+            open(temporario, 'wb').close()
+            os.replace(temporario, self.caminho)
+
+    def assinar(self):
+        # A thread não sobrevive ao fork: cada worker inicia a sua
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    self.pid = os.getpid()
+                    # Posição inicial tomada aqui: o que for publicado depois já é entregue
+                    arquivo = self._abrir(do_fim=True)
+                    threading.Thread(target=self.acompanhar, args=(arquivo,), name='eventos', daemon=True).start()
+        return super().assinar()
+
+    def _abrir(self, do_fim):
+        try:
+            arquivo = open(self.caminho, 'rb')
+        except FileNotFoundError:
+            return None
+        if do_fim:
+            arquivo.seek(0, os.SEEK_END)
+        return arquivo
+
+    def acompanhar(self, arquivo):
+        while True:
+            if arquivo is None:
+                time.sleep(self.intervalo)
+                arquivo = self._abrir(do_fim=False)
+                continue
+
+            self.distribuir(self._ler_linhas(arquivo))
+
+            try:
+                trocado = os.stat(self.caminho).st_ino != os.fstat(arquivo.fileno()).st_ino
+            except FileNotFoundError:
+                trocado = True
+            if trocado:
+                self.distribuir(self._ler_linhas(arquivo))
+                arquivo.close()
+                arquivo = self._abrir(do_fim=False)
+            else:
+                time.sleep(self.intervalo)
+
+    @staticmethod
+    def _ler_linhas(arquivo):
+        eventos = []
+        while True:
+            posicao = arquivo.tell()
+            linha = arquivo.readline()
+            if not linha.endswith(b'\n'):
+                # Linha ainda sendo escrita: relê na próxima volta
+                arquivo.seek(posicao)
+                return eventos
+            try:
+                eventos.append(json.loads(linha))
+            except ValueError:
+                pass
+
+
+class EventoService:
+    """
+    Eventos ao vivo para as telas (SSE em /eventos). Os serviços agendam o
+    evento dentro da transação e ele só é publicado depois do commit.
+    """
+
+    @staticmethod
+    def broker():
+        broker = current_app.extensions.get('eventos')
+        if broker is None:
+            if current_app.config.get('EVENTOS_BROKER', 'arquivo') == 'memoria':
+                broker = BrokerMemoria()
+            else:
+                caminho = current_app.config.get('EVENTOS_ARQUIVO') or os.path.join(current_app.instance_path, 'eventos.log')
+                broker = BrokerArquivo(
+                    caminho,
+                    intervalo=current_app.config.get('EVENTOS_INTERVALO', 0.25),
+                    max_bytes=current_app.config.get('EVENTOS_MAX_BYTES', 1024 * 1024)
+                )
+            broker = current_app.extensions.setdefault('eventos', broker)
+        return broker
+
+    @staticmethod
+    def agendar(evento, /, **dados):
+        """Publica o evento no commit da sessão atual (descartado no rollback)."""
+        db.session.info.setdefault('eventos', []).append({'tipo': evento, 'dados': dados})
+
+    @staticmethod
+    def agendar_estoque(tipo, itens, total):
+        """
+        Evento de movimentação de estoque. 'itens' são tuplas
+        (id, nome, qtd_antes, qtd_depois, estoque_minimo); os produtos que
+        cruzaram o estoque mínimo nesta transação vão em 'alertas'.
+        """
+        produtos = [
+            {'id': i, 'nome': nome, 'qtd': depois, 'estoque_minimo': minimo}
+            for i, nome, _, depois, minimo in itens
+        ]
+        alertas = [
+            p for p, (_, _, antes, depois, minimo) in zip(produtos, itens)
+            if (antes or 0) > (minimo or 0) >= (depois or 0)
+        ]
+        EventoService.agendar(
+            'estoque',
+            tipo=tipo,
+            total=total,
+            vendas=total if tipo == 'saida' else 0.0,
+            compras=total if tipo == 'entrada' else 0.0,
+            lucro=total if tipo == 'saida' else -total,
+            produtos=produtos[:MAX_PRODUTOS_EVENTO],
+            alertas=alertas
+        )
+
+    @staticmethod
+    def publicar(tipo, dados):
+        EventoService.broker().publicar({'tipo': tipo, 'dados': dados, 'em': time.time()})
+
+    @staticmethod
+    def assinar():
+        return EventoService.broker().assinar()
+
+    @staticmethod
+    def cancelar(fila):
+        EventoService.broker().cancelar(fila)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publicar_eventos(session):
+    eventos = session.info.pop('eventos', None)
+    if eventos and has_app_context():
+        for evento in eventos:
+            try:
+                EventoService.publicar(evento['tipo'], evento['dados'])
+            except OSError:
+                current_app.logger.warning('Falha ao publicar evento %s', evento['tipo'], exc_info=True)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_eventos(session):
+    session.info.pop('eventos', None)
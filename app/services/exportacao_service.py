@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+import zlib
+from sqlalchemy import select
+from app.models import db, Produto, Movimento, MovimentoCaixa
+
+# Linhas buscadas por vez no cursor do banco e gravadas por pedaço da resposta
+LOTE = 1000
+
+COLUNAS_MOVIMENTO = [
+    'id', 'data', 'produto_id', 'produto_nome', 'tipo', 'quantidade',
+    'valor_unitario', 'valor_total', 'motivo', 'observacao'
+]
+COLUNAS_MOVIMENTO_CAIXA = [
+    'id', 'data', 'caixa_id', 'tipo', 'categoria', 'descricao', 'valor', 'forma_pagamento'
+]
+
+class ExportacaoService:
+    """
+    Exportação em streaming (CSV/NDJSON) das tabelas movimento e movimento_caixa.
+    As linhas vêm de um cursor com yield_per e são projeções de colunas, então
+    nada fica no identity map e a memória não cresce com o tamanho do período.
+    """
+
+    FORMATOS = {
+        'csv': 'text/csv; charset=utf-8',
+        'ndjson': 'application/x-ndjson'
+    }
+
+    @staticmethod
+    def _linhas(stmt):
+        resultado = db.session.execute(stmt.execution_options(yield_per=LOTE))
+        try:
+            for linha in resultado:
+                yield linha._asdict()
+        finally:
+            resultado.close()
+
+    @staticmethod
+    def linhas_movimentos(data_inicio, data_fim):
+        """Movimentos do período (mesmo filtro de RelatorioService.relatorio_movimentos)."""
+        stmt = select(
+            Movimento.id,
+            Movimento.data,
+            Movimento.produto_id,
+            Produto.nome.label('produto_nome'),
+            Movimento.tipo,
+            Movimento.quantidade,
+            Movimento.valor_unitario,
+            (Movimento.quantidade * Movimento.valor_unitario).label('valor_total'),
+            Movimento.motivo,
+            Movimento.observacao
+        ).outerjoin(Produto, Produto.id == Movimento.produto_id).where(
+            Movimento.data >= data_inicio,
+            Movimento.data <= data_fim
+        ).order_by(Movimento.data, Movimento.id)
+        return ExportacaoService._linhas(stmt)
+
+    @staticmethod
+    def linhas_movimentos_caixa(data_inicio, data_fim, caixa_id=None):
+        """Lançamentos financeiros do caixa no período, opcionalmente de um só caixa."""
+        stmt = select(
+            MovimentoCaixa.id,
+            MovimentoCaixa.data,
+            MovimentoCaixa.caixa_id,
+            MovimentoCaixa.tipo,
+            MovimentoCaixa.categoria,
+            MovimentoCaixa.descricao,
+            MovimentoCaixa.valor,
+            MovimentoCaixa.forma_pagamento
+        ).where(
+            MovimentoCaixa.data >= data_inicio,
+            MovimentoCaixa.data <= data_fim
+        )
+        if caixa_id:
+            stmt = stmt.where(MovimentoCaixa.caixa_id == caixa_id)
+        return ExportacaoService._linhas(stmt.order_by(MovimentoCaixa.data, MovimentoCaixa.id))
+
+    @staticmethod
+    def _valor(valor):
+        return valor.isoformat() if hasattr(valor, 'isoformat') else valor
+
+    @staticmethod
+    def serializar(linhas, colunas, formato):
+        """Converte as linhas em pedaços de texto de até LOTE registros cada."""
+        if formato not in ExportacaoService.FORMATOS:
+            raise ValueError(f"Formato de exportação inválido: {formato}")
+
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer) if formato == 'csv' else None
+        if escritor:
+            escritor.writerow(colunas)
+
+        pendentes = 0
+        for linha in linhas:
+            valores = [ExportacaoService._valor(linha[c]) for c in colunas]
+            if escritor:
+                escritor.writerow(valores)
+            else:
+                buffer.write(json.dumps(dict(zip(colunas, valores)), ensure_ascii=False))
+                buffer.write('\n')
+
+            pendentes += 1
+            if pendentes >= LOTE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pendentes = 0
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    @staticmethod
+    def comprimir(pedacos):
+        """Comprime os pedaços em gzip à medida que são gerados."""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for pedaco in pedacos:
+            dados = compressor.compress(pedaco.encode('utf-8'))
+            if dados:
+                yield dados
+        yield compressor.flush()
@@ -0,0 +1,254 @@
+import csv
+import unicodedata
+from types import SimpleNamespace
+from typing import NamedTuple
+from sqlalchemy import bindparam, func, insert, select, update
+from app.models import db, Produto, Movimento
+from app.services.resumo_service import ResumoService
+from app.services.catalogo_service import CatalogoService
+from app.utils.sqlite import repetir_se_ocupado
+from app.utils.datas import agora_utc
+
+# Linhas por transação na importação
+LOTE = 1000
+# Quantos erros de validação são guardados no resultado (as linhas são contadas todas)
+MAX_ERROS = 100
+
+COLUNAS_OBRIGATORIAS = ('nome', 'valor_compra', 'valor_venda')
+# Nomes alternativos aceitos no cabeçalho (já sem acentos e em minúsculas)
+ALIASES = {'quantidade': 'qtd', 'estoque': 'qtd', 'minimo': 'estoque_minimo', 'produto': 'nome'}
+
+
+class ResultadoImportacao(NamedTuple):
+    inseridos: int
+    atualizados: int
+    ignorados: int
+    erros: list  # [(número da linha, mensagem)]
+
+
+class ImportacaoService:
+    """Importação de produtos em massa a partir de CSV."""
+
+    @staticmethod
+    def normalizar_nome(nome):
+        """Chave do upsert: sem acentos, minúsculas e espaços simples ("  Café  Pilão" -> "cafe pilao")."""
+        sem_acento = unicodedata.normalize('NFKD', nome or '')
+        sem_acento = ''.join(c for c in sem_acento if not unicodedata.combining(c))
+        return ' '.join(sem_acento.casefold().split())
+
+    @staticmethod
+    def _numero(valor, inteiro=False):
+        """Aceita "1.234,56" e "1234.56"; vazio vira None."""
+        valor = (valor or '').strip()
+        if not valor:
+            return None
+        if ',' in valor:
+            valor = valor.replace('.', '').replace(',', '.')
+        numero = float(valor)
+        if numero < 0:
+            raise ValueError('valor negativo')
+        if inteiro:
+            if numero != int(numero):
+                raise ValueError('valor não inteiro')
+            return int(numero)
+        return numero
+
+    @staticmethod
+    def _validar(registro):
+        nome = ' '.join((registro.get('nome') or '').split())
+        if not nome:
+            raise ValueError('nome vazio')
+        if len(nome) > 100:
+            raise ValueError('nome com mais de 100 caracteres')
+
+        linha = {'nome': nome}
+        for campo in ('valor_compra', 'valor_venda'):
+            try:
+                linha[campo] = ImportacaoService._numero(registro.get(campo))
+            except ValueError as e:
+                raise ValueError(f'{campo} inválido ({e})')
+            if linha[campo] is None:
+                raise ValueError(f'{campo} vazio')
+        for campo in ('qtd', 'estoque_minimo'):
+            try:
+                linha[campo] = ImportacaoService._numero(registro.get(campo), inteiro=True)
+            except ValueError as e:
+                raise ValueError(f'{campo} inválido ({e})')
+        return linha
+
+    @staticmethod
+    def ler_csv(arquivo):
+        """
+        Gera (número da linha, registro) de um arquivo texto, sem carregá-lo
+        inteiro. Detecta ';' ou ',' como separador e normaliza o cabeçalho.
+        Uma linha que o csv não consegue ler (campo acima do field_size_limit)
+        vem com um ValueError no lugar do registro e a leitura continua.
+        """
+        primeira = arquivo.readline()
+        separador = ';' if primeira.count(';') > primeira.count(',') else ','
+        try:
+            colunas = next(csv.reader([primeira], delimiter=separador), [])
+        except csv.Error as e:
+            raise ValueError(f"Cabeçalho do CSV inválido ({e})")
+        cabecalho = [
+            ALIASES.get(c, c) for c in
+            (ImportacaoService.normalizar_nome(c).replace(' ', '_') for c in colunas)
+        ]
+        faltando = [c for c in COLUNAS_OBRIGATORIAS if c not in cabecalho]
+        if faltando:
+            raise ValueError(f"Colunas obrigatórias ausentes no CSV: {', '.join(faltando)}")
+
+        leitor = csv.reader(arquivo, delimiter=separador)
+        numero = 1
+        while True:
+            numero += 1
+            try:
+                valores = next(leitor)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield numero, ValueError(f'linha malformada ({e})')
+                continue
+            if any(v.strip() for v in valores):
+                yield numero, dict(zip(cabecalho, valores))
+
+    @staticmethod
+    def importar_produtos(arquivo, lote=LOTE):
+        """
+        Importa produtos de um CSV (nome, valor_compra, valor_venda e, opcionais,
+        qtd e estoque_minimo) em lotes de INSERT/UPDATE executemany, um commit
+        por lote. Produtos com o mesmo nome normalizado são atualizados (e
+        reativados); uma qtd diferente da atual vira um movimento de ajuste.
+        O estoque inicial dos novos entra como movimento de entrada no mesmo lote.
+        Linhas inválidas são ignoradas e listadas em erros. Um lote que falhar
+        não desfaz os anteriores; repetir a importação é seguro.
+        """
+        existentes = {}
+        for produto_id, nome in db.session.execute(select(Produto.id, Produto.nome).order_by(Produto.id)):
+            existentes.setdefault(ImportacaoService.normalizar_nome(nome), produto_id)
+
+        inseridos = atualizados = ignorados = 0
+        erros = []
+        pendentes = {}
+
+        def gravar():
+            nonlocal inseridos, atualizados
+            novos, alterados = ImportacaoService._gravar_lote(list(pendentes.items()), existentes)
+            existentes.update(novos)
+            inseridos += len(novos)
+            atualizados += alterados
+            pendentes.clear()
+
+        for numero, registro in ImportacaoService.ler_csv(arquivo):
+            try:
+                if isinstance(registro, ValueError):
+                    raise registro
+                linha = ImportacaoService._validar(registro)
+            except ValueError as e:
+                ignorados += 1
+                if len(erros) < MAX_ERROS:
+                    erros.append((numero, str(e)))
+                continue
+
+            # Nome repetido dentro do lote: vale a última linha
+            pendentes[ImportacaoService.normalizar_nome(linha['nome'])] = linha
+            if len(pendentes) >= lote:
+                gravar()
+
+        if pendentes:
+            gravar()
+
+        return ResultadoImportacao(inseridos, atualizados, ignorados, erros)
+
+    @staticmethod
+    @repetir_se_ocupado
+    def _gravar_lote(linhas, existentes):
+        """
+        Grava um lote numa transação. Retorna ({chave: id} dos produtos
+        criados, quantidade de produtos atualizados); 'existentes' não é
+        alterado aqui, para a repetição em caso de banco ocupado ser segura.
+        """
+        tabela = Produto.__table__
+        agora = agora_utc()
+        movimentos = []
+
+        try:
+            novos = [(chave, linha) for chave, linha in linhas if chave not in existentes]
+            alterados = [(existentes[chave], linha) for chave, linha in linhas if chave in existentes]
+
+            ids_novos = {}
+            if novos:
+                # Sem sort_by_parameter_order o INSERT ... RETURNING vai em VALUES
+                # de várias linhas; os nomes são únicos no lote e ligam id e linha
+                resultado = db.session.execute(
+                    insert(tabela).returning(tabela.c.id, tabela.c.nome),
+                    [{
+                        'nome': linha['nome'],
+                        'valor_compra': linha['valor_compra'],
+                        'valor_venda': linha['valor_venda'],
+                        'qtd': linha['qtd'] or 0,
+                        'estoque_minimo': 5 if linha['estoque_minimo'] is None else linha['estoque_minimo'],
+                        'ativo': True,
+                    } for _, linha in novos]
+                )
+                ids_por_nome = dict((nome, produto_id) for produto_id, nome in resultado)
+                for chave, linha in novos:
+                    produto_id = ids_por_nome[linha['nome']]
+                    ids_novos[chave] = produto_id
+                    if linha['qtd']:
+                        movimentos.append({
+                            'produto_id': produto_id, 'tipo': 'entrada', 'quantidade': linha['qtd'],
+                            'valor_unitario': linha['valor_compra'], 'motivo': 'Estoque inicial (importação)',
+                            'data': agora,
+                        })
+
+            if alterados:
+                # Saldo lido dentro da transação, para o ajuste não ignorar vendas recentes
+                saldos = dict(db.session.execute(
+                    select(tabela.c.id, tabela.c.qtd).where(tabela.c.id.in_([p for p, _ in alterados]))
+                ).all())
+
+                parametros = []
+                for produto_id, linha in alterados:
+                    atual = saldos.get(produto_id) or 0
+                    qtd = atual if linha['qtd'] is None else linha['qtd']
+                    parametros.append({
+                        'b_id': produto_id, 'b_nome': linha['nome'], 'b_valor_compra': linha['valor_compra'],
+                        'b_valor_venda': linha['valor_venda'], 'b_qtd': qtd,
+                        'b_estoque_minimo': linha['estoque_minimo'],
+                    })
+                    if qtd != atual:
+                        movimentos.append({
+                            'produto_id': produto_id, 'tipo': 'entrada' if qtd > atual else 'saida',
+                            'quantidade': abs(qtd - atual),
+                            'valor_unitario': linha['valor_compra'] if qtd > atual else linha['valor_venda'],
+                            'motivo': 'Ajuste de estoque (importação)', 'data': agora,
+                        })
+
+                db.session.execute(
+                    update(tabela).where(tabela.c.id == bindparam('b_id')).values(
+                        nome=bindparam('b_nome'),
+                        valor_compra=bindparam('b_valor_compra'),
+                        valor_venda=bindparam('b_valor_venda'),
+                        qtd=bindparam('b_qtd'),
+                        estoque_minimo=func.coalesce(bindparam('b_estoque_minimo'), tabela.c.estoque_minimo),
+                        ativo=True,
+                    ),
+                    parametros
+                )
+
+            if movimentos:
+                db.session.execute(insert(Movimento.__table__), movimentos)
+                # acumular só lê atributos; SimpleNamespace evita instanciar 100k objetos do ORM
+                ResumoService.acumular([SimpleNamespace(**m) for m in movimentos])
+
+            CatalogoService.marcar_alterado()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            # Nada do lote fica no identity map: memória constante em arquivos grandes
+            db.session.expunge_all()
+
+        return ids_novos, len(alterados)
@@ -1,7 +1,93 @@
 from datetime import datetime
+from types import SimpleNamespace
+from typing import NamedTuple
+from sqlalchemy import case, func, insert, select, tuple_, update
 from app.models import db, Produto, Movimento
+from app.services.resumo_service import ResumoService
+from app.services.catalogo_service import CatalogoService
+from app.services.caixa_service import CaixaService
+from app.services.eventos_service import EventoService
+from app.utils.paginacao import codificar_cursor, decodificar_cursor
+from app.utils.sqlite import repetir_se_ocupado
+from app.utils.datas import agora_utc
+
+
+class ResultadoLinha(NamedTuple):
+    produto_id: int
+    quantidade: int
+    valor_unitario: float
+    status: str  # 'ok', 'erro' ou 'nao_aplicada' (lote recusado por erro em outra linha)
+    mensagem: str = None
+    qtd_atual: int = None  # saldo do produto depois do lote
+
+    def to_dict(self):
+        return self._asdict()
+
+
+class ResultadoLote(NamedTuple):
+    aplicado: bool
+    linhas: list
+    total: float = 0.0
+
+    @property
+    def erros(self):
+        return [linha for linha in self.linhas if linha.status == 'erro']
+
+    def to_dict(self):
+        return {
+            'aplicado': self.aplicado,
+            'total': self.total,
+            'linhas': [linha.to_dict() for linha in self.linhas]
+        }
+
+
+class MovimentoLinha(NamedTuple):
+    """
+    Movimento lido por projeção de colunas, com o nome do produto resolvido
+    no mesmo SELECT: sem entidade no identity map e sem lazy load por linha.
+    Tem os atributos que as telas leem de Movimento e o mesmo to_dict().
+    """
+    id: int
+    produto_id: int
+    produto_nome: str
+    tipo: str
+    quantidade: int
+    valor_unitario: float
+    motivo: str
+    data: datetime
+    observacao: str
+
+    @property
+    def valor_total(self):
+        return self.quantidade * self.valor_unitario
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'produto_id': self.produto_id,
+            'produto_nome': self.produto_nome,
+            'tipo': self.tipo,
+            'quantidade': self.quantidade,
+            'valor_unitario': self.valor_unitario,
+            'valor_total': self.valor_total,
+            'data': self.data.isoformat() if self.data else None,
+            'observacao': self.observacao
+        }
+
 
 class MovimentoService:
+    @staticmethod
+    def selecionar_linhas():
+        """SELECT das colunas de MovimentoLinha, já com o join no produto; o chamador filtra e ordena."""
+        return select(
+            Movimento.id, Movimento.produto_id, Produto.nome, Movimento.tipo, Movimento.quantidade,
+            Movimento.valor_unitario, Movimento.motivo, Movimento.data, Movimento.observacao
+        ).outerjoin(Produto, Produto.id == Movimento.produto_id)
+
+    @staticmethod
+    def ler_linhas(stmt):
+        return [MovimentoLinha(*linha) for linha in db.session.execute(stmt)]
+
     @staticmethod
     def registrar_entrada(produto_id, quantidade, valor_unitario=None, motivo="Entrada manual"):
         """Registra a entrada de produtos no estoque sincronizando com o banco."""
@@ -32,10 +118,11 @@ class MovimentoService:
                 quantidade=qtd_int,
                 valor_unitario=v_unitario,
                 motivo=str(motivo),
-                data=datetime.now()
+                data=agora_utc()
             )
 
             db.session.add(movimento)
+            ResumoService.acumular([movimento])
             return movimento
         except Exception as e:
             db.session.rollback()
@@ -58,24 +145,187 @@ class MovimentoService:
                 quantidade=qtd_int,
                 valor_unitario=v_unitario,
                 motivo=str(motivo),
-                data=datetime.now()
+                data=agora_utc()
             )
             db.session.add(movimento)
+            ResumoService.acumular([movimento])
             return movimento
         except Exception as e:
             raise e
 
     @staticmethod
-    def listar_movimentos(produto_id=None, tipo=None, data_inicio=None, data_fim=None, limite=100):
-        """Lista os movimentos aplicando filtros de data e tipo."""
-        query = Movimento.query
+    def _ler_linha(linha):
+        """Aceita {'produto_id', 'quantidade', 'valor_unitario'} ou uma tupla na mesma ordem."""
+        if isinstance(linha, dict):
+            produto_id, quantidade, valor = linha.get('produto_id'), linha.get('quantidade'), linha.get('valor_unitario')
+        else:
+            produto_id, quantidade, valor = (tuple(linha) + (None,))[:3]
+
+        produto_id = int(produto_id)
+        qtd_int = int(quantidade)
+        if qtd_int <= 0:
+            raise ValueError("A quantidade deve ser maior que zero")
+        if valor is None or (isinstance(valor, str) and not valor.strip()):
+            return produto_id, qtd_int, None
+        return produto_id, qtd_int, float(str(valor).replace(',', '.'))
+
+    @staticmethod
+    @repetir_se_ocupado
+    def registrar_lote(tipo, linhas, motivo=None, observacao=None, caixa_id=None, forma_pagamento=None):
+        """
+        Aplica várias entradas ou saídas de estoque numa única transação:
+        um IN para ler os produtos, um UPDATE com CASE para todos os saldos
+        (na saída, condicionado a qtd >= n) e um INSERT em lote dos movimentos.
+        Sem valor_unitario, usa o valor de compra (entrada) ou de venda (saída).
+        É tudo ou nada: se alguma linha falhar nada é gravado, e o resultado
+        traz o status de cada linha. Com caixa_id, o total de uma saída entra
+        no caixa como venda.
+        """
+        tipo = (tipo or '').strip().lower()
+        if tipo not in ('entrada', 'saida'):
+            raise ValueError("Tipo de movimento inválido")
+
+        lidas = []
+        for linha in linhas:
+            try:
+                lidas.append(MovimentoService._ler_linha(linha) + (None,))
+            except (TypeError, ValueError) as e:
+                bruta = linha if isinstance(linha, dict) else {}
+                lidas.append((bruta.get('produto_id'), bruta.get('quantidade'), None, str(e)))
+        if not lidas:
+            raise ValueError("Nenhuma linha informada")
+
+        ids = {produto_id for produto_id, _, _, erro in lidas if erro is None}
+        produtos = {p.id: p for p in db.session.execute(
+            select(Produto.id, Produto.nome, Produto.valor_compra, Produto.valor_venda, Produto.estoque_minimo).where(Produto.id.in_(ids))
+        )} if ids else {}
+
+        totais = {}
+        for i, (produto_id, quantidade, valor, erro) in enumerate(lidas):
+            if erro is None and produto_id not in produtos:
+                lidas[i] = (produto_id, quantidade, valor, "Produto não encontrado")
+            elif erro is None:
+                totais[produto_id] = totais.get(produto_id, 0) + quantidade
+
+        def recusar(erros_por_produto=None):
+            db.session.rollback()
+            resultado = []
+            for produto_id, quantidade, valor, erro in lidas:
+                erro = erro or (erros_por_produto or {}).get(produto_id)
+                resultado.append(ResultadoLinha(
+                    produto_id, quantidade, valor, 'erro' if erro else 'nao_aplicada', erro
+                ))
+            return ResultadoLote(False, resultado)
+
+        if any(erro for *_, erro in lidas):
+            return recusar()
+
+        try:
+            delta = case(totais, value=Produto.id)
+            stmt = update(Produto).where(Produto.id.in_(totais)).execution_options(synchronize_session=False)
+            if tipo == 'entrada':
+                stmt = stmt.values(qtd=func.coalesce(Produto.qtd, 0) + delta)
+            else:
+                stmt = stmt.where(Produto.qtd >= delta).values(qtd=Produto.qtd - delta)
+
+            if db.session.execute(stmt).rowcount != len(totais):
+                saldos = dict(db.session.execute(select(Produto.id, Produto.qtd).where(Produto.id.in_(totais))).all())
+                return recusar({
+                    produto_id: f"Estoque insuficiente para {produtos[produto_id].nome} (Disponível: {saldos[produto_id] or 0})"
+                    for produto_id, total in totais.items() if (saldos[produto_id] or 0) < total
+                })
+
+            agora = agora_utc()
+            movimentos = []
+            total = 0.0
+            for produto_id, quantidade, valor, _ in lidas:
+                produto = produtos[produto_id]
+                if valor is None:
+                    valor = float((produto.valor_compra if tipo == 'entrada' else produto.valor_venda) or 0)
+                total += quantidade * valor
+                movimentos.append({
+                    'produto_id': produto_id, 'tipo': tipo, 'quantidade': quantidade,
+                    'valor_unitario': valor, 'motivo': motivo or ('Entrada manual' if tipo == 'entrada' else 'Saída'),
+                    'observacao': observacao, 'data': agora,
+                })
+
+            db.session.execute(insert(Movimento.__table__), movimentos)
+            ResumoService.acumular([SimpleNamespace(**m) for m in movimentos])
+
+            if caixa_id and tipo == 'saida':
+                nomes = ', '.join(f"{produtos[p].nome} (x{n})" for p, n in totais.items())
+                CaixaService.registrar_movimento(
+                    caixa_id=caixa_id,
+                    tipo='entrada',  # Dinheiro entrando no caixa pela venda
+                    categoria='venda',
+                    descricao=f'Saída manual: {nomes}'[:200],
+                    valor=total,
+                    forma_pagamento=forma_pagamento
+                )
+
+            saldos = dict(db.session.execute(select(Produto.id, Produto.qtd).where(Produto.id.in_(totais))).all())
+            sinal = 1 if tipo == 'entrada' else -1
+            EventoService.agendar_estoque(tipo, [
+                (p, produtos[p].nome, saldos[p] - sinal * n, saldos[p], produtos[p].estoque_minimo)
+                for p, n in totais.items()
+            ], total)
+
+            CatalogoService.marcar_alterado()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return ResultadoLote(True, [
+            ResultadoLinha(m['produto_id'], m['quantidade'], m['valor_unitario'], 'ok', None, saldos[m['produto_id']])
+            for m in movimentos
+        ], total)
+
+    @staticmethod
+    def paginar_movimentos(produto_id=None, tipo=None, data_inicio=None, data_fim=None, cursor=None, limite=50):
+        """
+        Página de movimentos em ordem (data, id) decrescente, por keyset.
+        Retorna (movimentos, proximo_cursor), com os movimentos como
+        MovimentoLinha; o custo é o mesmo em qualquer página.
+        """
+        stmt = MovimentoService.selecionar_linhas()
         if produto_id:
-            query = query.filter(Movimento.produto_id == produto_id)
+            stmt = stmt.where(Movimento.produto_id == produto_id)
         if tipo:
-            query = query.filter(Movimento.tipo.ilike(f"%{tipo}%"))
+            stmt = stmt.where(Movimento.tipo == tipo.strip().lower())
         if data_inicio:
-            query = query.filter(Movimento.data >= data_inicio)
+            stmt = stmt.where(Movimento.data >= data_inicio)
         if data_fim:
-            query = query.filter(Movimento.data <= data_fim)
-        
-        return query.order_by(Movimento.id.desc()).limit(limite).all()
\ No newline at end of file
+            stmt = stmt.where(Movimento.data <= data_fim)
+
+        posicao = decodificar_cursor(cursor)
+        if posicao:
+            stmt = stmt.where(tuple_(Movimento.data, Movimento.id) < posicao)
+
+        # Ao menos uma linha por página (no SQLite um LIMIT negativo é "sem limite")
+        limite = max(limite, 1)
+
+        # Busca uma linha a mais só para saber se existe próxima página
+        movimentos = MovimentoService.ler_linhas(
+            stmt.order_by(Movimento.data.desc(), Movimento.id.desc()).limit(limite + 1)
+        )
+
+        proximo_cursor = None
+        if len(movimentos) > limite:
+            movimentos = movimentos[:limite]
+            ultimo = movimentos[-1]
+            proximo_cursor = codificar_cursor(ultimo.data, ultimo.id)
+        return movimentos, proximo_cursor
+
+    @staticmethod
+    def listar_movimentos(produto_id=None, tipo=None, data_inicio=None, data_fim=None, limite=100, cursor=None):
+        """Lista os movimentos aplicando filtros de data e tipo."""
+        movimentos, _ = MovimentoService.paginar_movimentos(
+            produto_id=produto_id,
+            tipo=tipo,
+            data_inicio=data_inicio,
+            data_fim=data_fim,
+            cursor=cursor,
+            limite=limite
+        )
+        return movimentos
@@ -1,4 +1,17 @@
+import re
+import unicodedata
+from sqlalchemy import select, func, text, column, table, literal_column
+from sqlalchemy.exc import OperationalError
 from app.models import db, Produto
+from app.services.catalogo_service import CatalogoService, ProdutoResumo
+
+# Tabela FTS5 criada por app/models/busca.py (só no SQLite)
+produto_busca = table('produto_busca', column('rowid'), column('rank'))
+
+# Quantos resultados da busca, os mais relevantes, seguem para o JOIN com produto
+# e o desempate por nome. O FTS5 resolve ORDER BY rank LIMIT n guardando só os n
+# melhores, então termos muito comuns ("a", "ac") não ordenam todas as linhas.
+JANELA_RANKING = 200
 
 class ProdutoService:
     @staticmethod
@@ -26,11 +39,61 @@ class ProdutoService:
 
     @staticmethod
     def listar_produtos(incluir_inativos=False):
-        """Retorna a lista de produtos ordenada alfabeticamente."""
-        query = Produto.query
-        if not incluir_inativos:
-            query = query.filter_by(ativo=True)
-        return query.order_by(Produto.nome.asc()).all()
+        """
+        Retorna a lista de produtos ordenada alfabeticamente.
+        Vem do cache do catálogo (linhas ProdutoResumo, só leitura); para editar,
+        use obter_produto.
+        """
+        return CatalogoService.listar(incluir_inativos)
+
+    @staticmethod
+    def _termos_busca(termo):
+        """Palavras do termo sem acentos e em minúsculas ("Açúcar" -> "acucar")."""
+        sem_acento = unicodedata.normalize('NFKD', termo or '')
+        sem_acento = ''.join(c for c in sem_acento if not unicodedata.combining(c))
+        return re.findall(r'\w+', sem_acento.lower())[:8]
+
+    @staticmethod
+    def buscar_produtos(termo, limite=10):
+        """
+        Busca de produtos ativos pelo nome, por prefixo de cada palavra e sem
+        diferenciar acentos, ordenada por relevância. Usa FTS5 no SQLite e o
+        índice GIN de tsvector no PostgreSQL (ver app/models/busca.py).
+        """
+        termos = ProdutoService._termos_busca(termo)
+        if not termos:
+            return []
+
+        colunas = (Produto.id, Produto.nome, Produto.qtd, Produto.valor_compra,
+                   Produto.valor_venda, Produto.estoque_minimo, Produto.ativo)
+        dialeto = db.session.get_bind().dialect.name
+
+        if dialeto == 'sqlite':
+            consulta = ' '.join(f'"{t}"*' for t in termos)
+            candidatos = select(produto_busca.c.rowid, produto_busca.c.rank).where(
+                text('produto_busca MATCH :consulta').bindparams(consulta=consulta)
+            ).order_by(produto_busca.c.rank).limit(JANELA_RANKING).subquery()
+            stmt = select(*colunas).join(candidatos, candidatos.c.rowid == Produto.id).order_by(
+                candidatos.c.rank, Produto.nome
+            ).limit(limite)
+            try:
+                return [ProdutoResumo(*linha) for linha in db.session.execute(stmt)]
+            except OperationalError:
+                # Banco ainda sem o índice (migração pendente ou SQLite sem FTS5)
+                pass
+        elif dialeto == 'postgresql':
+            # Mesma expressão do índice ix_produto_busca, para o planner usá-lo
+            vetor = func.to_tsvector(literal_column("'simple'::regconfig"), func.f_unaccent(Produto.nome))
+            consulta = func.to_tsquery(literal_column("'simple'::regconfig"), ' & '.join(f'{t}:*' for t in termos))
+            stmt = select(*colunas).where(Produto.ativo == True, vetor.op('@@')(consulta)).order_by(
+                func.ts_rank(vetor, consulta).desc(), Produto.nome
+            ).limit(limite)
+            return [ProdutoResumo(*linha) for linha in db.session.execute(stmt)]
+
+        stmt = select(*colunas).where(Produto.ativo == True)
+        for t in termos:
+            stmt = stmt.where(Produto.nome.ilike(f'%{t}%'))
+        return [ProdutoResumo(*linha) for linha in db.session.execute(stmt.order_by(Produto.nome).limit(limite))]
 
     @staticmethod
     def obter_produto(id):
@@ -98,7 +161,4 @@ class ProdutoService:
     @staticmethod
     def produtos_estoque_baixo():
         """Filtra produtos ativos que atingiram o limite crítico definido."""
-        return Produto.query.filter(
-            Produto.ativo == True,
-            Produto.qtd <= Produto.estoque_minimo
-        ).order_by(Produto.qtd.asc()).all()
\ No newline at end of file
+        return Produto.query.filter(Produto.filtro_estoque_baixo()).order_by(Produto.qtd.asc()).all()
\ No newline at end of file
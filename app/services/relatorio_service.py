@@ -1,48 +1,189 @@
-from datetime import datetime, timedelta
-from sqlalchemy import func
+from time import monotonic
+from datetime import datetime, time, timedelta
+from flask import current_app
+from sqlalchemy import case, func
 from app.models import db, Produto, Movimento, Caixa, MovimentoCaixa
+from app.models.produto import ORDENACOES_ESTOQUE
+from app.services.resumo_service import ResumoService
+from app.services.movimento_service import MovimentoService
+from app.services.caixa_service import CaixaService
+from app.services.catalogo_service import CatalogoService, ProdutoResumo
+from app.utils.datas import agora_utc
+
+# Quantos produtos em estoque crítico o dashboard lista (o total vem à parte)
+LIMITE_ESTOQUE_CRITICO = 20
 
 class RelatorioService:
     @staticmethod
-    def relatorio_estoque():
-        produtos = Produto.query.filter_by(ativo=True).all()
+    def resumo_estoque():
+        """
+        Totais do estoque ativo numa única agregação no banco, guardados junto
+        ao cache do catálogo enquanto a versão dele não mudar.
+        """
+        cache = current_app.extensions.setdefault('catalogo', {})
+        versao = CatalogoService.versao()
+        ttl = current_app.config.get('CATALOGO_CACHE_TTL', 300)
+
+        entrada = cache.get('resumo_estoque')
+        if entrada and versao is not None and entrada[0] == versao and monotonic() - entrada[1] < ttl:
+            return dict(entrada[2])
+
+        if versao is None:
+            CatalogoService.invalidar()
+            versao = CatalogoService.versao()
+
+        total_produtos, valor_estoque, valor_venda, estoque_baixo = db.session.query(
+            func.count(Produto.id),
+            func.coalesce(func.sum(Produto.qtd * Produto.valor_compra), 0.0),
+            func.coalesce(func.sum(Produto.qtd * Produto.valor_venda), 0.0),
+            func.coalesce(func.sum(case((Produto.filtro_estoque_baixo(), 1), else_=0)), 0)
+        ).filter(Produto.ativo == True).one()
+
+        resumo = {
+            'total_produtos': int(total_produtos),
+            'valor_total_estoque': float(valor_estoque),
+            'valor_total_venda': float(valor_venda),
+            'lucro_potencial': float(valor_venda) - float(valor_estoque),
+            'produtos_estoque_baixo': int(estoque_baixo)
+        }
+        cache['resumo_estoque'] = (versao, monotonic(), resumo)
+        return dict(resumo)
+
+    @staticmethod
+    def relatorio_estoque(pagina=1, por_pagina=None, ordem='valor'):
+        """
+        Relatório de estoque. Os totais vêm de resumo_estoque(); a tabela de
+        produtos é ordenada no banco por 'valor' (em estoque, decrescente),
+        'margem' (decrescente) ou 'cobertura' (saldo / mínimo, crescente), cada
+        uma sobre seu índice, e paginada quando 'por_pagina' é informado.
+        """
+        if ordem not in ORDENACOES_ESTOQUE:
+            raise ValueError(f"Ordenação inválida: {ordem}")
+        resumo = RelatorioService.resumo_estoque()
+
+        expressao = ORDENACOES_ESTOQUE[ordem]
+        if ordem == 'cobertura':
+            ordenacao = (expressao.asc(), Produto.id.asc())
+        else:
+            ordenacao = (expressao.desc(), Produto.id.desc())
+        query = db.session.query(*(getattr(Produto, campo) for campo in ProdutoResumo._fields)).filter(
+            Produto.ativo == True
+        ).order_by(*ordenacao)
 
-        total_valor_estoque = sum(p.qtd * p.valor_compra for p in produtos)
-        total_valor_venda = sum(p.qtd * p.valor_venda for p in produtos)
-        produtos_estoque_baixo = [p for p in produtos if p.estoque_baixo]
+        if por_pagina:
+            pagina = max(int(pagina or 1), 1)
+            query = query.offset((pagina - 1) * por_pagina).limit(por_pagina)
+        else:
+            pagina = 1
+        produtos = [ProdutoResumo(*linha).to_dict() for linha in query]
+        paginas = -(-resumo['total_produtos'] // por_pagina) if por_pagina else 1
 
         return {
-            'produtos': [p.to_dict() for p in produtos],
-            'total_valor_estoque': total_valor_estoque,
-            'total_valor_venda': total_valor_venda,
-            'lucro_potencial': total_valor_venda - total_valor_estoque,
-            'produtos_estoque_baixo': len(produtos_estoque_baixo),
-            'resumo': {
-                'total_produtos': len(produtos),
-                'valor_total_estoque': total_valor_estoque,
-                'valor_total_venda': total_valor_venda,
-                'lucro_potencial': total_valor_venda - total_valor_estoque,
-                'produtos_estoque_baixo': len(produtos_estoque_baixo)
-            }
+            'produtos': produtos,
+            'ordem': ordem,
+            'total_valor_estoque': resumo['valor_total_estoque'],
+            'total_valor_venda': resumo['valor_total_venda'],
+            'lucro_potencial': resumo['lucro_potencial'],
+            'produtos_estoque_baixo': resumo['produtos_estoque_baixo'],
+            'paginacao': {
+                'pagina': pagina,
+                'por_pagina': por_pagina,
+                'total': resumo['total_produtos'],
+                'paginas': max(paginas, 1)
+            },
+            'resumo': resumo
         }
 
     @staticmethod
-    def relatorio_movimentos(data_inicio=None, data_fim=None):
-        if not data_inicio:
-            data_inicio = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        if not data_fim:
-            data_fim = datetime.utcnow()
+    def _agregar_movimentos(*condicoes):
+        """Agrega direto da tabela movimento (usado só nas pontas parciais do período)."""
+        return db.session.query(
+            Movimento.tipo,
+            func.count(Movimento.id),
+            func.coalesce(func.sum(Movimento.quantidade * Movimento.valor_unitario), 0.0),
+            func.coalesce(func.sum(Movimento.quantidade), 0)
+        ).filter(*condicoes).group_by(Movimento.tipo).all()
 
-        movimentos = Movimento.query.filter(
+    @staticmethod
+    def resumo_movimentos(data_inicio, data_fim):
+        """
+        Totais do período por tipo. Os dias inteiros vêm da projeção
+        movimento_resumo_diario; só as frações de dia nas pontas são
+        agregadas a partir da tabela movimento.
+        """
+        resumo = {
+            'entrada': {'registros': 0, 'valor': 0.0, 'quantidade': 0},
+            'saida': {'registros': 0, 'valor': 0.0, 'quantidade': 0}
+        }
+
+        def somar(linhas):
+            for tipo, registros, valor, quantidade in linhas:
+                if tipo in resumo:
+                    resumo[tipo]['registros'] += int(registros)
+                    resumo[tipo]['valor'] += float(valor)
+                    resumo[tipo]['quantidade'] += int(quantidade)
+
+        # Primeiro e último dias cobertos por inteiro pelo intervalo
+        primeiro_dia = data_inicio.date()
+        if data_inicio.time() != time.min:
+            primeiro_dia += timedelta(days=1)
+        ultimo_dia = data_fim.date()
+        if data_fim.time() != time.max:
+            ultimo_dia -= timedelta(days=1)
+
+        if primeiro_dia <= ultimo_dia:
+            somar(ResumoService.totais_periodo(primeiro_dia, ultimo_dia))
+            somar(RelatorioService._agregar_movimentos(
+                Movimento.data >= data_inicio,
+                Movimento.data < datetime.combine(primeiro_dia, time.min)
+            ))
+            somar(RelatorioService._agregar_movimentos(
+                Movimento.data >= datetime.combine(ultimo_dia + timedelta(days=1), time.min),
+                Movimento.data <= data_fim
+            ))
+        else:
+            somar(RelatorioService._agregar_movimentos(
+                Movimento.data >= data_inicio,
+                Movimento.data <= data_fim
+            ))
+        return resumo
+
+    @staticmethod
+    def listar_movimentos_periodo(data_inicio, data_fim, pagina=1, por_pagina=None):
+        """Detalhamento do período, paginado, como MovimentoLinha (produto no mesmo SELECT)."""
+        stmt = MovimentoService.selecionar_linhas().where(
             Movimento.data >= data_inicio,
             Movimento.data <= data_fim
-        ).all()
+        ).order_by(Movimento.data.desc(), Movimento.id.desc())
 
-        entradas = [m for m in movimentos if m.tipo == 'entrada']
-        saidas = [m for m in movimentos if m.tipo == 'saida']
+        if por_pagina:
+            pagina = max(int(pagina or 1), 1)
+            stmt = stmt.offset((pagina - 1) * por_pagina).limit(por_pagina)
+        return MovimentoService.ler_linhas(stmt)
 
-        total_entradas = sum(m.valor_total for m in entradas)
-        total_saidas = sum(m.valor_total for m in saidas)
+    @staticmethod
+    def relatorio_movimentos(data_inicio=None, data_fim=None, pagina=1, por_pagina=None):
+        """
+        Relatório de movimentos do período.
+        Os totais vêm sempre da agregação no banco; o detalhamento é paginado
+        quando 'por_pagina' é informado (sem ele, retorna todas as linhas).
+        """
+        if not data_inicio:
+            data_inicio = agora_utc().replace(hour=0, minute=0, second=0, microsecond=0)
+        if not data_fim:
+            data_fim = agora_utc()
+
+        resumo = RelatorioService.resumo_movimentos(data_inicio, data_fim)
+        entradas = resumo['entrada']
+        saidas = resumo['saida']
+
+        total_entradas = entradas['valor']
+        total_saidas = saidas['valor']
+        quantidade_movimentos = entradas['registros'] + saidas['registros']
+
+        movimentos = RelatorioService.listar_movimentos_periodo(data_inicio, data_fim, pagina, por_pagina)
+        pagina = max(int(pagina or 1), 1) if por_pagina else 1
+        paginas = -(-quantidade_movimentos // por_pagina) if por_pagina else 1
 
         return {
             'data_inicio': data_inicio.isoformat(),
@@ -50,36 +191,49 @@ class RelatorioService:
             'total_entradas': total_entradas,
             'total_saidas': total_saidas,
             'lucro': total_saidas - total_entradas,
-            'quantidade_entradas': sum(m.quantidade for m in entradas),
-            'quantidade_saidas': sum(m.quantidade for m in saidas),
+            'quantidade_entradas': entradas['quantidade'],
+            'quantidade_saidas': saidas['quantidade'],
             'movimentos': [m.to_dict() for m in movimentos],
+            'paginacao': {
+                'pagina': pagina,
+                'por_pagina': por_pagina,
+                'total': quantidade_movimentos,
+                'paginas': max(paginas, 1)
+            },
             'resumo': {
                 'total_entradas': total_entradas,
                 'total_saidas': total_saidas,
                 'lucro': total_saidas - total_entradas,
-                'quantidade_movimentos': len(movimentos),
-                'quantidade_entradas': sum(m.quantidade for m in entradas),
-                'quantidade_saidas': sum(m.quantidade for m in saidas)
+                'quantidade_movimentos': quantidade_movimentos,
+                'quantidade_entradas': entradas['quantidade'],
+                'quantidade_saidas': saidas['quantidade']
             }
         }
 
     @staticmethod
-    def relatorio_diario():
-        hoje = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        amanha = hoje + timedelta(days=1)
-        return RelatorioService.relatorio_movimentos(hoje, amanha)
+    def intervalo_periodo(periodo):
+        """Início e fim dos períodos pré-definidos ('dia', 'semana', 'mes')."""
+        agora = agora_utc()
+        if periodo == 'dia':
+            hoje = agora.replace(hour=0, minute=0, second=0, microsecond=0)
+            return hoje, hoje + timedelta(days=1)
+        if periodo == 'semana':
+            return agora - timedelta(days=7), agora
+        if periodo == 'mes':
+            return agora - timedelta(days=30), agora
+        raise ValueError(f"Período inválido: {periodo}")
 
     @staticmethod
-    def relatorio_semanal():
-        hoje = datetime.utcnow()
-        semana_atras = hoje - timedelta(days=7)
-        return RelatorioService.relatorio_movimentos(semana_atras, hoje)
+    def relatorio_diario(pagina=1, por_pagina=None):
+        return RelatorioService.relatorio_movimentos(*RelatorioService.intervalo_periodo('dia'), pagina, por_pagina)
 
     @staticmethod
-    def relatorio_mensal():
-        hoje = datetime.utcnow()
-        mes_atras = hoje - timedelta(days=30)
-        return RelatorioService.relatorio_movimentos(mes_atras, hoje)
+    def relatorio_semanal(pagina=1, por_pagina=None):
+        return RelatorioService.relatorio_movimentos(*RelatorioService.intervalo_periodo('semana'), pagina, por_pagina)
+
+    @staticmethod
+    def relatorio_mensal(pagina=1, por_pagina=None):
+        return RelatorioService.relatorio_movimentos(*RelatorioService.intervalo_periodo('mes'), pagina, por_pagina)
 
     @staticmethod
     def relatorio_caixa(caixa_id=None):
@@ -112,22 +266,26 @@ class RelatorioService:
 
     @staticmethod
     def relatorio_fluxo_diario():
-        hoje = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        hoje = agora_utc().replace(hour=0, minute=0, second=0, microsecond=0)
 
         # Movimentos de estoque
-        movimentos_estoque = Movimento.query.filter(Movimento.data >= hoje).all()
+        movimentos_estoque = MovimentoService.ler_linhas(
+            MovimentoService.selecionar_linhas().where(Movimento.data >= hoje).order_by(Movimento.data, Movimento.id)
+        )
 
         # Movimentos de caixa
         caixa_aberto = Caixa.query.filter_by(status='aberto').first()
         movimentos_caixa = []
         if caixa_aberto:
-            movimentos_caixa = MovimentoCaixa.query.filter(
-                MovimentoCaixa.caixa_id == caixa_aberto.id,
-                MovimentoCaixa.data >= hoje
-            ).all()
+            movimentos_caixa = CaixaService.ler_lancamentos(
+                CaixaService.selecionar_lancamentos()
+                .where(MovimentoCaixa.caixa_id == caixa_aberto.id, MovimentoCaixa.data >= hoje)
+                .order_by(MovimentoCaixa.data, MovimentoCaixa.id)
+            )
 
-        total_vendas = sum(m.valor_total for m in movimentos_estoque if m.tipo == 'saida')
-        total_compras = sum(m.valor_total for m in movimentos_estoque if m.tipo == 'entrada')
+        totais = {tipo: valor for tipo, _, valor, _ in ResumoService.totais_por_tipo(hoje, hoje)}
+        total_vendas = float(totais.get('saida', 0.0))
+        total_compras = float(totais.get('entrada', 0.0))
 
         total_entradas_caixa = sum(m.valor for m in movimentos_caixa if m.tipo == 'entrada')
         total_saidas_caixa = sum(m.valor for m in movimentos_caixa if m.tipo == 'saida')
@@ -146,19 +304,16 @@ class RelatorioService:
 
     @staticmethod
     def dashboard():
-        hoje = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        hoje = agora_utc().replace(hour=0, minute=0, second=0, microsecond=0)
 
         # Estatísticas gerais
         total_produtos = Produto.query.filter_by(ativo=True).count()
-        produtos_estoque_baixo = Produto.query.filter(
-            Produto.qtd <= Produto.estoque_minimo,
-            Produto.ativo == True
-        ).count()
+        produtos_estoque_baixo = Produto.query.filter(Produto.filtro_estoque_baixo()).count()
 
-        # Movimentos do dia
-        movimentos_hoje = Movimento.query.filter(Movimento.data >= hoje).all()
-        vendas_hoje = sum(m.valor_total for m in movimentos_hoje if m.tipo == 'saida')
-        compras_hoje = sum(m.valor_total for m in movimentos_hoje if m.tipo == 'entrada')
+        # Movimentos do dia (projeção diária)
+        totais_hoje = {tipo: valor for tipo, _, valor, _ in ResumoService.totais_por_tipo(hoje, hoje)}
+        vendas_hoje = float(totais_hoje.get('saida', 0.0))
+        compras_hoje = float(totais_hoje.get('entrada', 0.0))
 
         # Caixa
         caixa_aberto = Caixa.query.filter_by(status='aberto').first()
@@ -166,17 +321,18 @@ class RelatorioService:
 
         # Produtos mais vendidos (últimos 7 dias)
         semana_atras = hoje - timedelta(days=7)
-        produtos_mais_vendidos = db.session.query(
-            Produto.nome,
-            func.sum(Movimento.quantidade).label('total')
-        ).join(Movimento).filter(
-            Movimento.tipo == 'saida',
-            Movimento.data >= semana_atras
-        ).group_by(Produto.id).order_by(func.sum(Movimento.quantidade).desc()).limit(5).all()
+        produtos_mais_vendidos = ResumoService.mais_vendidos(semana_atras, limite=5)
 
         # Valor total do estoque
-        produtos_ativos = Produto.query.filter_by(ativo=True).all()
-        valor_total_estoque = sum(p.qtd * p.valor_compra for p in produtos_ativos)
+        valor_total_estoque = db.session.query(
+            func.coalesce(func.sum(Produto.qtd * Produto.valor_compra), 0.0)
+        ).filter(Produto.ativo == True).scalar()
+
+        # Produtos em estoque crítico, os mais urgentes primeiro
+        estoque_critico = [ProdutoResumo(*linha) for linha in db.session.query(
+            Produto.id, Produto.nome, Produto.qtd, Produto.valor_compra,
+            Produto.valor_venda, Produto.estoque_minimo, Produto.ativo
+        ).filter(Produto.filtro_estoque_baixo()).order_by(Produto.qtd.asc(), Produto.nome).limit(LIMITE_ESTOQUE_CRITICO)]
 
         return {
             'total_produtos': total_produtos,
@@ -185,7 +341,8 @@ class RelatorioService:
             'compras_hoje': compras_hoje,
             'lucro_hoje': vendas_hoje - compras_hoje,
             'saldo_caixa': saldo_caixa,
-            'valor_total_estoque': valor_total_estoque,
+            'valor_total_estoque': float(valor_total_estoque),
+            'estoque_critico': estoque_critico,
             'caixa_status': caixa_aberto.status if caixa_aberto else 'fechado',
             'produtos_mais_vendidos': [{'nome': p[0], 'quantidade': p[1]} for p in produtos_mais_vendidos]
         }
@@ -0,0 +1,265 @@
+import os
+import threading
+from datetime import datetime, time, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, inspect
+from flask_sqlalchemy.session import Session
+from app.models import db, Produto, Movimento, MovimentoResumoDiario
+from app.services.catalogo_service import CatalogoService
+from app.utils.versao import ler_versao, trocar_versao
+from app.utils.datas import agora_utc, hoje_utc
+
+
+class CachePeriodos:
+    """Totais por dia dos dias já fechados (anteriores a hoje), por worker."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versao = None
+        self.dias = {}  # date -> tupla de (tipo, registros, valor, quantidade)
+
+
+class ResumoService:
+    """Mantém e consulta a projeção diária movimento_resumo_diario."""
+
+    @staticmethod
+    def _dia(valor):
+        return valor.date() if isinstance(valor, datetime) else valor
+
+    @staticmethod
+    def acumular(movimentos):
+        """
+        Soma os movimentos na projeção diária, na mesma transação de quem registrou.
+        O commit fica a cargo do chamador, como em MovimentoService.
+        """
+        linhas = {}
+        for m in movimentos:
+            dia = ResumoService._dia(m.data or agora_utc())
+            chave = (dia, m.produto_id, m.tipo)
+            linha = linhas.setdefault(chave, {
+                'dia': dia, 'produto_id': m.produto_id, 'tipo': m.tipo,
+                'quantidade': 0, 'valor_total': 0.0, 'registros': 0
+            })
+            linha['quantidade'] += int(m.quantidade)
+            linha['valor_total'] += int(m.quantidade) * float(m.valor_unitario)
+            linha['registros'] += 1
+
+        if linhas:
+            ResumoService._upsert(list(linhas.values()))
+            ResumoService._marcar_dias(dia for dia, _, _ in linhas)
+
+    @staticmethod
+    def _upsert(linhas):
+        tabela = MovimentoResumoDiario.__table__
+        dialeto = db.session.get_bind().dialect.name
+
+        if dialeto in ('sqlite', 'postgresql'):
+            if dialeto == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+
+            stmt = insert(tabela)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['dia', 'produto_id', 'tipo'],
+                set_={
+                    'quantidade': tabela.c.quantidade + stmt.excluded.quantidade,
+                    'valor_total': tabela.c.valor_total + stmt.excluded.valor_total,
+                    'registros': tabela.c.registros + stmt.excluded.registros,
+                }
+            )
+            db.session.execute(stmt, linhas)
+            return
+
+        # Demais bancos: UPDATE e, se a linha ainda não existir, INSERT
+        for linha in linhas:
+            resultado = db.session.execute(
+                tabela.update().where(
+                    tabela.c.dia == linha['dia'],
+                    tabela.c.produto_id == linha['produto_id'],
+                    tabela.c.tipo == linha['tipo']
+                ).values(
+                    quantidade=tabela.c.quantidade + linha['quantidade'],
+                    valor_total=tabela.c.valor_total + linha['valor_total'],
+                    registros=tabela.c.registros + linha['registros']
+                )
+            )
+            if resultado.rowcount == 0:
+                db.session.execute(tabela.insert(), linha)
+
+    @staticmethod
+    def reconstruir(dia_inicio=None, dia_fim=None):
+        """Refaz a projeção a partir da tabela movimento (todo o histórico ou um intervalo de dias)."""
+        tabela = MovimentoResumoDiario.__table__
+        dia_mov = func.date(Movimento.data)
+
+        apagar = tabela.delete()
+        origem = db.session.query(
+            dia_mov,
+            Movimento.produto_id,
+            Movimento.tipo,
+            func.sum(Movimento.quantidade),
+            func.sum(Movimento.quantidade * Movimento.valor_unitario),
+            func.count(Movimento.id)
+        )
+        if dia_inicio:
+            apagar = apagar.where(tabela.c.dia >= dia_inicio)
+            origem = origem.filter(Movimento.data >= datetime.combine(dia_inicio, time.min))
+        if dia_fim:
+            apagar = apagar.where(tabela.c.dia <= dia_fim)
+            origem = origem.filter(Movimento.data < datetime.combine(dia_fim + timedelta(days=1), time.min))
+        origem = origem.filter(Movimento.data.isnot(None)).group_by(dia_mov, Movimento.produto_id, Movimento.tipo)
+
+        try:
+            db.session.execute(apagar)
+            db.session.info['periodos_alterados'] = True
+            resultado = db.session.execute(
+                tabela.insert().from_select(
+                    ['dia', 'produto_id', 'tipo', 'quantidade', 'valor_total', 'registros'],
+                    origem.statement
+                )
+            )
+            db.session.commit()
+            return resultado.rowcount
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+    @staticmethod
+    def totais_por_tipo(dia_inicio, dia_fim):
+        """Linhas (tipo, registros, valor, quantidade) dos dias [dia_inicio, dia_fim]."""
+        return db.session.query(
+            MovimentoResumoDiario.tipo,
+            func.coalesce(func.sum(MovimentoResumoDiario.registros), 0),
+            func.coalesce(func.sum(MovimentoResumoDiario.valor_total), 0.0),
+            func.coalesce(func.sum(MovimentoResumoDiario.quantidade), 0)
+        ).filter(
+            MovimentoResumoDiario.dia >= ResumoService._dia(dia_inicio),
+            MovimentoResumoDiario.dia <= ResumoService._dia(dia_fim)
+        ).group_by(MovimentoResumoDiario.tipo).all()
+
+    @staticmethod
+    def _cache_periodos():
+        return current_app.extensions.setdefault('periodos', CachePeriodos())
+
+    @staticmethod
+    def _arquivo_versao_periodos():
+        # Ao lado da versão do catálogo, no diretório já compartilhado pelos workers
+        return os.path.join(os.path.dirname(CatalogoService._arquivo_versao()), 'periodos.versao')
+
+    @staticmethod
+    def _marcar_dias(dias):
+        """Escrita num dia já fechado: o cache desses dias cai depois do commit."""
+        if any(dia < hoje_utc() for dia in dias):
+            db.session.info['periodos_alterados'] = True
+
+    @staticmethod
+    def invalidar_periodos():
+        """Descarta os dias fechados guardados em todos os workers."""
+        trocar_versao(ResumoService._arquivo_versao_periodos())
+        cache = ResumoService._cache_periodos()
+        with cache.lock:
+            cache.dias.clear()
+
+    @staticmethod
+    def totais_periodo(dia_inicio, dia_fim):
+        """
+        Mesmo resultado de totais_por_tipo, mas os dias fechados vêm do cache:
+        um dia anterior a hoje só é lido da projeção uma vez, e hoje (ou
+        qualquer dia ainda aberto) é sempre agregado na hora. O cache só é
+        descartado quando um movimento retroativo cai num dia fechado.
+        """
+        dia_inicio, dia_fim = ResumoService._dia(dia_inicio), ResumoService._dia(dia_fim)
+        hoje = hoje_utc()
+        fechado_ate = min(dia_fim, hoje - timedelta(days=1))
+
+        totais = {}
+
+        def somar(linhas):
+            for tipo, registros, valor, quantidade in linhas:
+                atual = totais.get(tipo, (0, 0.0, 0))
+                totais[tipo] = (atual[0] + int(registros), atual[1] + float(valor), atual[2] + int(quantidade))
+
+        if dia_inicio <= fechado_ate:
+            cache = ResumoService._cache_periodos()
+            # Versão lida antes das consultas: uma invalidação no meio descarta o que for lido
+            versao = ler_versao(ResumoService._arquivo_versao_periodos())
+            if versao is None:
+                ResumoService.invalidar_periodos()
+                versao = ler_versao(ResumoService._arquivo_versao_periodos())
+
+            with cache.lock:
+                if cache.versao != versao:
+                    cache.dias.clear()
+                    cache.versao = versao
+                dias = dict(cache.dias)
+
+            n_dias = (fechado_ate - dia_inicio).days + 1
+            faltando = [dia_inicio + timedelta(days=i) for i in range(n_dias)]
+            faltando = [dia for dia in faltando if dia not in dias]
+            if faltando:
+                novos = {dia: [] for dia in faltando}
+                for dia, *linha in db.session.query(
+                    MovimentoResumoDiario.dia,
+                    MovimentoResumoDiario.tipo,
+                    func.sum(MovimentoResumoDiario.registros),
+                    func.sum(MovimentoResumoDiario.valor_total),
+                    func.sum(MovimentoResumoDiario.quantidade)
+                ).filter(
+                    MovimentoResumoDiario.dia >= faltando[0],
+                    MovimentoResumoDiario.dia <= faltando[-1]
+                ).group_by(MovimentoResumoDiario.dia, MovimentoResumoDiario.tipo):
+                    if dia in novos:
+                        novos[dia].append(tuple(linha))
+                novos = {dia: tuple(linhas) for dia, linhas in novos.items()}
+                dias.update(novos)
+                with cache.lock:
+                    if cache.versao == versao:
+                        cache.dias.update(novos)
+
+            for i in range(n_dias):
+                somar(dias[dia_inicio + timedelta(days=i)])
+
+        if dia_fim > fechado_ate:
+            somar(ResumoService.totais_por_tipo(max(dia_inicio, hoje), dia_fim))
+
+        return [(tipo, *valores) for tipo, valores in totais.items()]
+
+    @staticmethod
+    def mais_vendidos(desde, limite=5):
+        """Produtos com maior quantidade vendida a partir do dia informado."""
+        total = func.sum(MovimentoResumoDiario.quantidade)
+        return db.session.query(
+            Produto.nome,
+            total.label('total')
+        ).join(
+            MovimentoResumoDiario, MovimentoResumoDiario.produto_id == Produto.id
+        ).filter(
+            MovimentoResumoDiario.tipo == 'saida',
+            MovimentoResumoDiario.dia >= ResumoService._dia(desde)
+        ).group_by(Produto.id, Produto.nome).order_by(total.desc()).limit(limite).all()
+
+
+# Movimentos alterados ou apagados pelo ORM num dia fechado também invalidam
+@event.listens_for(Session, 'after_flush')
+def _movimento_retroativo(session, flush_context):
+    hoje = datetime.combine(hoje_utc(), time.min)
+    for obj in (*session.dirty, *session.deleted):
+        if not isinstance(obj, Movimento):
+            continue
+        # A data atual e a anterior, se ela mudou
+        datas = (obj.data, *inspect(obj).attrs.data.history.deleted)
+        if any(d is not None and d < hoje for d in datas):
+            session.info['periodos_alterados'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_periodos(session):
+    if session.info.pop('periodos_alterados', False) and has_app_context():
+        ResumoService.invalidar_periodos()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_marca_periodos(session):
+    session.info.pop('periodos_alterados', None)
@@ -0,0 +1,294 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from flask import Flask, current_app
+from app.models import db
+from app.services.exportacao_service import COLUNAS_MOVIMENTO, ExportacaoService
+from app.services.relatorio_service import RelatorioService
+
+FORMATOS = ('csv', 'json')
+TIPOS = ('movimentos',)
+ID_VALIDO = re.compile(r'[0-9a-f]{40}')
+
+# Tipos de configuração que vão para os processos do pool (o resto não é serializável)
+_TIPOS_CONFIG = (str, int, float, bool, dict, list, tuple, type(None))
+
+# App mínimo de cada processo do pool (criado em _iniciar_processo)
+_app_processo = None
+
+
+def _caminho_status(pasta, tarefa_id):
+    return os.path.join(pasta, f'{tarefa_id}.status.json')
+
+
+def _gravar_json(caminho, dados):
+    """Grava num temporário e troca: quem lê nunca vê o arquivo pela metade."""
+    temporario = f"{caminho}.{uuid.uuid4().hex}"
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False, default=str)
+    os.replace(temporario, caminho)
+
+
+def _processo_vivo(dono):
+    """False só quando o processo que agendou a tarefa, nesta máquina, já não existe."""
+    if not dono or dono.get('host') != socket.gethostname():
+        return True
+    try:
+        os.kill(dono['pid'], 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _iniciar_processo(configuracao, instance_path):
+    """
+    Initializer do pool: um app Flask só com o banco, sem blueprints, sem
+    create_all e sem os usuários padrão. O engine é criado no próprio
+    processo, nada de conexão herdada do worker.
+    """
+    global _app_processo
+    from app.utils.sqlite import aplicar_pragmas
+
+    app = Flask('app', instance_path=instance_path)
+    app.config.update(configuracao)
+    db.init_app(app)
+    with app.app_context():
+        aplicar_pragmas(db.engine, app.config.get('SQLITE_PRAGMAS'))
+    _app_processo = app
+
+
+def _executar(tarefa_id, pasta):
+    """Roda no processo do pool: gera o arquivo e vai atualizando o progresso."""
+    meta_caminho = _caminho_status(pasta, tarefa_id)
+    with open(meta_caminho, encoding='utf-8') as arquivo:
+        meta = json.load(arquivo)
+
+    with _app_processo.app_context():
+        try:
+            meta.update(status='executando', iniciado_em=time.time())
+            _gravar_json(meta_caminho, meta)
+
+            parametros = meta['parametros']
+            data_inicio = datetime.fromisoformat(parametros['data_inicio'])
+            data_fim = datetime.fromisoformat(parametros['data_fim'])
+            resumo = RelatorioService.resumo_movimentos(data_inicio, data_fim)
+            total = resumo['entrada']['registros'] + resumo['saida']['registros']
+
+            def progresso(linhas):
+                meta.update(linhas=linhas, total=total, progresso=min(int(linhas * 100 / total), 99) if total else 99)
+                _gravar_json(meta_caminho, meta)
+
+            escritas = 0
+
+            def contar(linhas):
+                nonlocal escritas
+                for linha in linhas:
+                    escritas += 1
+                    yield linha
+
+            destino = os.path.join(pasta, f"{tarefa_id}.{meta['formato']}")
+            temporario = f"{destino}.{uuid.uuid4().hex}"
+            linhas = contar(ExportacaoService.linhas_movimentos(data_inicio, data_fim))
+            with open(temporario, 'w', encoding='utf-8', newline='') as arquivo:
+                if meta['formato'] == 'csv':
+                    for pedaco in ExportacaoService.serializar(linhas, COLUNAS_MOVIMENTO, 'csv'):
+                        arquivo.write(pedaco)
+                        progresso(escritas)
+                else:
+                    # JSON em streaming: resumo primeiro, depois os movimentos em pedaços
+                    arquivo.write('{"parametros": %s, "resumo": %s, "movimentos": [' % (
+                        json.dumps(parametros), json.dumps(resumo)
+                    ))
+                    separador = '\n'
+                    for pedaco in ExportacaoService.serializar(linhas, COLUNAS_MOVIMENTO, 'ndjson'):
+                        arquivo.write(separador + pedaco.rstrip('\n').replace('\n', ',\n'))
+                        separador = ',\n'
+                        progresso(escritas)
+                    arquivo.write('\n]}\n')
+            os.replace(temporario, destino)
+
+            meta.update(status='concluido', progresso=100, linhas=escritas, total=total,
+                        concluido_em=time.time(), arquivo=os.path.basename(destino))
+            _gravar_json(meta_caminho, meta)
+        except Exception as e:
+            meta.update(status='erro', erro=str(e), concluido_em=time.time())
+            _gravar_json(meta_caminho, meta)
+            raise
+        finally:
+            db.session.remove()
+
+
+class PoolTarefas:
+    """Pool de processos de um worker (recriado se o worker for um fork novo)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+        self.executor = None
+
+
+class TarefaService:
+    """
+    Relatórios grandes gerados fora da requisição. Cada tarefa é identificada
+    pelo hash dos seus parâmetros, então pedidos iguais (inclusive em workers
+    diferentes) compartilham a mesma execução e o mesmo arquivo. O estado fica
+    em disco, em RELATORIOS_PASTA: <id>.status.json com status e progresso e,
+    ao terminar, <id>.csv ou <id>.json com o resultado.
+    """
+
+    @staticmethod
+    def pasta():
+        pasta = current_app.config.get('RELATORIOS_PASTA') or os.path.join(current_app.instance_path, 'relatorios')
+        os.makedirs(pasta, exist_ok=True)
+        return pasta
+
+    @staticmethod
+    def _pool():
+        pool = current_app.extensions.setdefault('tarefas', PoolTarefas())
+        with pool.lock:
+            if pool.executor is None or pool.pid != os.getpid():
+                configuracao = {
+                    chave: valor for chave, valor in current_app.config.items()
+                    if chave.isupper() and isinstance(valor, _TIPOS_CONFIG)
+                }
+                # O banco de fato em uso (a configuração pode ter sido trocada depois do engine)
+                configuracao['SQLALCHEMY_DATABASE_URI'] = db.engine.url.render_as_string(hide_password=False)
+                pool.executor = ProcessPoolExecutor(
+                    max_workers=current_app.config.get('RELATORIOS_PROCESSOS', 2),
+                    # spawn: o processo novo não herda threads, locks nem conexões do worker
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_iniciar_processo,
+                    initargs=(configuracao, current_app.instance_path)
+                )
+                pool.pid = os.getpid()
+            return pool.executor
+
+    @staticmethod
+    def identificador(tipo, formato, parametros):
+        chave = json.dumps({'tipo': tipo, 'formato': formato, 'parametros': parametros}, sort_keys=True)
+        return hashlib.sha1(chave.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def obter(tarefa_id):
+        """Metadados da tarefa, ou None se ela não existe."""
+        if not ID_VALIDO.fullmatch(tarefa_id or ''):
+            return None
+        caminho = _caminho_status(TarefaService.pasta(), tarefa_id)
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                meta = json.load(arquivo)
+            meta['atualizado_em'] = os.stat(caminho).st_mtime
+            return meta
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # Criada neste instante por outro worker e ainda sem conteúdo
+            return {'id': tarefa_id, 'status': 'pendente', 'progresso': 0, 'atualizado_em': time.time()}
+
+    @staticmethod
+    def _vencida(meta):
+        """Resultado velho demais para reaproveitar, erro ou execução abandonada."""
+        idade = time.time() - meta.get('concluido_em', meta['atualizado_em'])
+        if meta['status'] == 'erro':
+            return True
+        if meta['status'] == 'concluido':
+            return idade > current_app.config.get('RELATORIOS_VALIDADE', 600)
+        if meta['status'] == 'pendente':
+            # Na fila atrás de tarefas longas o arquivo não muda: só está
+            # abandonada se o worker que a agendou (e tem a fila) morreu
+            return not _processo_vivo(meta.get('dono'))
+        # Executando, o progresso regrava o arquivo; parado há muito tempo, o processo morreu
+        return idade > current_app.config.get('RELATORIOS_TEMPO_MAXIMO', 1800)
+
+    @staticmethod
+    def _limpar_vencidas(pasta):
+        """Apaga status e arquivo das tarefas encerradas (concluídas ou com erro) e vencidas."""
+        for nome in os.listdir(pasta):
+            if not nome.endswith('.status.json'):
+                continue
+            meta = TarefaService.obter(nome[:-len('.status.json')])
+            if not meta or meta['status'] not in ('concluido', 'erro') or not TarefaService._vencida(meta):
+                continue
+            for arquivo in (meta.get('arquivo'), nome):
+                if arquivo:
+                    try:
+                        os.unlink(os.path.join(pasta, arquivo))
+                    except FileNotFoundError:
+                        pass  # outro worker limpou antes
+
+    @staticmethod
+    def solicitar(tipo, formato, data_inicio, data_fim):
+        """Cria a tarefa (ou reaproveita uma igual) e retorna seus metadados."""
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo de relatório inválido: {tipo}")
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato inválido: {formato}")
+        if data_inicio > data_fim:
+            raise ValueError("A data inicial deve ser anterior à final")
+
+        parametros = {'data_inicio': data_inicio.isoformat(), 'data_fim': data_fim.isoformat()}
+        tarefa_id = TarefaService.identificador(tipo, formato, parametros)
+        pasta = TarefaService.pasta()
+        caminho = _caminho_status(pasta, tarefa_id)
+        TarefaService._limpar_vencidas(pasta)
+
+        existente = TarefaService.obter(tarefa_id)
+        if existente and not TarefaService._vencida(existente):
+            return existente
+        if existente:
+            try:
+                os.unlink(caminho)
+            except FileNotFoundError:
+                pass
+
+        meta = {
+            'id': tarefa_id, 'tipo': tipo, 'formato': formato, 'parametros': parametros,
+            'status': 'pendente', 'progresso': 0, 'linhas': 0, 'total': None,
+            'criado_em': time.time(), 'erro': None, 'arquivo': None,
+            'dono': {'host': socket.gethostname(), 'pid': os.getpid()}
+        }
+        try:
+            # O_EXCL: entre pedidos simultâneos, só quem cria o arquivo agenda a execução
+            fd = os.open(caminho, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return TarefaService.obter(tarefa_id)
+        with os.fdopen(fd, 'w', encoding='utf-8') as arquivo:
+            json.dump(meta, arquivo, ensure_ascii=False)
+
+        futuro = TarefaService._pool().submit(_executar, tarefa_id, pasta)
+
+        def registrar_falha(futuro):
+            # Processo do pool morto (BrokenProcessPool etc.) antes de gravar o próprio erro
+            erro = futuro.exception()
+            atual = None
+            try:
+                with open(caminho, encoding='utf-8') as arquivo:
+                    atual = json.load(arquivo)
+            except (OSError, ValueError):
+                pass
+            if erro is not None and atual and atual.get('status') not in ('erro', 'concluido'):
+                atual.update(status='erro', erro=str(erro) or erro.__class__.__name__, concluido_em=time.time())
+                _gravar_json(caminho, atual)
+
+        futuro.add_done_callback(registrar_falha)
+        meta['atualizado_em'] = time.time()
+        return meta
+
+    @staticmethod
+    def arquivo_resultado(tarefa_id):
+        """Caminho do resultado de uma tarefa concluída (None se não houver)."""
+        meta = TarefaService.obter(tarefa_id)
+        if not meta or meta['status'] != 'concluido' or not meta.get('arquivo'):
+            return None, meta
+        caminho = os.path.join(TarefaService.pasta(), meta['arquivo'])
+        return (caminho if os.path.exists(caminho) else None), meta
@@ -1,4 +1,10 @@
 from .decorators import login_required, admin_required, gerente_required
+from .paginacao import codificar_cursor, decodificar_cursor
+from .sqlite import aplicar_pragmas, repetir_se_ocupado
+from .versao import ler_versao, trocar_versao
+from .instrumentacao import contar_consultas, instrumentar
+from .processos import descartar_conexoes
+from .datas import agora_utc, hoje_utc
 
 
-__all__ = ['login_required', 'admin_required', 'gerente_required']
+__all__ = ['login_required', 'admin_required', 'gerente_required', 'codificar_cursor', 'decodificar_cursor', 'aplicar_pragmas', 'repetir_se_ocupado', 'ler_versao', 'trocar_versao', 'contar_consultas', 'instrumentar', 'descartar_conexoes', 'agora_utc', 'hoje_utc']
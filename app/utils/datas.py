@@ -0,0 +1,15 @@
+from datetime import datetime
+
+
+def agora_utc():
+    """
+    Data e hora em UTC, sem fuso: o formato gravado nas colunas DateTime.
+    Movimentos, projeção diária e relatórios usam este relógio, para que o
+    "dia" de uma escrita e o de uma consulta sejam sempre o mesmo.
+    """
+    return datetime.utcnow()
+
+
+def hoje_utc():
+    """Dia corrente em UTC (os anteriores são os dias fechados da projeção)."""
+    return agora_utc().date()
@@ -0,0 +1,104 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+
+# Contadores abertos por contar_consultas() no contexto atual (cada thread começa sem nenhum)
+_contadores = ContextVar('contadores_sql', default=())
+
+
+class ContadorConsultas:
+    """Consultas e tempo de banco acumulados (numa requisição ou num bloco)."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo = 0.0  # segundos
+        self.instrucoes = Counter()
+
+    def registrar(self, instrucao, duracao):
+        self.consultas += 1
+        self.tempo += duracao
+        self.instrucoes[instrucao] += 1
+
+    def mais_repetida(self):
+        """(instrução, vezes) da consulta mais repetida: o sinal típico de N+1."""
+        return self.instrucoes.most_common(1)[0] if self.instrucoes else (None, 0)
+
+    def resumo(self):
+        instrucao, vezes = self.mais_repetida()
+        texto = f"{self.consultas} consultas em {self.tempo * 1000:.1f} ms"
+        if vezes > 1:
+            texto += f"; mais repetida ({vezes}x): {' '.join(instrucao.split())[:200]}"
+        return texto
+
+
+@contextmanager
+def contar_consultas():
+    """Conta as consultas feitas neste contexto (requisições do test client inclusive)."""
+    contador = ContadorConsultas()
+    token = _contadores.set(_contadores.get() + (contador,))
+    try:
+        yield contador
+    finally:
+        _contadores.reset(token)
+
+
+def _antes(conn, cursor, instrucao, parametros, contexto, executemany):
+    conn.info['inicio_consulta'] = time.perf_counter()
+
+
+def _depois(conn, cursor, instrucao, parametros, contexto, executemany):
+    inicio = conn.info.pop('inicio_consulta', None)
+    if inicio is None:
+        return
+    duracao = time.perf_counter() - inicio
+    for contador in _contadores.get():
+        contador.registrar(instrucao, duracao)
+    if has_app_context():
+        contador = g.get('sql')
+        if contador is not None:
+            contador.registrar(instrucao, duracao)
+
+
+def instrumentar(app, engine):
+    """
+    Conta as consultas e o tempo de banco de cada requisição pelos eventos do
+    engine, devolve tudo no cabeçalho Server-Timing e registra um aviso quando
+    a requisição passa do orçamento (SQL_ORCAMENTO_CONSULTAS / SQL_ORCAMENTO_MS,
+    ou o par em SQL_ORCAMENTOS[endpoint]). Respostas em streaming só contam o
+    que foi feito antes do primeiro byte.
+    """
+    event.listen(engine, 'before_cursor_execute', _antes)
+    event.listen(engine, 'after_cursor_execute', _depois)
+
+    @app.before_request
+    def _iniciar_contagem():
+        g.sql = ContadorConsultas()
+        g.inicio_requisicao = time.perf_counter()
+
+    @app.after_request
+    def _server_timing(response):
+        contador = g.pop('sql', None)
+        if contador is None:
+            return response
+        total = (time.perf_counter() - g.pop('inicio_requisicao')) * 1000
+        banco = contador.tempo * 1000
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={banco:.1f};desc="{contador.consultas} consultas", app;dur={total:.1f}'
+        )
+
+        config = current_app.config
+        limite_consultas, limite_ms = config.get('SQL_ORCAMENTOS', {}).get(
+            request.endpoint,
+            (config.get('SQL_ORCAMENTO_CONSULTAS', 20), config.get('SQL_ORCAMENTO_MS', 250))
+        )
+        if contador.consultas > limite_consultas or banco > limite_ms:
+            current_app.logger.warning(
+                'Orçamento de SQL excedido em %s %s (%s): %s (limite: %d consultas, %.0f ms)',
+                request.method, request.path, request.endpoint, contador.resumo(), limite_consultas, limite_ms
+            )
+        return response
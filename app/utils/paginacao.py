@@ -0,0 +1,21 @@
+import base64
+import binascii
+from datetime import datetime
+
+
+def codificar_cursor(data, id):
+    """Gera o token opaco de "próxima página" a partir da última linha (data, id)."""
+    bruto = f"{data.isoformat() if data else ''}|{id}"
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(token):
+    """Converte o token de volta em (data, id). Retorna None para tokens inválidos."""
+    if not token:
+        return None
+    try:
+        bruto = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        data_str, id_str = bruto.rsplit('|', 1)
+        return datetime.fromisoformat(data_str), int(id_str)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
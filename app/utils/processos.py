@@ -0,0 +1,18 @@
+from app.models import db
+
+
+def descartar_conexoes(app, fechar=True):
+    """
+    Descarta o pool de conexões de todos os engines do app.
+
+    Com preload_app o gunicorn carrega o app (create_all, usuários padrão)
+    no processo mestre e só depois faz o fork dos workers: as conexões
+    abertas nesse momento seriam herdadas por todos eles, e um socket do
+    PostgreSQL ou um arquivo SQLite usado por dois processos corrompe o
+    protocolo ou as travas. No mestre use fechar=True; no worker recém-criado,
+    fechar=False, para não fechar a conexão que ainda pertence ao mestre.
+    """
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose(close=fechar)
@@ -0,0 +1,50 @@
+import random
+import time
+from functools import wraps
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+
+def aplicar_pragmas(engine, pragmas):
+    """Executa os PRAGMAs em toda conexão nova do engine (só para SQLite)."""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _pragmas(dbapi_conn, _):
+        cursor = dbapi_conn.cursor()
+        for nome, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nome}={valor}')
+        cursor.close()
+
+
+def banco_ocupado(erro):
+    """True para os erros SQLITE_BUSY/SQLITE_LOCKED ("database is locked")."""
+    mensagem = str(getattr(erro, 'orig', erro)).lower()
+    return 'database is locked' in mensagem or 'database is busy' in mensagem
+
+
+def repetir_se_ocupado(f=None, tentativas=5, espera=0.05):
+    """
+    Decorator para repetir uma unidade de trabalho quando o SQLite está ocupado.
+    A função decorada deve conter a transação inteira (alterações + commit):
+    depois de um commit que falhou a sessão é desfeita, então só repetir o
+    commit perderia o que foi feito antes dele.
+    """
+    def decorator(func):
+        @wraps(func)
+        def decorated_function(*args, **kwargs):
+            from app.models import db
+
+            for tentativa in range(tentativas):
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as e:
+                    db.session.rollback()
+                    if not banco_ocupado(e) or tentativa == tentativas - 1:
+                        raise
+                    # Recuo exponencial com jitter para os workers não colidirem de novo
+                    time.sleep(espera * (2 ** tentativa) * (0.5 + random.random()))
+        return decorated_function
+
+    return decorator(f) if f else decorator
@@ -0,0 +1,21 @@
+import os
+import uuid
+
+
+def ler_versao(caminho):
+    """Token da versão guardada num arquivo compartilhado entre os workers (None se não existe)."""
+    try:
+        info = os.stat(caminho)
+        return (info.st_ino, info.st_mtime_ns)
+    except FileNotFoundError:
+        return None
+
+
+def trocar_versao(caminho):
+    """Troca o arquivo de versão; quem comparar com ler_versao vê a mudança."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{uuid.uuid4().hex}"
+    with open(temporario, 'w') as arquivo:
+        arquivo.write(uuid.uuid4().hex)
+    # os.replace gera um inode novo, então a versão muda mesmo no mesmo instante
+    os.replace(temporario, caminho)
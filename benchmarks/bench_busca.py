@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark da busca de produtos por nome.
+
+Popula um banco temporário com N produtos (padrão: 200.000) e mede a latência
+de ProdutoService.buscar_produtos (FTS5/tsvector) contra o ILIKE '%termo%'
+antigo, para termos digitados letra a letra como na caixa de busca HTMX.
+
+Uso:
+    python benchmarks/bench_busca.py [--produtos 200000]
+
+Com DATABASE_URL apontando para um PostgreSQL de testes, mede nele.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PALAVRAS = [
+    'Açúcar', 'Arroz', 'Feijão', 'Café', 'Leite', 'Macarrão', 'Óleo', 'Farinha', 'Sabão',
+    'Biscoito', 'Refrigerante', 'Suco', 'Manteiga', 'Queijo', 'Presunto', 'Pão', 'Molho',
+    'Detergente', 'Amaciante', 'Chocolate', 'Maçã', 'Limão', 'Tomate', 'Cebola', 'Alho',
+]
+MARCAS = ['União', 'Camil', 'Nestlé', 'Piracanjuba', 'Tio João', 'Pilão', 'Ypê', 'Omo', 'Sadia']
+VARIANTES = ['Refinado', 'Integral', 'Tradicional', 'Light', 'Zero', 'Premium', 'Extra', 'Orgânico']
+TERMOS = ['a', 'ac', 'acu', 'acuc', 'acucar', 'acucar u', 'acucar uniao', 'fei', 'feijao camil',
+          'cafe pil', 'maca', 'limao org', 'deterg ype', 'xyz']
+
+
+def preparar_ambiente():
+    if not os.environ.get('DATABASE_URL'):
+        fd, caminho = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        os.environ['DATABASE_URL'] = f'sqlite:///{caminho}'
+        return caminho
+    return None
+
+
+def popular(engine, tabela, n_produtos, lote=20_000):
+    rnd = random.Random(42)
+    for inicio in range(0, n_produtos, lote):
+        with engine.begin() as conn:
+            conn.execute(tabela.insert(), [{
+                'nome': f"{rnd.choice(PALAVRAS)} {rnd.choice(VARIANTES)} {rnd.choice(MARCAS)} {i}",
+                'qtd': rnd.randint(0, 200), 'valor_compra': 10.0, 'valor_venda': 15.0,
+                'estoque_minimo': 5, 'ativo': rnd.random() > 0.1
+            } for i in range(inicio, min(inicio + lote, n_produtos))])
+        print(f"  {min(inicio + lote, n_produtos):,} produtos inseridos", end='\r')
+    print()
+
+
+def medir(funcao, repeticoes=20):
+    funcao()  # aquecimento
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--produtos', type=int, default=200_000)
+    args = parser.parse_args()
+
+    caminho = preparar_ambiente()
+    from app import create_app
+    from app.models import db, Produto
+    from app.services import ProdutoService
+
+    app = create_app()
+    with app.app_context():
+        engine = db.engine
+        print(f"Populando {args.produtos:,} produtos em {engine.url.render_as_string(hide_password=True)}...")
+        popular(engine, Produto.__table__, args.produtos)
+
+        print(f"\n{'termo':16s} {'índice':>10s} {'ILIKE':>10s}  resultados")
+        for termo in TERMOS:
+            indice = medir(lambda: ProdutoService.buscar_produtos(termo, limite=10))
+            ilike = medir(lambda: Produto.query.filter(Produto.nome.ilike(f'%{termo}%')).limit(10).all())
+            encontrados = len(ProdutoService.buscar_produtos(termo, limite=10))
+            print(f"{termo!r:16s} {indice:8.2f} ms {ilike:8.2f} ms  {encontrados}")
+
+    if caminho:
+        os.unlink(caminho)
+
+
+if __name__ == '__main__':
+    main()
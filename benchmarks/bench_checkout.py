@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark do fechamento de venda do PDV (caixa.finalizar).
+
+Compara o caminho antigo (get + refresh + registrar_saida por item) com
+CaixaService.finalizar_venda (um IN, UPDATE condicional por item, INSERT em
+lote e um commit), com vários terminais vendendo ao mesmo tempo.
+Mostra a latência por cesta (mediana e p95), a vazão e as cestas recusadas.
+
+Uso:
+    python benchmarks/bench_checkout.py [--terminais 4] [--cestas 200] [--itens 30]
+
+Com DATABASE_URL apontando para um PostgreSQL de testes, mede nele.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def preparar_ambiente():
+    if not os.environ.get('DATABASE_URL'):
+        fd, caminho = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        os.environ['DATABASE_URL'] = f'sqlite:///{caminho}'
+        return caminho
+    return None
+
+
+def popular(engine, tabelas, n_produtos):
+    with engine.begin() as conn:
+        conn.execute(tabelas['movimento'].delete())
+        conn.execute(tabelas['movimento_resumo_diario'].delete())
+        conn.execute(tabelas['movimento_caixa'].delete())
+        conn.execute(tabelas['caixa'].delete())
+        conn.execute(tabelas['produto'].delete())
+        conn.execute(tabelas['produto'].insert(), [
+            {'id': i, 'nome': f'Produto {i:05d}', 'qtd': 1_000_000, 'valor_compra': 10.0,
+             'valor_venda': 15.0, 'estoque_minimo': 5, 'ativo': True}
+            for i in range(1, n_produtos + 1)
+        ])
+        conn.execute(tabelas['caixa'].insert(), [{'id': 1, 'status': 'aberto', 'saldo_inicial': 0.0}])
+
+
+def venda_legada(caixa_id, itens, forma_pagamento):
+    """Reprodução do laço que existia em caixa.finalizar."""
+    from app.models import db, Produto
+    from app.services import CaixaService, MovimentoService
+
+    total_venda = 0
+    for p_id, qtd_venda in itens:
+        produto = Produto.query.get(p_id)
+        db.session.refresh(produto)
+        if produto.qtd < qtd_venda:
+            db.session.rollback()
+            raise ValueError('Estoque insuficiente')
+        produto.qtd -= qtd_venda
+        total_venda += produto.valor_venda * qtd_venda
+        MovimentoService.registrar_saida(produto.id, qtd_venda, f"Venda PDV - Caixa #{caixa_id}")
+    CaixaService.registrar_venda(caixa_id, total_venda, forma_pagamento)
+    db.session.commit()
+    return total_venda
+
+
+def terminal(app, vender, cestas, n_itens, n_produtos, semente, latencias, erros):
+    from app.models import db
+
+    rnd = random.Random(semente)
+    with app.app_context():
+        for _ in range(cestas):
+            itens = [(rnd.randint(1, n_produtos), rnd.randint(1, 3)) for _ in range(n_itens)]
+            inicio = time.perf_counter()
+            try:
+                vender(1, itens, 'dinheiro')
+                latencias.append(time.perf_counter() - inicio)
+            except Exception:
+                db.session.rollback()
+                erros.append(1)
+        db.session.remove()
+
+
+def medir(app, vender, args):
+    latencias, erros, threads = [], [], []
+    inicio = time.perf_counter()
+    for t in range(args.terminais):
+        thread = threading.Thread(target=terminal, args=(
+            app, vender, args.cestas, args.itens, args.produtos, t, latencias, erros
+        ))
+        threads.append(thread)
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    p95 = latencias[int(len(latencias) * 0.95) - 1] if latencias else 0.0
+    return {
+        'mediana_ms': statistics.median(latencias) * 1000 if latencias else 0.0,
+        'p95_ms': p95 * 1000,
+        'cestas_s': len(latencias) / duracao,
+        'recusadas': len(erros)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--terminais', type=int, default=4)
+    parser.add_argument('--cestas', type=int, default=200, help='Cestas por terminal.')
+    parser.add_argument('--itens', type=int, default=30, help='Itens por cesta.')
+    parser.add_argument('--produtos', type=int, default=2_000)
+    args = parser.parse_args()
+
+    caminho = preparar_ambiente()
+    from app import create_app
+    from app.models import db
+    from app.services import CaixaService
+
+    app = create_app()
+    with app.app_context():
+        engine = db.engine
+        tabelas = db.metadata.tables
+
+    print(f"{args.terminais} terminais x {args.cestas} cestas de {args.itens} itens "
+          f"em {engine.url.render_as_string(hide_password=True)}")
+    for nome, vender in (('legado (por item)', venda_legada), ('finalizar_venda', CaixaService.finalizar_venda)):
+        popular(engine, tabelas, args.produtos)
+        r = medir(app, vender, args)
+        print(f"  {nome:18s} mediana {r['mediana_ms']:8.2f} ms   p95 {r['p95_ms']:8.2f} ms   "
+              f"{r['cestas_s']:8.1f} cestas/s   recusadas {r['recusadas']}")
+
+    if caminho:
+        os.unlink(caminho)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark do dashboard (main.index).
+
+Popula um banco temporário com N produtos e movimentos dos últimos dias e
+mede a latência (mediana e p99) de montar os dados do dashboard com vários
+leitores simultâneos, comparando o caminho antigo (RelatorioService.dashboard
++ listar_produtos a cada requisição) com o snapshot do DashboardService.
+Um escritor registra uma venda no caixa a cada --escrita segundos, para o
+snapshot ser invalidado durante a medição.
+
+Uso:
+    python benchmarks/bench_dashboard.py [--produtos 50000 200000] [--leitores 1 8] [--leituras 100]
+
+Com DATABASE_URL apontando para um PostgreSQL de testes, mede nele.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def preparar_ambiente():
+    if not os.environ.get('DATABASE_URL'):
+        fd, caminho = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        os.environ['DATABASE_URL'] = f'sqlite:///{caminho}'
+        return caminho
+    return None
+
+
+def popular(engine, tabelas, n_produtos, lote=20_000):
+    rnd = random.Random(42)
+    agora = datetime.now()
+    with engine.begin() as conn:
+        for nome in ('movimento_caixa', 'caixa', 'movimento_resumo_diario', 'movimento', 'produto'):
+            conn.execute(tabelas[nome].delete())
+        for inicio in range(0, n_produtos, lote):
+            conn.execute(tabelas['produto'].insert(), [{
+                'id': i, 'nome': f'Produto {i:06d}', 'qtd': rnd.randint(0, 200), 'valor_compra': 10.0,
+                'valor_venda': 15.0, 'estoque_minimo': 5, 'ativo': True
+            } for i in range(inicio + 1, min(inicio + lote, n_produtos) + 1)])
+        movimentos = [{
+            'produto_id': rnd.randint(1, n_produtos), 'tipo': rnd.choice(('entrada', 'saida')),
+            'quantidade': rnd.randint(1, 5), 'valor_unitario': 15.0,
+            'data': agora - timedelta(minutes=rnd.randint(0, 60 * 24 * 10))
+        } for _ in range(n_produtos)]
+        conn.execute(tabelas['movimento'].insert(), movimentos)
+        conn.execute(tabelas['caixa'].insert(), [{'id': 1, 'status': 'aberto', 'saldo_inicial': 0.0}])
+    from app.services import ResumoService
+    ResumoService.reconstruir()
+    from app.models import db
+    db.session.commit()
+
+
+def dashboard_antigo():
+    from app.services import RelatorioService, ProdutoService
+
+    dados = RelatorioService.dashboard()
+    # O template percorria o catálogo inteiro atrás do estoque crítico
+    critico = [p for p in ProdutoService.listar_produtos() if p.qtd <= p.estoque_minimo]
+    return dados, critico
+
+
+def dashboard_snapshot():
+    from app.services import DashboardService
+    return DashboardService.obter()
+
+
+def medir(app, funcao, n_leitores, leituras, intervalo_escrita):
+    from app.models import db
+    from app.services import CaixaService
+
+    latencias = []
+    parar = threading.Event()
+
+    def leitor():
+        with app.app_context():
+            for _ in range(leituras):
+                inicio = time.perf_counter()
+                funcao()
+                latencias.append(time.perf_counter() - inicio)
+                db.session.remove()
+
+    def escritor():
+        with app.app_context():
+            while not parar.wait(intervalo_escrita):
+                CaixaService.registrar_venda(1, 10.0, 'dinheiro')
+                db.session.commit()
+
+    thread_escritor = threading.Thread(target=escritor)
+    thread_escritor.start()
+    leitores = [threading.Thread(target=leitor) for _ in range(n_leitores)]
+    for t in leitores:
+        t.start()
+    for t in leitores:
+        t.join()
+    parar.set()
+    thread_escritor.join()
+
+    latencias.sort()
+    return statistics.median(latencias) * 1000, latencias[int(len(latencias) * 0.99) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--produtos', type=int, nargs='+', default=[50_000, 200_000])
+    parser.add_argument('--leitores', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--leituras', type=int, default=100, help='Leituras por leitor.')
+    parser.add_argument('--escrita', type=float, default=0.5, help='Segundos entre as escritas.')
+    args = parser.parse_args()
+
+    caminho = preparar_ambiente()
+    from app import create_app
+    from app.models import db
+
+    app = create_app()
+    with app.app_context():
+        engine = db.engine
+        tabelas = db.metadata.tables
+
+    print(f"Dashboard em {engine.url.render_as_string(hide_password=True)}")
+    print(f"\n{'produtos':>9s} {'leitores':>8s}  {'antigo (mediana / p99)':>24s}  {'snapshot (mediana / p99)':>26s}")
+    for n_produtos in args.produtos:
+        with app.app_context():
+            popular(engine, tabelas, n_produtos)
+        for n_leitores in args.leitores:
+            antigo = medir(app, dashboard_antigo, n_leitores, max(args.leituras // 10, 5), args.escrita)
+            novo = medir(app, dashboard_snapshot, n_leitores, args.leituras, args.escrita)
+            print(f"{n_produtos:9,d} {n_leitores:8d}  {antigo[0]:9.2f} / {antigo[1]:9.2f} ms  "
+                  f"{novo[0]:11.3f} / {novo[1]:9.3f} ms")
+
+    if caminho:
+        os.unlink(caminho)
+
+
+if __name__ == '__main__':
+    main()
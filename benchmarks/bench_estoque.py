@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark do relatório de estoque (RelatorioService.relatorio_estoque).
+
+Popula um banco temporário com N produtos e compara o caminho antigo (todos
+os produtos ativos carregados, somas e filtro em Python, to_dict de cada um)
+com a agregação no banco (com e sem o cache por versão do catálogo) e com
+uma página ordenada por cada chave, na primeira página e numa do meio.
+
+Uso:
+    python benchmarks/bench_estoque.py [--produtos 100000 500000] [--repeticoes 5]
+
+Com DATABASE_URL apontando para um PostgreSQL de testes, mede nele.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+POR_PAGINA = 50
+
+
+def preparar_ambiente():
+    if not os.environ.get('DATABASE_URL'):
+        fd, caminho = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        os.environ['DATABASE_URL'] = f'sqlite:///{caminho}'
+        return caminho
+    return None
+
+
+def popular(engine, tabela, n_produtos, lote=20_000):
+    rnd = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(tabela.delete())
+        for inicio in range(0, n_produtos, lote):
+            linhas = []
+            for i in range(inicio + 1, min(inicio + lote, n_produtos) + 1):
+                compra = round(rnd.uniform(1, 200), 2)
+                linhas.append({
+                    'id': i, 'nome': f'Produto {i:06d}', 'qtd': rnd.randint(0, 500),
+                    'valor_compra': compra, 'valor_venda': round(compra * rnd.uniform(1.0, 2.5), 2),
+                    'estoque_minimo': rnd.randint(0, 20), 'ativo': rnd.random() > 0.05
+                })
+            conn.execute(tabela.insert(), linhas)
+
+
+def relatorio_antigo():
+    from app.models import Produto
+
+    produtos = Produto.query.filter_by(ativo=True).all()
+    total_valor_estoque = sum(p.qtd * p.valor_compra for p in produtos)
+    total_valor_venda = sum(p.qtd * p.valor_venda for p in produtos)
+    baixo = [p for p in produtos if p.estoque_baixo]
+    return [p.to_dict() for p in produtos], total_valor_estoque, total_valor_venda, len(baixo)
+
+
+def totais_sem_cache():
+    from app.services import CatalogoService, RelatorioService
+
+    CatalogoService.invalidar()
+    return RelatorioService.resumo_estoque()
+
+
+def medir(app, funcao, repeticoes):
+    from app.models import db
+
+    tempos = []
+    with app.app_context():
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append(time.perf_counter() - inicio)
+            db.session.remove()
+    return statistics.median(tempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--produtos', type=int, nargs='+', default=[100_000, 500_000])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    caminho = preparar_ambiente()
+    from app import create_app
+    from app.models import db
+    from app.services import RelatorioService
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        engine = db.engine
+        tabela = db.metadata.tables['produto']
+
+    print(f"Relatório de estoque em {engine.url.render_as_string(hide_password=True)}")
+    for n_produtos in args.produtos:
+        with app.app_context():
+            popular(engine, tabela, n_produtos)
+        meio = max(n_produtos // POR_PAGINA // 2, 1)
+
+        print(f"\n{n_produtos:,d} produtos (mediana de {args.repeticoes})")
+        print(f"  {'antigo (tudo em Python)':32s} {medir(app, relatorio_antigo, max(args.repeticoes // 2, 1)):10.1f} ms")
+        print(f"  {'totais, agregação no banco':32s} {medir(app, totais_sem_cache, args.repeticoes):10.1f} ms")
+        print(f"  {'totais, do cache':32s} {medir(app, RelatorioService.resumo_estoque, args.repeticoes):10.1f} ms")
+        for ordem in ('valor', 'margem', 'cobertura'):
+            for pagina in (1, meio):
+                tempo = medir(app, lambda: RelatorioService.relatorio_estoque(pagina, POR_PAGINA, ordem), args.repeticoes)
+                print(f"  {f'{ordem}, página {pagina}':32s} {tempo:10.1f} ms")
+
+    if caminho:
+        os.unlink(caminho)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark da importação de produtos por CSV.
+
+Gera um CSV com N linhas (padrão: 100.000), importa num banco temporário com
+ImportacaoService.importar_produtos e mede o tempo e o RSS máximo do processo; em
+seguida importa o mesmo arquivo de novo (só atualizações). Para comparar,
+mede ProdutoService.criar_produto (um commit por produto) numa amostra.
+
+Uso:
+    python benchmarks/bench_importacao.py [--linhas 100000] [--lote 1000] [--amostra 1000]
+
+Com DATABASE_URL apontando para um PostgreSQL de testes, mede nele.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def preparar_ambiente():
+    if not os.environ.get('DATABASE_URL'):
+        fd, caminho = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        os.environ['DATABASE_URL'] = f'sqlite:///{caminho}'
+        return caminho
+    return None
+
+
+def gerar_csv(n_linhas):
+    rnd = random.Random(42)
+    fd, caminho = tempfile.mkstemp(suffix='.csv')
+    with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+        f.write('nome;valor_compra;valor_venda;qtd;estoque_minimo\n')
+        for i in range(n_linhas):
+            compra = rnd.uniform(1, 100)
+            f.write(f"Produto Importado {i:06d};{compra:.2f};{compra * 1.4:.2f};{rnd.randint(0, 500)};5\n".replace('.', ','))
+    return caminho
+
+
+def importar(caminho, lote):
+    from app.services import ImportacaoService
+
+    inicio = time.perf_counter()
+    with open(caminho, encoding='utf-8', newline='') as f:
+        resultado = ImportacaoService.importar_produtos(f, lote=lote)
+    duracao = time.perf_counter() - inicio
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB no Linux
+    return resultado, duracao, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--linhas', type=int, default=100_000)
+    parser.add_argument('--lote', type=int, default=1000)
+    parser.add_argument('--amostra', type=int, default=1000)
+    args = parser.parse_args()
+
+    caminho = preparar_ambiente()
+    from app import create_app
+    from app.models import db, Movimento
+    from app.services import ProdutoService
+
+    arquivo = gerar_csv(args.linhas)
+    app = create_app()
+    with app.app_context():
+        print(f"Importando {args.linhas:,} linhas em lotes de {args.lote} "
+              f"({db.engine.url.render_as_string(hide_password=True)})")
+
+        for rodada in ('inserção', 'atualização'):
+            resultado, duracao, pico = importar(arquivo, args.lote)
+            print(f"  {rodada:12s} {duracao:7.2f} s  {args.linhas / duracao:9,.0f} linhas/s  "
+                  f"RSS máx {pico:6.1f} MB  ({resultado.inseridos} inseridos, {resultado.atualizados} atualizados)")
+        print(f"  movimentos gravados: {db.session.query(Movimento).count():,}")
+
+        inicio = time.perf_counter()
+        for i in range(args.amostra):
+            ProdutoService.criar_produto(f'Produto Unitário {i}', 10.0, 15.0, qtd=5)
+        duracao = time.perf_counter() - inicio
+        print(f"  criar_produto {args.amostra} produtos: {duracao:.2f} s  {args.amostra / duracao:,.0f} produtos/s")
+
+    os.unlink(arquivo)
+    if caminho:
+        os.unlink(caminho)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos índices das consultas quentes.
+
+Popula um banco temporário com N movimentos (padrão: 1.000.000), executa as
+consultas de MovimentoService, RelatorioService, CaixaService e ProdutoService
+sem os índices e depois com eles, mostrando o plano de execução e o tempo.
+
+Uso:
+    python benchmarks/bench_indices.py [--movimentos 1000000] [--produtos 5000]
+
+Com DATABASE_URL apontando para um PostgreSQL de testes, usa EXPLAIN do PostgreSQL.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def preparar_ambiente():
+    if not os.environ.get('DATABASE_URL'):
+        fd, caminho = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        os.environ['DATABASE_URL'] = f'sqlite:///{caminho}'
+        return caminho
+    return None
+
+
+def popular(engine, tabelas, n_movimentos, n_produtos, lote=50_000):
+    rnd = random.Random(42)
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(tabelas['produto'].insert(), [
+            {'nome': f'Produto {i:06d}', 'qtd': rnd.randint(0, 200), 'valor_compra': 10.0,
+             'valor_venda': 15.0, 'estoque_minimo': 5, 'ativo': i % 10 != 0}
+            for i in range(n_produtos)
+        ])
+        conn.execute(tabelas['caixa'].insert(), [
+            {'status': 'fechado', 'saldo_inicial': 0.0, 'data_abertura': agora - timedelta(days=d)}
+            for d in range(1, 365)
+        ] + [{'status': 'aberto', 'saldo_inicial': 0.0, 'data_abertura': agora}])
+
+    inseridos = 0
+    while inseridos < n_movimentos:
+        tamanho = min(lote, n_movimentos - inseridos)
+        linhas = [{
+            'produto_id': rnd.randint(1, n_produtos),
+            'tipo': 'saida' if rnd.random() < 0.8 else 'entrada',
+            'quantidade': rnd.randint(1, 10),
+            'valor_unitario': 15.0,
+            'motivo': 'bench',
+            'data': agora - timedelta(seconds=rnd.randint(0, 365 * 86400)),
+        } for _ in range(tamanho)]
+        with engine.begin() as conn:
+            conn.execute(tabelas['movimento'].insert(), linhas)
+            conn.execute(tabelas['movimento_caixa'].insert(), [{
+                'caixa_id': rnd.randint(1, 365), 'tipo': 'entrada', 'categoria': 'venda',
+                'descricao': 'bench', 'valor': 15.0, 'data': linha['data']
+            } for linha in linhas[:tamanho // 10]])
+        inseridos += tamanho
+        print(f"  {inseridos:,} movimentos inseridos", end='\r')
+    print()
+
+
+def consultas():
+    from sqlalchemy import select, func
+    from app.models import Produto, Movimento, Caixa, MovimentoCaixa
+
+    hoje = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    semana_atras = hoje - timedelta(days=7)
+    return {
+        'listar_movimentos(produto)': select(Movimento).where(
+            Movimento.produto_id == 7, Movimento.data >= hoje - timedelta(days=30)
+        ).order_by(Movimento.data.desc()).limit(100),
+        'dashboard: movimentos de hoje': select(Movimento).where(Movimento.data >= hoje),
+        'dashboard: mais vendidos (7 dias)': select(
+            Movimento.produto_id, func.sum(Movimento.quantidade)
+        ).where(Movimento.tipo == 'saida', Movimento.data >= semana_atras).group_by(Movimento.produto_id),
+        'relatorio_movimentos (30 dias)': select(
+            Movimento.tipo, func.sum(Movimento.quantidade * Movimento.valor_unitario)
+        ).where(Movimento.data >= hoje - timedelta(days=30), Movimento.data <= hoje).group_by(Movimento.tipo),
+        'movimentos do caixa': select(MovimentoCaixa).where(
+            MovimentoCaixa.caixa_id == 3, MovimentoCaixa.data >= hoje - timedelta(days=5)
+        ),
+        'obter_caixa_aberto': select(Caixa).where(Caixa.status == 'aberto').limit(1),
+        'listar_produtos': select(Produto).where(Produto.ativo == True).order_by(Produto.nome),
+    }
+
+
+def plano(conn, stmt):
+    compilado = stmt.compile(dialect=conn.dialect)
+    prefixo = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    params = compilado.params
+    if conn.dialect.name == 'sqlite':
+        params = tuple(params[k] for k in compilado.positiontup)
+    linhas = conn.exec_driver_sql(prefixo + str(compilado), params).fetchall()
+    return ' | '.join(str(l[-1]) for l in linhas)
+
+
+def medir(engine, stmt, repeticoes=5):
+    with engine.connect() as conn:
+        conn.execute(stmt).fetchall()  # aquecimento
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            conn.execute(stmt).fetchall()
+            tempos.append(time.perf_counter() - inicio)
+        return sorted(tempos)[len(tempos) // 2] * 1000, plano(conn, stmt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--movimentos', type=int, default=1_000_000)
+    parser.add_argument('--produtos', type=int, default=5_000)
+    args = parser.parse_args()
+
+    caminho = preparar_ambiente()
+    from sqlalchemy import text
+    from app import create_app
+    from app.models import db
+
+    app = create_app()
+    with app.app_context():
+        engine = db.engine
+        tabelas = db.metadata.tables
+        indices = [ix for t in ('movimento', 'movimento_caixa', 'caixa', 'produto') for ix in tabelas[t].indexes]
+
+        print(f"Populando {args.movimentos:,} movimentos em {engine.url.render_as_string(hide_password=True)}...")
+        popular(engine, tabelas, args.movimentos, args.produtos)
+
+        resultados = {}
+        for fase in ('sem índices', 'com índices'):
+            for ix in indices:
+                if fase == 'sem índices':
+                    ix.drop(bind=engine, checkfirst=True)
+                else:
+                    ix.create(bind=engine, checkfirst=True)
+            with engine.begin() as conn:
+                conn.execute(text('ANALYZE'))
+            for nome, stmt in consultas().items():
+                resultados.setdefault(nome, {})[fase] = medir(engine, stmt)
+
+        for nome, fases in resultados.items():
+            (antes, plano_antes), (depois, plano_depois) = fases['sem índices'], fases['com índices']
+            print(f"\n{nome}")
+            print(f"  sem índices: {antes:9.2f} ms  {plano_antes}")
+            print(f"  com índices: {depois:9.2f} ms  {plano_depois}")
+
+    if caminho:
+        os.unlink(caminho)
+
+
+if __name__ == '__main__':
+    main()
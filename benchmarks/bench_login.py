@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark da vazão de login por worker.
+
+Cria usuários num banco temporário e mede quantos logins por segundo um
+processo atende com várias threads (como um worker gthread), comparando o
+caminho antigo (check_password_hash na thread da requisição + commit de
+ultimo_acesso a cada login) com AuthService.autenticar (hash no pool de
+SENHA_HASH_THREADS e ultimo_acesso em buffer), para cada método de hash.
+
+Uso:
+    python benchmarks/bench_login.py [--usuarios 50] [--logins 200] [--threads 1 4]
+        [--metodos scrypt:32768:8:1 pbkdf2:sha256:600000 pbkdf2:sha256:50000]
+
+Com DATABASE_URL apontando para um PostgreSQL de testes, mede nele.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def preparar_ambiente():
+    if not os.environ.get('DATABASE_URL'):
+        fd, caminho = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        os.environ['DATABASE_URL'] = f'sqlite:///{caminho}'
+        return caminho
+    return None
+
+
+def popular(app, n_usuarios, metodo):
+    from werkzeug.security import generate_password_hash
+    from app.models import db, Usuario
+
+    app.config['SENHA_HASH_METODO'] = metodo
+    senha_hash = generate_password_hash('senha123', method=metodo)
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(Usuario.__table__.delete().where(Usuario.__table__.c.username.like('bench_%')))
+            conn.execute(Usuario.__table__.insert(), [{
+                'username': f'bench_{i}', 'senha_hash': senha_hash, 'nome_completo': f'Usuário {i}',
+                'email': f'bench_{i}@teste.com', 'tipo': 'operador', 'ativo': True
+            } for i in range(n_usuarios)])
+
+
+def login_legado(username, senha):
+    """Reprodução do AuthService.autenticar antigo."""
+    from app.models import db, Usuario
+
+    usuario = Usuario.query.filter_by(username=username, ativo=True).first()
+    if usuario and usuario.verificar_senha(senha):
+        usuario.ultimo_acesso = datetime.utcnow()
+        db.session.commit()
+        return usuario
+    return None
+
+
+def medir(app, autenticar, n_usuarios, logins, n_threads):
+    from app.models import db
+
+    def trabalhador(indice):
+        with app.app_context():
+            for i in range(indice, logins, n_threads):
+                assert autenticar(f'bench_{i % n_usuarios}', 'senha123') is not None
+                db.session.remove()
+
+    threads = [threading.Thread(target=trabalhador, args=(i,)) for i in range(n_threads)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return logins / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--usuarios', type=int, default=50)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--metodos', nargs='+',
+                        default=['scrypt:32768:8:1', 'pbkdf2:sha256:600000', 'pbkdf2:sha256:50000'])
+    args = parser.parse_args()
+
+    caminho = preparar_ambiente()
+    from app import create_app
+    from app.services import AuthService
+
+    app = create_app()
+    print(f"{args.logins} logins de {args.usuarios} usuários, SENHA_HASH_THREADS={app.config['SENHA_HASH_THREADS']}")
+    print(f"\n{'método':24s} {'threads':>7s} {'antigo':>12s} {'novo':>12s}")
+    for metodo in args.metodos:
+        popular(app, args.usuarios, metodo)
+        for n_threads in args.threads:
+            antigo = medir(app, login_legado, args.usuarios, args.logins, n_threads)
+            novo = medir(app, AuthService.autenticar, args.usuarios, args.logins, n_threads)
+            print(f"{metodo:24s} {n_threads:7d} {antigo:8.1f} /s {novo:8.1f} /s")
+
+    with app.app_context():
+        AuthService.descarregar_acessos(forcar=True)
+    if caminho:
+        os.unlink(caminho)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos totais de período dos relatórios (RelatorioService.resumo_movimentos).
+
+Popula um banco temporário com movimentos espalhados por --dias dias e mede,
+para janelas de 1, 30 e 365 dias terminando agora, o caminho anterior (soma
+de movimento_resumo_diario a cada requisição) e o cache de dias fechados do
+ResumoService, frio (primeira leitura) e quente.
+
+Uso:
+    python benchmarks/bench_periodos.py [--produtos 2000] [--movimentos 1000000] [--dias 400]
+
+Com DATABASE_URL apontando para um PostgreSQL de testes, mede nele.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def preparar_ambiente():
+    if not os.environ.get('DATABASE_URL'):
+        fd, caminho = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        os.environ['DATABASE_URL'] = f'sqlite:///{caminho}'
+        return caminho
+    return None
+
+
+def popular(engine, tabelas, n_produtos, n_movimentos, n_dias, lote=50_000):
+    rnd = random.Random(42)
+    agora = datetime.now()
+    with engine.begin() as conn:
+        for nome in ('movimento_resumo_diario', 'movimento', 'produto'):
+            conn.execute(tabelas[nome].delete())
+        conn.execute(tabelas['produto'].insert(), [{
+            'id': i, 'nome': f'Produto {i:06d}', 'qtd': 100, 'valor_compra': 10.0,
+            'valor_venda': 15.0, 'estoque_minimo': 5, 'ativo': True
+        } for i in range(1, n_produtos + 1)])
+        for inicio in range(0, n_movimentos, lote):
+            conn.execute(tabelas['movimento'].insert(), [{
+                'produto_id': rnd.randint(1, n_produtos), 'tipo': rnd.choice(('entrada', 'saida')),
+                'quantidade': rnd.randint(1, 5), 'valor_unitario': 15.0,
+                'data': agora - timedelta(minutes=rnd.randint(0, 60 * 24 * n_dias))
+            } for _ in range(min(lote, n_movimentos - inicio))])
+    from app.services import ResumoService
+    ResumoService.reconstruir()
+
+
+def medir(app, funcao, repeticoes, antes=None):
+    from app.models import db
+
+    tempos = []
+    with app.app_context():
+        for _ in range(repeticoes):
+            if antes:
+                antes()
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append(time.perf_counter() - inicio)
+            db.session.remove()
+    return statistics.median(tempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--produtos', type=int, default=2_000)
+    parser.add_argument('--movimentos', type=int, default=1_000_000)
+    parser.add_argument('--dias', type=int, default=400)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    caminho = preparar_ambiente()
+    from app import create_app
+    from app.models import db
+    from app.services import RelatorioService, ResumoService
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        engine = db.engine
+        print(f"Totais de período em {engine.url.render_as_string(hide_password=True)}")
+        popular(engine, db.metadata.tables, args.produtos, args.movimentos, args.dias)
+
+    def resumo(dias, anterior=False):
+        def executar():
+            fim = datetime.now()
+            if anterior:
+                # Caminho anterior: soma da projeção inteira a cada chamada
+                original = ResumoService.totais_periodo
+                ResumoService.totais_periodo = ResumoService.totais_por_tipo
+                try:
+                    return RelatorioService.resumo_movimentos(fim - timedelta(days=dias), fim)
+                finally:
+                    ResumoService.totais_periodo = original
+            return RelatorioService.resumo_movimentos(fim - timedelta(days=dias), fim)
+        return executar
+
+    print(f"\n{'janela':>8s}  {'anterior':>10s}  {'cache frio':>10s}  {'cache quente':>12s}")
+    for dias in (1, 30, 365):
+        anterior = medir(app, resumo(dias, anterior=True), args.repeticoes)
+        frio = medir(app, resumo(dias), args.repeticoes, antes=ResumoService.invalidar_periodos)
+        quente = medir(app, resumo(dias), args.repeticoes)
+        print(f"{dias:6d} d  {anterior:8.1f} ms  {frio:8.1f} ms  {quente:10.1f} ms")
+
+    if caminho:
+        os.unlink(caminho)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concorrência do SQLite: perfil padrão x perfil de produção.
+
+Sobe N processos escritores (vendas pelo CaixaService.finalizar_venda) e M
+processos leitores (RelatorioService.relatorio_movimentos dos últimos 30 dias)
+contra o mesmo arquivo, como vários workers do gunicorn. Roda uma vez com a
+configuração de desenvolvimento (SQLite de fábrica) e outra com a de produção
+(WAL, synchronous=NORMAL, busy_timeout...), cada uma num banco novo.
+
+Uso:
+    python benchmarks/bench_sqlite.py [--escritores 4] [--leitores 2] [--segundos 10]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PERFIS = {'padrão': 'development', 'produção': 'production'}
+
+
+def iniciar_app(caminho, perfil):
+    # Antes de qualquer import de `app`: o config lê o ambiente na importação
+    os.environ['DATABASE_URL'] = f'sqlite:///{caminho}'
+    os.environ['FLASK_ENV'] = perfil
+    from app import create_app
+    return create_app()
+
+
+def popular(caminho, perfil, n_produtos, n_movimentos):
+    app = iniciar_app(caminho, perfil)
+    from app.models import db
+    with app.app_context():
+        tabelas = db.metadata.tables
+        rnd = random.Random(42)
+        agora = datetime.utcnow()
+        with db.engine.begin() as conn:
+            conn.execute(tabelas['produto'].insert(), [
+                {'id': i, 'nome': f'Produto {i:05d}', 'qtd': 10_000_000, 'valor_compra': 10.0,
+                 'valor_venda': 15.0, 'estoque_minimo': 5, 'ativo': True}
+                for i in range(1, n_produtos + 1)
+            ])
+            conn.execute(tabelas['caixa'].insert(), [{'id': 1, 'status': 'aberto', 'saldo_inicial': 0.0}])
+            conn.execute(tabelas['movimento'].insert(), [{
+                'produto_id': rnd.randint(1, n_produtos), 'tipo': 'saida', 'quantidade': 1,
+                'valor_unitario': 15.0, 'motivo': 'bench',
+                'data': agora - timedelta(seconds=rnd.randint(0, 30 * 86400))
+            } for _ in range(n_movimentos)])
+        db.engine.dispose()
+
+
+def escritor(caminho, perfil, segundos, n_produtos, semente, fila):
+    app = iniciar_app(caminho, perfil)
+    from app.models import db
+    from app.services import CaixaService
+
+    rnd = random.Random(semente)
+    latencias, travados = [], 0
+    ate = time.time() + segundos
+    with app.app_context():
+        while time.time() < ate:
+            itens = [(rnd.randint(1, n_produtos), 1) for _ in range(5)]
+            inicio = time.perf_counter()
+            try:
+                CaixaService.finalizar_venda(1, itens, 'dinheiro')
+                latencias.append(time.perf_counter() - inicio)
+            except Exception:
+                db.session.rollback()
+                travados += 1
+    fila.put(('escrita', latencias, travados))
+
+
+def leitor(caminho, perfil, segundos, fila):
+    app = iniciar_app(caminho, perfil)
+    from app.models import db
+    from app.services import RelatorioService
+
+    latencias, travados = [], 0
+    ate = time.time() + segundos
+    with app.app_context():
+        while time.time() < ate:
+            inicio = time.perf_counter()
+            try:
+                # Mesma consulta da tela de relatórios: totais do período + 1ª página
+                RelatorioService.relatorio_movimentos(
+                    datetime.utcnow() - timedelta(days=30), datetime.utcnow(), pagina=1, por_pagina=50
+                )
+                latencias.append(time.perf_counter() - inicio)
+            except Exception:
+                db.session.rollback()
+                travados += 1
+            db.session.remove()
+    fila.put(('leitura', latencias, travados))
+
+
+def resumo(latencias):
+    if not latencias:
+        return '      sem operações concluídas'
+    latencias = sorted(latencias)
+    p95 = latencias[max(int(len(latencias) * 0.95) - 1, 0)]
+    return f"{len(latencias):7d} ops  mediana {statistics.median(latencias) * 1000:8.2f} ms  p95 {p95 * 1000:8.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--escritores', type=int, default=4)
+    parser.add_argument('--leitores', type=int, default=2)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--produtos', type=int, default=2_000)
+    parser.add_argument('--movimentos', type=int, default=200_000)
+    args = parser.parse_args()
+
+    # Cada processo cria o próprio engine, como um worker do gunicorn sem preload
+    contexto = multiprocessing.get_context('spawn')
+
+    for nome, perfil in PERFIS.items():
+        fd, caminho = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        carga = contexto.Process(target=popular, args=(caminho, perfil, args.produtos, args.movimentos))
+        carga.start()
+        carga.join()
+
+        fila = contexto.Queue()
+        processos = [contexto.Process(target=escritor, args=(caminho, perfil, args.segundos, args.produtos, i, fila))
+                     for i in range(args.escritores)]
+        processos += [contexto.Process(target=leitor, args=(caminho, perfil, args.segundos, fila))
+                      for _ in range(args.leitores)]
+        for p in processos:
+            p.start()
+
+        resultados = {'escrita': ([], 0), 'leitura': ([], 0)}
+        for _ in processos:
+            tipo, latencias, travados = fila.get()
+            acumulado, erros = resultados[tipo]
+            resultados[tipo] = (acumulado + latencias, erros + travados)
+        for p in processos:
+            p.join()
+
+        print(f"\nPerfil {nome} ({args.escritores} escritores, {args.leitores} leitores, {args.segundos:.0f} s)")
+        for tipo, (latencias, travados) in resultados.items():
+            print(f"  {tipo:8s} {resumo(latencias)}  'database is locked': {travados}")
+
+        for sufixo in ('', '-wal', '-shm'):
+            if os.path.exists(caminho + sufixo):
+                os.unlink(caminho + sufixo)
+
+
+if __name__ == '__main__':
+    main()
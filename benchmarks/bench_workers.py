@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos modelos de worker do gunicorn com a carga do PDV.
+
+Roda benchmarks/carga_pdv.py uma vez para cada --worker-class (sync, gthread
+e gevent), com o mesmo banco inicial, os mesmos terminais e a mesma duração,
+e compara a vazão total, a latência das ações principais (busca, finalizar
+venda, relatórios, entrada em lote), a taxa de erro/banco travado e a
+consistência final. Cada rodada usa o gunicorn.conf.py (preload_app e
+descarte das conexões depois do fork).
+
+  sync     --workers processos, uma requisição por vez cada
+  gthread  --workers processos x --threads threads
+  gevent   --workers processos x --conexoes greenlets (pulado sem o gevent)
+
+Uso:
+    python benchmarks/bench_workers.py [--classes sync gthread gevent] [--workers 2]
+        [--threads 4] [--conexoes 100] [--duracao 20] [--operadores 4] [--gerentes 1]
+        [--recebimento 1] [--hash-senha pbkdf2:sha256:1000] [--json resultado.json]
+
+Com DATABASE_URL apontando para um PostgreSQL de testes, mede nele.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ACOES = ['operador.buscar', 'operador.finalizar', 'gerente.relatorio', 'recebimento.entrada_lote']
+
+
+def rodar(classe, args):
+    """Executa uma rodada do carga_pdv.py e devolve o JSON do resumo (ou None se falhou)."""
+    fd, saida = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    comando = [
+        sys.executable, os.path.join(RAIZ, 'benchmarks', 'carga_pdv.py'), '--worker-class', classe,
+        '--workers', str(args.workers), '--threads', str(args.threads), '--conexoes', str(args.conexoes),
+        '--duracao', str(args.duracao), '--operadores', str(args.operadores), '--gerentes', str(args.gerentes),
+        '--recebimento', str(args.recebimento), '--hash-senha', args.hash_senha, '--json', saida,
+    ]
+    print(f"\n=== {classe} ===", flush=True)
+    # Código 1 = divergências, que entram no resumo; outros códigos são falha da rodada
+    if subprocess.run(comando, cwd=RAIZ).returncode not in (0, 1):
+        return None
+    try:
+        with open(saida, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+    finally:
+        os.unlink(saida)
+
+
+def comparar(resultados, args):
+    concorrencia = {
+        'sync': f"{args.workers} x 1",
+        'gthread': f"{args.workers} x {args.threads}",
+        'gevent': f"{args.workers} x {args.conexoes}",
+    }
+    print(f"\n{'worker':8s} {'conc.':>8s} {'req/s':>7s} " + ' '.join(f"{a.split('.')[1] + ' p95':>19s}" for a in ACOES)
+          + f" {'erro':>6s} {'diverg.':>7s}")
+    for classe, resultado in resultados.items():
+        if resultado is None:
+            print(f"{classe:8s} {'—':>8s} (não rodou)")
+            continue
+        acoes = resultado['acoes']
+        total = sum(linha['n'] for linha in acoes.values())
+        falhas = sum((linha['erros'] + linha['bloqueios']) * linha['n'] for linha in acoes.values())
+        latencias = ' '.join(
+            f"{acoes[a]['p95_ms']:17.1f}ms" if a in acoes else f"{'—':>19s}" for a in ACOES
+        )
+        print(f"{classe:8s} {concorrencia[classe]:>8s} {total / resultado['decorrido']:7.1f} {latencias} "
+              f"{falhas / total if total else 0:6.1%} {len(resultado['divergencias']):7d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--classes', nargs='+', default=['sync', 'gthread', 'gevent'],
+                        choices=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--conexoes', type=int, default=100)
+    parser.add_argument('--duracao', type=float, default=20)
+    parser.add_argument('--operadores', type=int, default=4)
+    parser.add_argument('--gerentes', type=int, default=1)
+    parser.add_argument('--recebimento', type=int, default=1)
+    parser.add_argument('--hash-senha', default='pbkdf2:sha256:1000',
+                        help='SENHA_HASH_METODO das rodadas (barato, para o login não dominar a carga).')
+    parser.add_argument('--json', help='Arquivo para gravar os resumos de todas as rodadas.')
+    args = parser.parse_args()
+
+    resultados = {}
+    for classe in args.classes:
+        if classe == 'gevent' and importlib.util.find_spec('gevent') is None:
+            print("\n=== gevent ===\ngevent não instalado (pip install gevent); rodada pulada.")
+            resultados[classe] = None
+            continue
+        resultados[classe] = rodar(classe, args)
+
+    comparar(resultados, args)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump({'parametros': vars(args), 'rodadas': resultados}, arquivo, indent=2)
+
+    falhou = any(r is None or r['divergencias'] for c, r in resultados.items()
+                 if not (c == 'gevent' and importlib.util.find_spec('gevent') is None))
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == '__main__':
+    main()
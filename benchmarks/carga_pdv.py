@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Teste de carga com terminais de PDV contra o app no gunicorn.
+
+Popula um banco (produtos, caixa aberto e um usuário por terminal), sobe
+`gunicorn run:app` com o gunicorn.conf.py do Procfile (--worker-class,
+--workers, --threads) e dispara processos clientes, cada um simulando uma
+pessoa logada:
+
+  operador     busca produto, adiciona de 1 a 5 itens (caixa.adicionar_item)
+               e finaliza a venda (caixa.finalizar, seguindo o redirect)
+  gerente      abre o dashboard (/) e os relatórios (/relatorios/*)
+  recebimento  lança entradas de mercadoria em lote (/movimentos/lote)
+
+Os produtos são sorteados com popularidade desigual (1/posição), para que
+os itens mais vendidos concorram pelas mesmas linhas. Ao final mostra a vazão
+e a latência (p50/p95/p99) por ação, as taxas de erro e de banco travado,
+e confere a consistência: produto.qtd contra o saldo inicial mais o livro de
+movimentos, saldo do caixa contra movimento_caixa, a projeção diária contra
+os movimentos e as vendas confirmadas aos terminais contra as gravadas.
+
+Uso:
+    python benchmarks/carga_pdv.py [--operadores 4] [--gerentes 1] [--recebimento 1]
+        [--duracao 30] [--workers 2] [--threads 4] [--worker-class gthread] [--produtos 500] [--pausa 0.0]
+        [--hash-senha pbkdf2:sha256:1000] [--gunicorn "--timeout 60"] [--json resultado.json]
+
+Com DATABASE_URL apontando para um PostgreSQL de testes, mede nele.
+"""
+import argparse
+import http.cookiejar
+import json
+import multiprocessing
+import os
+import random
+import shlex
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+SENHA = 'carga123'
+TERMOS = ['Arroz', 'Feijão', 'Café', 'Leite', 'Óleo', 'Macarrão', 'Açúcar', 'Sabão']
+RELATORIOS = [
+    '/relatorios/estoque', '/relatorios/estoque?ordem=cobertura', '/relatorios/movimentos?periodo=dia',
+    '/relatorios/movimentos?periodo=semana', '/relatorios/movimentos?periodo=mes',
+    '/relatorios/fluxo-diario', '/relatorios/caixa',
+]
+
+
+def preparar_ambiente():
+    if not os.environ.get('DATABASE_URL'):
+        fd, caminho = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        os.environ['DATABASE_URL'] = f'sqlite:///{caminho}'
+        return caminho
+    return None
+
+
+def popular(app, args):
+    """Recria os dados da carga e retorna o saldo inicial de cada produto."""
+    from werkzeug.security import generate_password_hash
+    from app.models import db
+    from app.services import CatalogoService, DashboardService
+
+    rnd = random.Random(42)
+    tabelas = db.metadata.tables
+    usuarios = tabelas['usuario']
+    senha_hash = generate_password_hash(SENHA, method=app.config['SENHA_HASH_METODO'])
+
+    with app.app_context():
+        with db.engine.begin() as conn:
+            for nome in ('movimento_caixa', 'caixa', 'movimento_resumo_diario', 'movimento', 'produto'):
+                conn.execute(tabelas[nome].delete())
+            conn.execute(usuarios.delete().where(usuarios.c.username.like('carga_%')))
+
+            saldos = {i: rnd.randint(200, 2000) for i in range(1, args.produtos + 1)}
+            conn.execute(tabelas['produto'].insert(), [{
+                'id': i, 'nome': f"{rnd.choice(TERMOS)} {i:05d}", 'qtd': qtd, 'valor_compra': 10.0,
+                'valor_venda': 15.0, 'estoque_minimo': 20, 'ativo': True
+            } for i, qtd in saldos.items()])
+            conn.execute(tabelas['caixa'].insert(), [{'id': 1, 'status': 'aberto', 'saldo_inicial': 0.0}])
+            conn.execute(usuarios.insert(), [{
+                'username': f'carga_{papel}_{i}', 'senha_hash': senha_hash, 'nome_completo': f'Carga {papel} {i}',
+                'email': f'carga_{papel}_{i}@teste.com', 'ativo': True,
+                'tipo': 'gerente' if papel == 'gerente' else 'operador'
+            } for papel, n in papeis(args) for i in range(n)])
+
+        CatalogoService.invalidar()
+        DashboardService.invalidar()
+        db.session.remove()
+        db.engine.dispose()
+    return saldos
+
+
+def papeis(args):
+    return [('operador', args.operadores), ('gerente', args.gerentes), ('recebimento', args.recebimento)]
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def iniciar_gunicorn(args, porta, log):
+    # gunicorn.conf.py (preload, reciclagem dos workers) vale também aqui; a linha de comando tem precedência
+    comando = [
+        sys.executable, '-m', 'gunicorn', 'run:app', '--bind', f'127.0.0.1:{porta}',
+        '--workers', str(args.workers), '--worker-class', args.worker_class,
+        '--threads', str(args.threads if args.worker_class == 'gthread' else 1),
+        '--worker-connections', str(args.conexoes),
+    ] + shlex.split(args.gunicorn or '')
+    ambiente = dict(os.environ, GUNICORN_WORKER_CLASS=args.worker_class)
+    processo = subprocess.Popen(comando, cwd=RAIZ, env=ambiente, stdout=log, stderr=subprocess.STDOUT)
+
+    limite = time.time() + 60
+    while time.time() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"gunicorn saiu com código {processo.returncode}; veja {log.name}")
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{porta}/auth/login', timeout=2).read()
+            return processo
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.3)
+    processo.terminate()
+    raise RuntimeError(f"gunicorn não respondeu em 60 s; veja {log.name}")
+
+
+class Cliente:
+    """Sessão HTTP de um terminal (cookies do Flask-Login) registrando cada ação."""
+
+    def __init__(self, base, registros):
+        self.base = base
+        self.registros = registros
+        self.abridor = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def requisitar(self, caminho, dados=None, json_corpo=None):
+        cabecalhos = {}
+        if json_corpo is not None:
+            corpo = json.dumps(json_corpo).encode()
+            cabecalhos['Content-Type'] = 'application/json'
+        elif dados is not None:
+            corpo = urllib.parse.urlencode(dados, doseq=True).encode()
+        else:
+            corpo = None
+        pedido = urllib.request.Request(self.base + caminho, data=corpo, headers=cabecalhos)
+        try:
+            with self.abridor.open(pedido, timeout=60) as resposta:
+                return resposta.status, resposta.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+        except (urllib.error.URLError, OSError) as e:
+            return 0, str(e).encode()
+
+    def acao(self, papel, nome, caminho, dados=None, json_corpo=None, classificar=None):
+        inicio = time.perf_counter()
+        status, corpo = self.requisitar(caminho, dados, json_corpo)
+        duracao = time.perf_counter() - inicio
+
+        if b'locked' in corpo or b'could not serialize' in corpo or b'deadlock' in corpo:
+            resultado = 'bloqueio'
+        elif status == 0 or status >= 500:
+            resultado = 'erro'
+        elif classificar:
+            resultado = classificar(status, corpo)
+        else:
+            resultado = 'ok' if status < 400 else 'erro'
+        self.registros.append((papel, nome, duracao, resultado))
+        return resultado, corpo
+
+
+def _venda(status, corpo):
+    if 'finalizada com sucesso'.encode() in corpo:
+        return 'ok'
+    if 'Estoque insuficiente'.encode() in corpo:
+        return 'recusada'
+    return 'erro'
+
+
+def _item(status, corpo):
+    if status == 200:
+        return 'ok'
+    return 'recusada' if status in (400, 404) else 'erro'
+
+
+def _lote(status, corpo):
+    if status == 200:
+        return 'ok'
+    return 'recusada' if status == 422 else 'erro'
+
+
+def terminal(papel, indice, base, n_produtos, duracao, pausa, semente, fila):
+    """Processo cliente: faz login e repete o roteiro do papel até o fim da duração."""
+    rnd = random.Random(semente)
+    ids = list(range(1, n_produtos + 1))
+    acumulados = []
+    soma = 0.0
+    for posicao in range(n_produtos):
+        soma += 1 / (posicao + 1)
+        acumulados.append(soma)
+
+    def sortear():
+        return rnd.choices(ids, cum_weights=acumulados)[0]
+
+    registros = []
+    vendas = []  # (total de itens, valor) das vendas confirmadas
+    cliente = Cliente(base, registros)
+    cliente.acao(papel, 'login', '/auth/login', {'username': f'carga_{papel}_{indice}', 'senha': SENHA})
+
+    fim = time.time() + duracao
+    while time.time() < fim:
+        if papel == 'operador':
+            cliente.acao(papel, 'buscar', '/produtos/search?q=' + urllib.parse.quote(rnd.choice(TERMOS)))
+            carrinho = []
+            for _ in range(rnd.randint(1, 5)):
+                produto_id, quantidade = sortear(), rnd.randint(1, 3)
+                resultado, _ = cliente.acao(papel, 'adicionar_item', '/caixa/adicionar_item', {
+                    'produto_id': produto_id, 'quantidade': quantidade
+                }, classificar=_item)
+                if resultado == 'ok':
+                    carrinho.append((produto_id, quantidade))
+            if carrinho:
+                resultado, _ = cliente.acao(papel, 'finalizar', '/caixa/finalizar', {
+                    'produto_ids[]': [p for p, _ in carrinho],
+                    'quantidades[]': [q for _, q in carrinho],
+                    'forma_pagamento': rnd.choice(['dinheiro', 'cartao', 'pix'])
+                }, classificar=_venda)
+                if resultado == 'ok':
+                    vendas.append(sum(q for _, q in carrinho))
+        elif papel == 'gerente':
+            caminho = '/' if rnd.random() < 0.4 else rnd.choice(RELATORIOS)
+            cliente.acao(papel, 'dashboard' if caminho == '/' else 'relatorio', caminho)
+        else:
+            linhas = [{'produto_id': sortear(), 'quantidade': rnd.randint(10, 50), 'valor_unitario': 10.0}
+                      for _ in range(rnd.randint(1, 10))]
+            cliente.acao(papel, 'entrada_lote', '/movimentos/lote', json_corpo={
+                'tipo': 'entrada', 'motivo': 'Recebimento (carga)', 'linhas': linhas
+            }, classificar=_lote)
+        if pausa:
+            time.sleep(rnd.uniform(0, 2 * pausa))
+
+    fila.put((registros, vendas))
+
+
+def percentil(valores, p):
+    return valores[min(int(len(valores) * p), len(valores) - 1)]
+
+
+def relatorio(registros, duracao):
+    por_acao = defaultdict(list)
+    for papel, nome, tempo, resultado in registros:
+        por_acao[(papel, nome)].append((tempo, resultado))
+
+    print(f"\n{'papel':12s} {'ação':15s} {'n':>6s} {'req/s':>7s} {'p50':>8s} {'p95':>8s} {'p99':>8s} "
+          f"{'máx':>8s} {'recus.':>7s} {'erro':>6s} {'trav.':>6s}")
+    resumo = {}
+    for (papel, nome), medidas in sorted(por_acao.items()):
+        tempos = sorted(t * 1000 for t, _ in medidas)
+        contagem = defaultdict(int)
+        for _, resultado in medidas:
+            contagem[resultado] += 1
+        n = len(medidas)
+        linha = {
+            'n': n, 'por_segundo': n / duracao, 'p50_ms': statistics.median(tempos),
+            'p95_ms': percentil(tempos, 0.95), 'p99_ms': percentil(tempos, 0.99), 'max_ms': tempos[-1],
+            'recusadas': contagem['recusada'] / n, 'erros': contagem['erro'] / n, 'bloqueios': contagem['bloqueio'] / n,
+        }
+        resumo[f'{papel}.{nome}'] = linha
+        print(f"{papel:12s} {nome:15s} {n:6d} {linha['por_segundo']:7.1f} {linha['p50_ms']:8.1f} "
+              f"{linha['p95_ms']:8.1f} {linha['p99_ms']:8.1f} {linha['max_ms']:8.1f} "
+              f"{linha['recusadas']:7.1%} {linha['erros']:6.1%} {linha['bloqueios']:6.1%}")
+
+    total = len(registros)
+    falhas = sum(1 for *_, r in registros if r in ('erro', 'bloqueio'))
+    print(f"\nTotal: {total} requisições em {duracao:.0f} s ({total / duracao:.1f} req/s), "
+          f"{falhas} com erro ou banco travado ({falhas / total if total else 0:.2%})")
+    return resumo
+
+
+def conferir(app, saldos, vendas_confirmadas):
+    """Compara o estado final do banco com o livro de movimentos. Retorna a lista de divergências."""
+    from sqlalchemy import case, func, select
+    from app.models import db, Caixa, Movimento, MovimentoCaixa, MovimentoResumoDiario, Produto
+
+    divergencias = []
+    with app.app_context():
+        sinal = case((Movimento.tipo == 'entrada', Movimento.quantidade), else_=-Movimento.quantidade)
+        livro = dict(db.session.execute(
+            select(Movimento.produto_id, func.sum(sinal)).group_by(Movimento.produto_id)
+        ).all())
+        atuais = dict(db.session.execute(select(Produto.id, Produto.qtd)).all())
+        for produto_id, inicial in saldos.items():
+            esperado = inicial + (livro.get(produto_id) or 0)
+            if atuais.get(produto_id) != esperado:
+                divergencias.append(f"produto {produto_id}: qtd {atuais.get(produto_id)}, livro {esperado}")
+            if (atuais.get(produto_id) or 0) < 0:
+                divergencias.append(f"produto {produto_id}: estoque negativo ({atuais[produto_id]})")
+
+        caixa = db.session.get(Caixa, 1)
+        entradas = db.session.execute(select(func.coalesce(func.sum(MovimentoCaixa.valor), 0.0)).where(
+            MovimentoCaixa.caixa_id == 1, MovimentoCaixa.tipo == 'entrada'
+        )).scalar()
+        if abs((caixa.soma_entradas or 0.0) - entradas) > 0.005:
+            divergencias.append(f"caixa: soma_entradas {caixa.soma_entradas:.2f}, movimento_caixa {entradas:.2f}")
+
+        por_tipo = dict(db.session.execute(
+            select(Movimento.tipo, func.sum(Movimento.quantidade)).group_by(Movimento.tipo)
+        ).all())
+        projecao = dict(db.session.execute(
+            select(MovimentoResumoDiario.tipo, func.sum(MovimentoResumoDiario.quantidade)).group_by(MovimentoResumoDiario.tipo)
+        ).all())
+        for tipo in ('entrada', 'saida'):
+            if (por_tipo.get(tipo) or 0) != (projecao.get(tipo) or 0):
+                divergencias.append(f"resumo diário ({tipo}): {projecao.get(tipo) or 0}, movimentos {por_tipo.get(tipo) or 0}")
+
+        vendas_gravadas = db.session.execute(select(func.count(MovimentoCaixa.id)).where(
+            MovimentoCaixa.caixa_id == 1, MovimentoCaixa.descricao.like('Venda PDV%')
+        )).scalar()
+        if vendas_gravadas != vendas_confirmadas:
+            divergencias.append(f"vendas: {vendas_confirmadas} confirmadas aos terminais, {vendas_gravadas} gravadas")
+
+        print(f"\nConsistência: {len(saldos)} produtos, {sum(abs(v) for v in livro.values() if v)} unidades movimentadas, "
+              f"{vendas_gravadas} vendas gravadas")
+        db.session.remove()
+    return divergencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--operadores', type=int, default=4)
+    parser.add_argument('--gerentes', type=int, default=1)
+    parser.add_argument('--recebimento', type=int, default=1)
+    parser.add_argument('--duracao', type=float, default=30, help='Segundos de carga.')
+    parser.add_argument('--pausa', type=float, default=0.0, help='Pausa média entre ações, em segundos.')
+    parser.add_argument('--produtos', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4, help='Threads por worker gthread.')
+    parser.add_argument('--worker-class', default='gthread', choices=['gthread', 'sync', 'gevent'])
+    parser.add_argument('--conexoes', type=int, default=100, help='Conexões por worker gevent.')
+    parser.add_argument('--hash-senha', help='SENHA_HASH_METODO do teste (um hash barato isola o login da carga).')
+    parser.add_argument('--gunicorn', help='Argumentos extras para o gunicorn, entre aspas.')
+    parser.add_argument('--json', help='Arquivo para gravar o resumo.')
+    args = parser.parse_args()
+
+    caminho = preparar_ambiente()
+    if args.hash_senha:
+        os.environ['SENHA_HASH_METODO'] = args.hash_senha
+    from app import create_app
+
+    app = create_app()
+    saldos = popular(app, args)
+    porta = porta_livre()
+    base = f'http://127.0.0.1:{porta}'
+
+    log = tempfile.NamedTemporaryFile('w+', prefix='gunicorn-', suffix='.log', delete=False)
+    print(f"Banco: {app.config['SQLALCHEMY_DATABASE_URI'].split('@')[-1]}")
+    print(f"gunicorn em {base}: {args.workers} workers {args.worker_class} x {args.threads} threads (log em {log.name})")
+    servidor = iniciar_gunicorn(args, porta, log)
+
+    contexto = multiprocessing.get_context('spawn')
+    fila = contexto.Queue()
+    processos = []
+    for papel, n in papeis(args):
+        for i in range(n):
+            processos.append(contexto.Process(target=terminal, args=(
+                papel, i, base, args.produtos, args.duracao, args.pausa, f"{papel}-{i}", fila
+            )))
+    print(f"{len(processos)} terminais por {args.duracao:.0f} s...")
+
+    registros, vendas = [], 0
+    try:
+        inicio = time.time()
+        for processo in processos:
+            processo.start()
+        for _ in processos:
+            parciais, confirmadas = fila.get()
+            registros.extend(parciais)
+            vendas += len(confirmadas)
+        for processo in processos:
+            processo.join()
+        decorrido = time.time() - inicio
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=30)
+
+    resumo = relatorio(registros, decorrido)
+    divergencias = conferir(app, saldos, vendas)
+    for divergencia in divergencias[:20]:
+        print(f"  DIVERGÊNCIA {divergencia}")
+    print("Estoque, caixa e projeção consistentes." if not divergencias else f"{len(divergencias)} divergências.")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump({'parametros': vars(args), 'decorrido': decorrido, 'acoes': resumo, 'divergencias': divergencias}, arquivo, indent=2)
+
+    log.close()
+    if caminho:
+        os.unlink(caminho)
+    sys.exit(1 if divergencias else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Suíte de benchmarks com linha de base, para pegar regressões de desempenho.
+
+Para cada escala (número de movimentos), popula um banco temporário com
+semente fixa: escala/10 produtos (mínimo 1.000), 90 dias de histórico, um
+caixa aberto e um usuário. Mede então cada caso com aquecimento e repetições
+(time.perf_counter) e guarda a mediana, o p95, o mínimo e o número de consultas
+SQL de uma execução. Os casos cobrem listagem e busca do catálogo, o fechamento
+de venda (caixa.finalizar), entrada e saída, todos os relatórios do
+RelatorioService e o login. As leituras rodam antes das escritas.
+
+Uso:
+    python benchmarks/suite.py [--escalas 10000 100000 1000000] [--repeticoes 15]
+        [--aquecimento 3] [--casos relatorio caixa] [--saida resultados.json] [--base base.json]
+    python benchmarks/suite.py --comparar resultados.json --base base.json [--tolerancia 0.25]
+
+Para gravar a linha de base, rode na máquina de referência com --saida
+apontando para o arquivo da base. Com --base, os resultados são comparados a
+ela e o script sai com código 1 se houver regressão: mediana acima da base em
+mais que --tolerancia (e em mais que --piso-ms em valor absoluto), ou mais
+consultas SQL que na base. A contagem de consultas não depende da máquina.
+
+Com DATABASE_URL apontando para um PostgreSQL de testes, mede nele.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PALAVRAS = ['Arroz', 'Feijão', 'Açúcar', 'Café', 'Leite', 'Óleo', 'Macarrão', 'Farinha', 'Sabão', 'Biscoito']
+MARCAS = ['Tio João', 'Camil', 'União', 'Pilão', 'Italac', 'Liza', 'Renata', 'Dona Benta', 'Ypê', 'Piraquê']
+SENHA = 'senha123'
+DIAS_HISTORICO = 90
+POR_PAGINA = 50
+
+
+def preparar_ambiente():
+    if not os.environ.get('DATABASE_URL'):
+        fd, caminho = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        os.environ['DATABASE_URL'] = f'sqlite:///{caminho}'
+        return caminho
+    return None
+
+
+def n_produtos(escala):
+    return max(escala // 10, 1000)
+
+
+def popular(app, escala, lote=50_000):
+    from werkzeug.security import generate_password_hash
+    from app.models import db
+    from app.services import ResumoService, CatalogoService, DashboardService
+
+    rnd = random.Random(42)
+    agora = datetime.now()
+    total_produtos = n_produtos(escala)
+    tabelas = db.metadata.tables
+
+    with db.engine.begin() as conn:
+        for nome in ('movimento_caixa', 'caixa', 'movimento_resumo_diario', 'movimento', 'produto'):
+            conn.execute(tabelas[nome].delete())
+        conn.execute(tabelas['usuario'].delete().where(tabelas['usuario'].c.username == 'bench'))
+
+        for inicio in range(0, total_produtos, lote):
+            conn.execute(tabelas['produto'].insert(), [{
+                'id': i, 'nome': f"{rnd.choice(PALAVRAS)} {rnd.choice(MARCAS)} {i:07d}",
+                'qtd': rnd.randint(0, 200) + 1_000_000, 'valor_compra': round(rnd.uniform(1, 50), 2),
+                'valor_venda': round(rnd.uniform(51, 100), 2), 'estoque_minimo': rnd.randint(0, 20),
+                'ativo': rnd.random() > 0.05
+            } for i in range(inicio + 1, min(inicio + lote, total_produtos) + 1)])
+
+        for inicio in range(0, escala, lote):
+            conn.execute(tabelas['movimento'].insert(), [{
+                'produto_id': rnd.randint(1, total_produtos), 'tipo': rnd.choice(('entrada', 'saida')),
+                'quantidade': rnd.randint(1, 5), 'valor_unitario': 15.0, 'motivo': 'Benchmark',
+                'data': agora - timedelta(minutes=rnd.randint(0, 60 * 24 * DIAS_HISTORICO))
+            } for _ in range(min(lote, escala - inicio))])
+            print(f"  {min(inicio + lote, escala):,} movimentos inseridos", end='\r')
+        print()
+
+        conn.execute(tabelas['caixa'].insert(), [{'id': 1, 'status': 'aberto', 'saldo_inicial': 0.0}])
+        conn.execute(tabelas['usuario'].insert(), [{
+            'username': 'bench', 'nome_completo': 'Benchmark', 'email': 'bench@teste.com', 'tipo': 'operador',
+            'ativo': True, 'senha_hash': generate_password_hash(SENHA, method=app.config['SENHA_HASH_METODO'])
+        }])
+
+    ResumoService.reconstruir()
+    db.session.commit()
+    CatalogoService.invalidar()
+    DashboardService.invalidar()
+
+
+def casos(escala):
+    """Nome -> função de uma execução. Cada caso sorteia seus argumentos com semente própria."""
+    from app.services import (
+        AuthService, CaixaService, CatalogoService, MovimentoService, ProdutoService, RelatorioService
+    )
+
+    total_produtos = n_produtos(escala)
+    agora = datetime.now()
+    sorteios = {}
+
+    def rnd(nome):
+        return sorteios.setdefault(nome, random.Random(nome))
+
+    def produto(nome):
+        return rnd(nome).randint(1, total_produtos)
+
+    return {
+        'catalogo.listar': lambda: ProdutoService.listar_produtos(),
+        'catalogo.listar_sem_cache': lambda: (CatalogoService.invalidar(), ProdutoService.listar_produtos()),
+        'catalogo.buscar': lambda: ProdutoService.buscar_produtos(rnd('buscar').choice(PALAVRAS + MARCAS)),
+        'relatorio.resumo_estoque': lambda: RelatorioService.resumo_estoque(),
+        'relatorio.estoque': lambda: RelatorioService.relatorio_estoque(1, POR_PAGINA, 'valor'),
+        'relatorio.estoque_cobertura': lambda: RelatorioService.relatorio_estoque(3, POR_PAGINA, 'cobertura'),
+        'relatorio.diario': lambda: RelatorioService.relatorio_diario(1, POR_PAGINA),
+        'relatorio.semanal': lambda: RelatorioService.relatorio_semanal(1, POR_PAGINA),
+        'relatorio.mensal': lambda: RelatorioService.relatorio_mensal(1, POR_PAGINA),
+        'relatorio.periodo': lambda: RelatorioService.relatorio_movimentos(
+            agora - timedelta(days=DIAS_HISTORICO), agora, 2, POR_PAGINA
+        ),
+        'relatorio.resumo_movimentos': lambda: RelatorioService.resumo_movimentos(
+            agora - timedelta(days=DIAS_HISTORICO), agora
+        ),
+        'relatorio.caixa': lambda: RelatorioService.relatorio_caixa(),
+        'relatorio.fluxo_diario': lambda: RelatorioService.relatorio_fluxo_diario(),
+        'relatorio.dashboard': lambda: RelatorioService.dashboard(),
+        'caixa.finalizar': lambda: CaixaService.finalizar_venda(
+            1, [(produto('finalizar'), 1) for _ in range(5)], 'dinheiro'
+        ),
+        'movimentos.entrada': lambda: MovimentoService.registrar_lote(
+            'entrada', [(produto('entrada'), 3, None)], motivo='Benchmark'
+        ),
+        'movimentos.saida': lambda: MovimentoService.registrar_lote(
+            'saida', [(produto('saida'), 1, None)], motivo='Benchmark', caixa_id=1, forma_pagamento='dinheiro'
+        ),
+        'auth.login': lambda: AuthService.autenticar('bench', SENHA),
+    }
+
+
+def medir(app, funcao, aquecimento, repeticoes):
+    from app.models import db
+    from app.utils.instrumentacao import contar_consultas
+
+    tempos = []
+    with app.app_context():
+        for _ in range(aquecimento):
+            funcao()
+            db.session.remove()
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append(time.perf_counter() - inicio)
+            db.session.remove()
+        with contar_consultas() as contador:
+            funcao()
+        db.session.remove()
+
+    tempos.sort()
+    return {
+        'mediana_ms': statistics.median(tempos) * 1000,
+        'p95_ms': tempos[math.ceil(len(tempos) * 0.95) - 1] * 1000,  # posição mais próxima
+        'min_ms': tempos[0] * 1000,
+        'repeticoes': repeticoes,
+        'consultas': contador.consultas,
+    }
+
+
+def metadados(engine, args):
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    import sqlalchemy
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'banco': engine.dialect.name,
+        'python': platform.python_version(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'aquecimento': args.aquecimento,
+        'repeticoes': args.repeticoes,
+    }
+
+
+def comparar(atual, base, tolerancia, piso_ms):
+    """Imprime a comparação caso a caso e retorna a lista de regressões."""
+    regressoes = []
+    print(f"\nComparação com a base de {base['meta'].get('data')} (commit {base['meta'].get('commit')}, "
+          f"{base['meta'].get('banco')}); tolerância {tolerancia:.0%}, piso {piso_ms} ms")
+    print(f"{'escala':>9s}  {'caso':28s} {'base (ms)':>10s} {'atual (ms)':>10s} {'razão':>7s} {'consultas':>11s}")
+    for escala, resultados in atual['resultados'].items():
+        for nome, medida in resultados.items():
+            referencia = base['resultados'].get(escala, {}).get(nome)
+            if referencia is None:
+                print(f"{int(escala):9,d}  {nome:28s} {'-':>10s} {medida['mediana_ms']:10.2f}    nova")
+                continue
+            razao = medida['mediana_ms'] / referencia['mediana_ms'] if referencia['mediana_ms'] else float('inf')
+            problemas = []
+            if razao > 1 + tolerancia and medida['mediana_ms'] - referencia['mediana_ms'] > piso_ms:
+                problemas.append(f"mediana {razao:.2f}x")
+            if medida['consultas'] > referencia['consultas']:
+                problemas.append(f"consultas {referencia['consultas']} -> {medida['consultas']}")
+            marca = '  REGRESSÃO: ' + ', '.join(problemas) if problemas else ''
+            print(f"{int(escala):9,d}  {nome:28s} {referencia['mediana_ms']:10.2f} {medida['mediana_ms']:10.2f} "
+                  f"{razao:6.2f}x {referencia['consultas']:5d} -> {medida['consultas']:<3d}{marca}")
+            if problemas:
+                regressoes.append((escala, nome, problemas))
+    return regressoes
+
+
+def executar(args):
+    caminho = preparar_ambiente()
+    from app import create_app
+    from app.models import db
+
+    app = create_app()
+    # Sem Server-Timing nem avisos de orçamento no meio da medição
+    app.config['SQL_ORCAMENTO_CONSULTAS'] = float('inf')
+    app.config['SQL_ORCAMENTO_MS'] = float('inf')
+    with app.app_context():
+        engine = db.engine
+
+    resultado = {'meta': metadados(engine, args), 'resultados': {}}
+    print(f"Suíte em {engine.url.render_as_string(hide_password=True)}")
+    try:
+        for escala in args.escalas:
+            print(f"\nEscala: {escala:,} movimentos, {n_produtos(escala):,} produtos")
+            with app.app_context():
+                popular(app, escala)
+                todos = casos(escala)
+            selecionados = {
+                nome: funcao for nome, funcao in todos.items()
+                if not args.casos or any(nome.startswith(prefixo) for prefixo in args.casos)
+            }
+            medidas = resultado['resultados'].setdefault(str(escala), {})
+            print(f"  {'caso':28s} {'mediana':>9s} {'p95':>9s} {'mín':>9s} {'consultas':>9s}")
+            for nome, funcao in selecionados.items():
+                medida = medir(app, funcao, args.aquecimento, args.repeticoes)
+                medidas[nome] = medida
+                print(f"  {nome:28s} {medida['mediana_ms']:9.2f} {medida['p95_ms']:9.2f} "
+                      f"{medida['min_ms']:9.2f} {medida['consultas']:9d}")
+    finally:
+        from app.services import AuthService
+        with app.app_context():
+            # Os acessos do login ficam em buffer: grava antes de apagar o banco
+            AuthService.descarregar_acessos(forcar=True)
+            db.engine.dispose()
+        if caminho:
+            os.unlink(caminho)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+        print(f"\nResultados gravados em {args.saida}")
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--escalas', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help='Quantidades de movimentos a popular.')
+    parser.add_argument('--repeticoes', type=int, default=15)
+    parser.add_argument('--aquecimento', type=int, default=3)
+    parser.add_argument('--casos', nargs='*', help="Prefixos dos casos a medir (ex.: relatorio caixa.finalizar).")
+    parser.add_argument('--saida', help='Arquivo JSON para gravar os resultados.')
+    parser.add_argument('--comparar', metavar='RESULTADOS', help='Só compara um arquivo de resultados com a base.')
+    parser.add_argument('--base', help='Linha de base (JSON de uma execução anterior).')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='Aumento relativo da mediana tolerado.')
+    parser.add_argument('--piso-ms', type=float, default=1.0, help='Diferença absoluta abaixo da qual não é regressão.')
+    args = parser.parse_args()
+
+    if args.comparar:
+        if not args.base:
+            parser.error('--comparar exige --base')
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            atual = json.load(arquivo)
+    else:
+        atual = executar(args)
+
+    if args.base:
+        with open(args.base, encoding='utf-8') as arquivo:
+            base = json.load(arquivo)
+        regressoes = comparar(atual, base, args.tolerancia, args.piso_ms)
+        if regressoes:
+            print(f"\n{len(regressoes)} regressão(ões) em relação à base.")
+            sys.exit(1)
+        print("\nSem regressões em relação à base.")
+
+
+if __name__ == '__main__':
+    main()
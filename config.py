@@ -10,12 +10,90 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
 
+    # Cache do catálogo de produtos (ver app/services/catalogo_service.py).
+    # O arquivo de versão precisa ser visível a todos os workers; o TTL limita
+    # o tempo de dados velhos se houver mais de uma máquina.
+    CATALOGO_VERSAO_ARQUIVO = os.environ.get('CATALOGO_VERSAO_ARQUIVO')
+    CATALOGO_CACHE_TTL = int(os.environ.get('CATALOGO_CACHE_TTL', 300))
+
+    # Snapshot do dashboard: recalculado em segundo plano depois de
+    # DASHBOARD_INTERVALO segundos ou de uma escrita; acima de
+    # DASHBOARD_IDADE_MAXIMA a requisição espera o recálculo.
+    DASHBOARD_INTERVALO = int(os.environ.get('DASHBOARD_INTERVALO', 10))
+    DASHBOARD_IDADE_MAXIMA = int(os.environ.get('DASHBOARD_IDADE_MAXIMA', 60))
+
+    # Eventos ao vivo (/eventos). 'arquivo' distribui entre os workers da
+    # mesma máquina por um log compartilhado; 'memoria' só dentro do processo.
+    # Cada conexão SSE segura uma thread: use workers gthread no gunicorn.
+    EVENTOS_BROKER = os.environ.get('EVENTOS_BROKER', 'arquivo')
+    EVENTOS_ARQUIVO = os.environ.get('EVENTOS_ARQUIVO')  # padrão: instance/eventos.log
+    EVENTOS_INTERVALO = float(os.environ.get('EVENTOS_INTERVALO', 0.25))
+    EVENTOS_MAX_BYTES = int(os.environ.get('EVENTOS_MAX_BYTES', 1024 * 1024))
+    EVENTOS_HEARTBEAT = int(os.environ.get('EVENTOS_HEARTBEAT', 15))
+    EVENTOS_DURACAO_MAXIMA = int(os.environ.get('EVENTOS_DURACAO_MAXIMA', 300))
+
+    # Relatórios em segundo plano (ver app/services/tarefa_service.py): cada
+    # worker tem um pool de RELATORIOS_PROCESSOS processos; resultados iguais
+    # são reaproveitados por RELATORIOS_VALIDADE segundos e uma tarefa sem
+    # progresso há RELATORIOS_TEMPO_MAXIMO segundos é dada como abandonada.
+    RELATORIOS_PASTA = os.environ.get('RELATORIOS_PASTA')  # padrão: instance/relatorios
+    RELATORIOS_PROCESSOS = int(os.environ.get('RELATORIOS_PROCESSOS', 2))
+    RELATORIOS_VALIDADE = int(os.environ.get('RELATORIOS_VALIDADE', 600))
+    RELATORIOS_TEMPO_MAXIMO = int(os.environ.get('RELATORIOS_TEMPO_MAXIMO', 1800))
+
+    # Instrumentação de SQL por requisição (app/utils/instrumentacao.py): o
+    # cabeçalho Server-Timing traz consultas e tempo de banco, e requisições
+    # acima do orçamento geram um aviso no log. SQL_ORCAMENTOS ajusta o limite
+    # por endpoint: {'relatorios.estoque': (consultas, ms)}.
+    SQL_INSTRUMENTACAO = os.environ.get('SQL_INSTRUMENTACAO', '1') == '1'
+    SQL_ORCAMENTO_CONSULTAS = int(os.environ.get('SQL_ORCAMENTO_CONSULTAS', 20))
+    SQL_ORCAMENTO_MS = float(os.environ.get('SQL_ORCAMENTO_MS', 250))
+    SQL_ORCAMENTOS = {}
+
+    # Cache das identidades do Flask-Login: prazo máximo, em segundos, para um
+    # usuário desativado perder o acesso nos outros workers.
+    USUARIO_CACHE_TTL = int(os.environ.get('USUARIO_CACHE_TTL', 60))
+
+    # Hash de senha no formato do werkzeug ("scrypt:N:r:p", "pbkdf2:sha256:iterações"
+    # ou só "scrypt"/"pbkdf2" para os parâmetros padrão), comparado com o prefixo
+    # dos hashes guardados: ao mudar, cada senha é refeita no próximo login.
+    SENHA_HASH_METODO = os.environ.get('SENHA_HASH_METODO', 'scrypt:32768:8:1')
+    # Quantos hashes cada worker calcula ao mesmo tempo, fora da thread da requisição
+    SENHA_HASH_THREADS = int(os.environ.get('SENHA_HASH_THREADS', 2))
+
+    # ultimo_acesso é gravado em lote: a cada ULTIMO_ACESSO_LOTE logins ou
+    # ULTIMO_ACESSO_INTERVALO segundos, o que vier primeiro.
+    ULTIMO_ACESSO_LOTE = int(os.environ.get('ULTIMO_ACESSO_LOTE', 50))
+    ULTIMO_ACESSO_INTERVALO = int(os.environ.get('ULTIMO_ACESSO_INTERVALO', 30))
+
 class DevelopmentConfig(Config):
     DEBUG = True
 
 class ProductionConfig(Config):
     DEBUG = False  # <--- Esta linha estava faltando ou não estava identada
 
+    # Perfil do SQLite para vários workers: leitores não bloqueiam escritores (WAL)
+    # e quem encontra o banco travado espera em vez de falhar na hora.
+    # Os PRAGMAs são aplicados em cada conexão nova (ver app/utils/sqlite.py).
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),  # ms
+        'cache_size': -64000,  # 64 MB por conexão
+        'mmap_size': 268435456,  # 256 MB
+        'temp_store': 'MEMORY',
+    }
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 5,
+        'max_overflow': 5,
+        'pool_timeout': 30,
+    } if Config.SQLALCHEMY_DATABASE_URI.startswith('sqlite') else {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+    }
+
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
@@ -0,0 +1,85 @@
+"""
+Perfil de produção do gunicorn (lido automaticamente de ./gunicorn.conf.py).
+
+    gunicorn run:app
+
+Variáveis de ambiente:
+    PORT                    porta (padrão 5000)
+    GUNICORN_WORKER_CLASS   gthread (padrão), sync ou gevent
+    WEB_CONCURRENCY         número de workers (padrão: calculado pelos CPUs)
+    GUNICORN_MAX_WORKERS    teto do cálculo automático (padrão 8)
+    GUNICORN_THREADS        threads por worker gthread (padrão 4)
+    GUNICORN_CONEXOES       conexões por worker gevent (padrão 100)
+    GUNICORN_MAX_REQUESTS   requisições até reciclar o worker (padrão 1000, 0 desliga)
+    GUNICORN_TIMEOUT        segundos sem resposta do worker até ser morto (padrão 30)
+    GUNICORN_PRELOAD        1 (padrão) carrega o app uma vez no mestre
+
+Comparação dos modelos de worker com a carga do PDV: benchmarks/bench_workers.py.
+"""
+import os
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+# O gevent precisa trocar socket/threading antes de qualquer import do app,
+# e com preload_app o app é importado no mestre logo depois deste arquivo.
+if worker_class == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+
+def _cpus():
+    try:
+        return len(os.sched_getaffinity(0))  # respeita o limite de CPUs do container
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _workers_automatico():
+    """
+    sync atende uma requisição por processo: 2 x CPUs + 1 cobre a espera de
+    E/S. gthread e gevent ganham concorrência com threads/greenlets, então
+    bastam CPUs + 1. O teto existe porque o SQLite aceita um escritor por vez
+    e cada worker tem seu pool de conexões e de processos de relatório.
+    """
+    cpus = _cpus()
+    sugerido = 2 * cpus + 1 if worker_class == 'sync' else cpus + 1
+    return min(sugerido, int(os.environ.get('GUNICORN_MAX_WORKERS', 8)))
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY') or _workers_automatico())
+
+# Cada conexão SSE (/eventos) segura uma thread por até EVENTOS_DURACAO_MAXIMA
+# segundos: com sync ela ocupa o processo inteiro e passa do timeout.
+threads = int(os.environ.get('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+worker_connections = int(os.environ.get('GUNICORN_CONEXOES', 100))
+
+# Recicla os workers aos poucos (contra vazamentos de memória); o jitter evita
+# que todos reiniciem juntos e o serviço fique sem workers ao mesmo tempo.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# create_app() (create_all, usuários padrão, registro dos eventos) roda uma
+# vez no mestre e os workers compartilham as páginas de memória do código.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    # Fecha no mestre as conexões abertas pelo create_app(), antes do primeiro fork
+    if server.cfg.preload_app:
+        from app.utils.processos import descartar_conexoes
+        descartar_conexoes(server.app.wsgi(), fechar=True)
+
+
+def post_fork(server, worker):
+    # O worker abre as próprias conexões; o que veio do mestre é só esquecido
+    if server.cfg.preload_app:
+        from app.utils.processos import descartar_conexoes
+        descartar_conexoes(server.app.wsgi(), fechar=False)
@@ -0,0 +1,42 @@
+"""Add soma_entradas and soma_saidas running totals to caixa
+
+Revision ID: 7c1e4a9b2d10
+Revises: 55adb3f3298b
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e4a9b2d10'
+down_revision = '55adb3f3298b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    columns = [col['name'] for col in inspector.get_columns('caixa')]
+
+    with op.batch_alter_table('caixa') as batch_op:
+        if 'soma_entradas' not in columns:
+            batch_op.add_column(sa.Column('soma_entradas', sa.Float(), nullable=False, server_default='0'))
+        if 'soma_saidas' not in columns:
+            batch_op.add_column(sa.Column('soma_saidas', sa.Float(), nullable=False, server_default='0'))
+
+    # Preenche os totais a partir do histórico já existente
+    for coluna, tipo in (('soma_entradas', 'entrada'), ('soma_saidas', 'saida')):
+        op.execute(
+            f"UPDATE caixa SET {coluna} = ("
+            f"SELECT COALESCE(SUM(mc.valor), 0) FROM movimento_caixa mc "
+            f"WHERE mc.caixa_id = caixa.id AND mc.tipo = '{tipo}')"
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('caixa') as batch_op:
+        batch_op.drop_column('soma_saidas')
+        batch_op.drop_column('soma_entradas')
@@ -0,0 +1,80 @@
+"""Add indexes for the hot query predicates
+
+Revision ID: a3f85c27e6b4
+Revises: 7c1e4a9b2d10
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f85c27e6b4'
+down_revision = '7c1e4a9b2d10'
+branch_labels = None
+depends_on = None
+
+
+# (nome, tabela, colunas, condição do índice parcial no PostgreSQL)
+INDICES = [
+    ('ix_movimento_data', 'movimento', ['data'], None),
+    ('ix_movimento_produto_data', 'movimento', ['produto_id', 'data'], None),
+    ('ix_movimento_tipo_data', 'movimento', ['tipo', 'data'], None),
+    ('ix_movimento_caixa_caixa_data', 'movimento_caixa', ['caixa_id', 'data'], None),
+    ('ix_caixa_status_aberto', 'caixa', ['status'], "status = 'aberto'"),
+    ('ix_produto_ativo_nome', 'produto', ['ativo', 'nome'], None),
+    ('ix_produto_nome_ativos', 'produto', ['nome'], 'ativo'),
+]
+
+
+def _indices_existentes(connection):
+    inspector = sa.inspect(connection)
+    existentes = set()
+    for tabela in {t for _, t, _, _ in INDICES}:
+        existentes.update(ix['name'] for ix in inspector.get_indexes(tabela))
+    return existentes
+
+
+def upgrade():
+    connection = op.get_bind()
+    existentes = _indices_existentes(connection)
+    postgres = connection.dialect.name == 'postgresql'
+
+    def criar():
+        for nome, tabela, colunas, condicao in INDICES:
+            if nome in existentes:
+                continue
+            kwargs = {}
+            if postgres:
+                # CONCURRENTLY não bloqueia escritas durante a criação
+                kwargs['postgresql_concurrently'] = True
+                if condicao:
+                    kwargs['postgresql_where'] = sa.text(condicao)
+            op.create_index(nome, tabela, colunas, **kwargs)
+
+    if postgres:
+        # CREATE INDEX CONCURRENTLY não pode rodar dentro de uma transação
+        with op.get_context().autocommit_block():
+            criar()
+    else:
+        criar()
+
+
+def downgrade():
+    connection = op.get_bind()
+    existentes = _indices_existentes(connection)
+    postgres = connection.dialect.name == 'postgresql'
+
+    def remover():
+        for nome, tabela, _, _ in reversed(INDICES):
+            if nome not in existentes:
+                continue
+            kwargs = {'postgresql_concurrently': True} if postgres else {}
+            op.drop_index(nome, table_name=tabela, **kwargs)
+
+    if postgres:
+        with op.get_context().autocommit_block():
+            remover()
+    else:
+        remover()
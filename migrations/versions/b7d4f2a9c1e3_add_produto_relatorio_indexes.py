@@ -0,0 +1,84 @@
+"""Add expression indexes for the stock report orderings
+
+Revision ID: b7d4f2a9c1e3
+Revises: e8a1b6c93f52
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d4f2a9c1e3'
+down_revision = 'e8a1b6c93f52'
+branch_labels = None
+depends_on = None
+
+
+def _indices(postgres):
+    """
+    Mesmas expressões de ORDENACOES_ESTOQUE (app/models/produto.py), montadas
+    aqui para a migração não depender do modelo atual. O SQL precisa sair
+    idêntico ao da consulta para o banco usar o índice.
+    """
+    produto = sa.Table(
+        'produto', sa.MetaData(),
+        sa.Column('id', sa.Integer),
+        sa.Column('qtd', sa.Integer),
+        sa.Column('valor_compra', sa.Float),
+        sa.Column('valor_venda', sa.Float),
+        sa.Column('estoque_minimo', sa.Integer),
+        sa.Column('ativo', sa.Boolean),
+    )
+    c = produto.c
+    zero = sa.literal_column('0')
+    expressoes = {
+        'valor': c.qtd * c.valor_compra,
+        'margem': sa.case(
+            (c.valor_compra > zero, (c.valor_venda - c.valor_compra) * sa.literal_column('100.0') / c.valor_compra),
+            else_=sa.literal_column('0.0')
+        ),
+        'cobertura': sa.case(
+            (c.estoque_minimo > zero, sa.cast(c.qtd, sa.Float) / c.estoque_minimo),
+            else_=sa.cast(c.qtd, sa.Float)
+        ),
+    }
+    kwargs = {'postgresql_concurrently': True} if postgres else {}
+    return [sa.Index(f'ix_produto_{chave}', c.ativo, expressao, c.id, **kwargs) for chave, expressao in expressoes.items()]
+
+
+def upgrade():
+    connection = op.get_bind()
+    postgres = connection.dialect.name == 'postgresql'
+    existentes = {ix['name'] for ix in sa.inspect(connection).get_indexes('produto')}
+
+    def criar():
+        for indice in _indices(postgres):
+            if indice.name not in existentes:
+                op.execute(CreateIndex(indice))
+
+    if postgres:
+        # CREATE INDEX CONCURRENTLY não pode rodar dentro de uma transação
+        with op.get_context().autocommit_block():
+            criar()
+    else:
+        criar()
+
+
+def downgrade():
+    connection = op.get_bind()
+    postgres = connection.dialect.name == 'postgresql'
+    existentes = {ix['name'] for ix in sa.inspect(connection).get_indexes('produto')}
+
+    def remover():
+        for indice in reversed(_indices(postgres)):
+            if indice.name in existentes:
+                op.execute(DropIndex(indice))
+
+    if postgres:
+        with op.get_context().autocommit_block():
+            remover()
+    else:
+        remover()
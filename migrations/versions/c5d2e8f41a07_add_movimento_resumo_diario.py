@@ -0,0 +1,48 @@
+"""Add movimento_resumo_diario daily rollup table
+
+Revision ID: c5d2e8f41a07
+Revises: a3f85c27e6b4
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d2e8f41a07'
+down_revision = 'a3f85c27e6b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+
+    if 'movimento_resumo_diario' not in inspector.get_table_names():
+        op.create_table(
+            'movimento_resumo_diario',
+            sa.Column('dia', sa.Date(), nullable=False),
+            sa.Column('produto_id', sa.Integer(), nullable=False),
+            sa.Column('tipo', sa.String(length=10), nullable=False),
+            sa.Column('quantidade', sa.Integer(), nullable=False),
+            sa.Column('valor_total', sa.Float(), nullable=False),
+            sa.Column('registros', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['produto_id'], ['produto.id']),
+            sa.PrimaryKeyConstraint('dia', 'produto_id', 'tipo')
+        )
+
+    # Carga inicial a partir do histórico (equivalente a `flask reconstruir-resumo`)
+    op.execute(
+        "DELETE FROM movimento_resumo_diario"
+    )
+    op.execute(
+        "INSERT INTO movimento_resumo_diario (dia, produto_id, tipo, quantidade, valor_total, registros) "
+        "SELECT DATE(data), produto_id, tipo, SUM(quantidade), SUM(quantidade * valor_unitario), COUNT(id) "
+        "FROM movimento WHERE data IS NOT NULL GROUP BY DATE(data), produto_id, tipo"
+    )
+
+
+def downgrade():
+    op.drop_table('movimento_resumo_diario')
@@ -0,0 +1,72 @@
+"""Add full-text search index for produto names
+
+Revision ID: e8a1b6c93f52
+Revises: c5d2e8f41a07
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a1b6c93f52'
+down_revision = 'c5d2e8f41a07'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_UPGRADE = [
+    "DROP TABLE IF EXISTS produto_busca",
+    "CREATE VIRTUAL TABLE produto_busca USING fts5(nome, tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3')",
+    """CREATE TRIGGER IF NOT EXISTS produto_busca_ai AFTER INSERT ON produto WHEN new.ativo BEGIN
+        INSERT INTO produto_busca(rowid, nome) VALUES (new.id, new.nome);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS produto_busca_au AFTER UPDATE OF nome, ativo ON produto BEGIN
+        DELETE FROM produto_busca WHERE rowid = old.id;
+        INSERT INTO produto_busca(rowid, nome) SELECT new.id, new.nome WHERE new.ativo;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS produto_busca_ad AFTER DELETE ON produto BEGIN
+        DELETE FROM produto_busca WHERE rowid = old.id;
+    END""",
+    "INSERT INTO produto_busca(rowid, nome) SELECT id, nome FROM produto WHERE ativo",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS produto_busca_ai",
+    "DROP TRIGGER IF EXISTS produto_busca_au",
+    "DROP TRIGGER IF EXISTS produto_busca_ad",
+    "DROP TABLE IF EXISTS produto_busca",
+]
+
+
+def upgrade():
+    connection = op.get_bind()
+
+    if connection.dialect.name == 'sqlite':
+        for sql in SQLITE_UPGRADE:
+            op.execute(sql)
+    elif connection.dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        op.execute(
+            """CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+                LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+                AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"""
+        )
+        # CREATE INDEX CONCURRENTLY não pode rodar dentro de uma transação
+        with op.get_context().autocommit_block():
+            op.execute(
+                """CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_produto_busca ON produto
+                    USING gin (to_tsvector('simple'::regconfig, f_unaccent(nome))) WHERE ativo"""
+            )
+
+
+def downgrade():
+    connection = op.get_bind()
+
+    if connection.dialect.name == 'sqlite':
+        for sql in SQLITE_DOWNGRADE:
+            op.execute(sql)
+    elif connection.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_produto_busca")
+        op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
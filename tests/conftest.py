@@ -3,15 +3,21 @@ Configuração base para os testes
 """
 import pytest
 import tempfile
+from contextlib import contextmanager
 import os
 import sys
 
 # Adicionar o diretório raiz do projeto ao sys.path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Hash de senha barato só nos testes (lido pelo config.py na importação do app);
+# o padrão de todos os ambientes continua scrypt
+os.environ.setdefault('SENHA_HASH_METODO', 'pbkdf2:sha256:1000')
+
 from app import create_app
 from app.models import db, Usuario, Produto, Caixa, Movimento, MovimentoCaixa
 from app.services.auth_service import AuthService
+from app.utils.instrumentacao import contar_consultas
 
 
 @pytest.fixture
@@ -221,4 +227,20 @@ class AuthActions:
 @pytest.fixture
 def auth(client):
     """Fixture que retorna objeto para ações de autenticação"""
-    return AuthActions(client)
\ No newline at end of file
+    return AuthActions(client)
+
+
+@pytest.fixture
+def limite_consultas():
+    """
+    Falha o teste se o bloco fizer mais consultas SQL que o limite:
+
+        with limite_consultas(10):
+            client.post('/caixa/finalizar', data=...)
+    """
+    @contextmanager
+    def _limite(maximo):
+        with contar_consultas() as contador:
+            yield contador
+        assert contador.consultas <= maximo, f"Esperado no máximo {maximo} consultas: {contador.resumo()}"
+    return _limite
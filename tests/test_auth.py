@@ -223,6 +223,73 @@ class TestAuthService:
             assert usuario.verificar_senha('nova_senha')
             assert not usuario.verificar_senha('123456')
 
+    def test_carregar_identidade_em_cache(self, app, operador_user):
+        """Testa o user_loader em cache e a invalidação ao atualizar/desativar"""
+        from sqlalchemy import event
+
+        with app.app_context():
+            identidade = AuthService.carregar_identidade(operador_user.id)
+            assert identidade.username == 'operador_test'
+            assert identidade.is_operador and identidade.is_active
+            assert identidade.get_id() == str(operador_user.id)
+            assert identidade.verificar_senha('123456')
+
+            consultas = []
+            registrar = lambda *args: consultas.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', registrar)
+            try:
+                assert AuthService.carregar_identidade(operador_user.id) is identidade
+                assert consultas == []
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', registrar)
+
+            AuthService.atualizar_usuario(operador_user.id, nome_completo='Operador Renomeado')
+            assert AuthService.carregar_identidade(operador_user.id).nome_completo == 'Operador Renomeado'
+
+            AuthService.desativar_usuario(operador_user.id)
+            assert AuthService.carregar_identidade(operador_user.id) is None
+
+    def test_usuario_desativado_perde_acesso(self, app, authenticated_operador_client, operador_user):
+        """Testa que a sessão de um usuário desativado deixa de ser aceita"""
+        assert authenticated_operador_client.get('/caixa/').status_code == 200
+
+        with app.app_context():
+            AuthService.desativar_usuario(operador_user.id)
+
+        assert authenticated_operador_client.get('/caixa/').status_code == 302
+
+    def test_login_refaz_hash_e_agrupa_ultimo_acesso(self, app, operador_user):
+        """Testa o rehash no login e a gravação em lote de ultimo_acesso"""
+        with app.app_context():
+            app.config['SENHA_HASH_METODO'] = 'pbkdf2:sha256:2000'
+            anterior = db.session.get(Usuario, operador_user.id).ultimo_acesso
+
+            assert AuthService.autenticar('operador_test', '123456') is not None
+            db.session.expire_all()
+            usuario = db.session.get(Usuario, operador_user.id)
+            assert usuario.senha_hash.startswith('pbkdf2:sha256:2000$')
+            assert usuario.verificar_senha('123456')
+            assert not usuario.precisa_rehash()
+
+            # Forma curta do método equivale à expandida: não refaz a cada login
+            app.config['SENHA_HASH_METODO'] = 'scrypt'
+            usuario.set_senha('123456')
+            app.config['SENHA_HASH_METODO'] = 'scrypt:32768:8:1'
+            assert not usuario.precisa_rehash()
+            app.config['SENHA_HASH_METODO'] = 'scrypt'
+            assert not usuario.precisa_rehash()
+            db.session.rollback()
+
+            # O acesso fica no buffer até a descarga, mas já aparece na identidade
+            assert usuario.ultimo_acesso == anterior
+            identidade = AuthService.carregar_identidade(operador_user.id)
+            assert identidade.ultimo_acesso is not None and identidade.ultimo_acesso != anterior
+
+            assert AuthService.descarregar_acessos(forcar=True) == 1
+            db.session.expire_all()
+            assert db.session.get(Usuario, operador_user.id).ultimo_acesso == identidade.ultimo_acesso
+            assert AuthService.descarregar_acessos(forcar=True) == 0
+
 
 class TestUsuarioModel:
     """Testes para o modelo Usuario"""
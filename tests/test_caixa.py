@@ -123,6 +123,52 @@ class TestCaixaBlueprint:
         assert response.status_code == 200
         assert b'erro' in response.data.lower() or b'aberto' in response.data.lower()
     
+    def test_eventos_stream(self, authenticated_admin_client, caixa_aberto, app):
+        """Testa o stream SSE: evento inicial e o movimento publicado após o commit"""
+        app.config['EVENTOS_BROKER'] = 'memoria'
+        response = authenticated_admin_client.get('/eventos', buffered=False)
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        assert response.headers['Cache-Control'] == 'no-cache'
+
+        partes = response.iter_encoded()
+        assert b'event: conectado' in next(partes)
+
+        with app.app_context():
+            CaixaService.registrar_movimento(caixa_aberto, 'entrada', 'venda', 'Venda SSE', 25.0)
+            db.session.commit()
+
+        chunk = next(partes)
+        assert chunk.startswith(b'event: caixa')
+        assert b'"total_entradas": 25.0' in chunk
+        response.close()
+
+    def test_finalizar_sem_n_mais_1(self, authenticated_admin_client, caixa_aberto, app, limite_consultas):
+        """Testa que a venda com 10 itens no carrinho não faz mais consultas que com 1"""
+        with app.app_context():
+            from app.models import Produto
+            produtos = [Produto(nome=f'Item PDV {i}', valor_compra=1.0, valor_venda=2.0, qtd=50) for i in range(10)]
+            db.session.add_all(produtos)
+            db.session.commit()
+            ids = [str(p.id) for p in produtos]
+
+        def vender(produto_ids):
+            return authenticated_admin_client.post('/caixa/finalizar', data={
+                'produto_ids[]': produto_ids,
+                'quantidades[]': ['1'] * len(produto_ids),
+                'forma_pagamento': 'dinheiro'
+            })
+
+        with limite_consultas(15) as um_item:
+            response = vender(ids[:1])
+        assert response.status_code == 302
+        assert response.headers['Server-Timing'].startswith('db;dur=')
+
+        # Dez itens cabem no que um item gastou
+        with limite_consultas(um_item.consultas):
+            response = vender(ids)
+        assert response.status_code == 302
+
     def test_historico_caixas(self, authenticated_admin_client, caixa_aberto):
         """Testa visualização do histórico de caixas"""
         response = authenticated_admin_client.get('/caixa/historico')
@@ -313,6 +359,122 @@ class TestCaixaService:
             assert resumo['saldo_inicial'] == caixa_aberto.saldo_inicial
             assert resumo['saldo_final'] == caixa_aberto.saldo_inicial + 275.0
 
+    def test_totais_persistidos_e_recalculo(self, app, caixa_aberto):
+        """Testa totais mantidos incrementalmente e a reconstrução a partir dos movimentos"""
+        with app.app_context():
+            from app.models import db, Caixa
+
+            CaixaService.registrar_movimento(caixa_aberto, 'entrada', 'venda', 'Venda 1', 120.0)
+            CaixaService.registrar_movimento(caixa_aberto, 'entrada', 'venda', 'Venda 2', 30.0)
+            CaixaService.registrar_movimento(caixa_aberto, 'saida', 'despesa', 'Troco', 20.0)
+            db.session.commit()
+
+            caixa = db.session.get(Caixa, caixa_aberto)
+            assert caixa.soma_entradas == 150.0
+            assert caixa.soma_saidas == 20.0
+            assert caixa.saldo_calculado == 100.0 + 150.0 - 20.0
+
+            # Corrompe os totais e reconstrói a partir das linhas
+            caixa.soma_entradas = 0.0
+            caixa.soma_saidas = 999.0
+            db.session.commit()
+
+            assert CaixaService.recalcular_totais(caixa_aberto) == 1
+            db.session.expire_all()
+            caixa = db.session.get(Caixa, caixa_aberto)
+            assert caixa.total_entradas == 150.0
+            assert caixa.total_saidas == 20.0
+
+    def test_finalizar_venda_em_lote(self, app, caixa_aberto):
+        """Testa a venda atômica: baixa condicional, movimentos em lote e rollback sem estoque"""
+        with app.app_context():
+            from app.models import db, Caixa, Produto, Movimento
+
+            arroz = Produto(nome='Arroz PDV', valor_compra=5.0, valor_venda=8.0, qtd=10)
+            feijao = Produto(nome='Feijão PDV', valor_compra=6.0, valor_venda=9.0, qtd=3)
+            db.session.add_all([arroz, feijao])
+            db.session.commit()
+
+            # Itens repetidos no carrinho são somados
+            total = CaixaService.finalizar_venda(
+                caixa_aberto, [(arroz.id, '2'), (feijao.id, '1'), (arroz.id, '1')], 'dinheiro'
+            )
+            assert total == 3 * 8.0 + 9.0
+
+            db.session.expire_all()
+            assert db.session.get(Produto, arroz.id).qtd == 7
+            assert db.session.get(Produto, feijao.id).qtd == 2
+            assert Movimento.query.filter_by(tipo='saida').count() == 2
+            assert db.session.get(Caixa, caixa_aberto).soma_entradas == total
+
+            # Sem estoque de um item, nada da venda é gravado
+            with pytest.raises(ValueError, match='Estoque insuficiente'):
+                CaixaService.finalizar_venda(caixa_aberto, [(arroz.id, 1), (feijao.id, 5)], 'cartao')
+
+            db.session.expire_all()
+            assert db.session.get(Produto, arroz.id).qtd == 7
+            assert Movimento.query.filter_by(tipo='saida').count() == 2
+            assert db.session.get(Caixa, caixa_aberto).soma_entradas == total
+
+            # Item desconhecido ou inativo recusa a venda em vez de ser ignorado
+            with pytest.raises(ValueError, match='Produto não encontrado'):
+                CaixaService.finalizar_venda(caixa_aberto, [(arroz.id, 1), (999999, 1)], 'dinheiro')
+            feijao.ativo = False
+            db.session.commit()
+            with pytest.raises(ValueError, match='Produto inativo'):
+                CaixaService.finalizar_venda(caixa_aberto, [(arroz.id, 1), (feijao.id, 1)], 'dinheiro')
+
+            db.session.expire_all()
+            assert db.session.get(Produto, arroz.id).qtd == 7
+            assert Movimento.query.filter_by(tipo='saida').count() == 2
+            assert db.session.get(Caixa, caixa_aberto).soma_entradas == total
+
+
+    def test_eventos_publicados_no_commit(self, app, caixa_aberto):
+        """Testa que a venda publica caixa e estoque (com alertas) só depois do commit"""
+        from app.models import Produto
+        from app.services import EventoService
+
+        app.config['EVENTOS_BROKER'] = 'memoria'
+        with app.app_context():
+            arroz = Produto(nome='Arroz SSE', valor_compra=5.0, valor_venda=8.0, qtd=6, estoque_minimo=5)
+            db.session.add(arroz)
+            db.session.commit()
+
+            fila = EventoService.assinar()
+            try:
+                with pytest.raises(ValueError):
+                    CaixaService.finalizar_venda(caixa_aberto, [(arroz.id, 50)], 'dinheiro')
+                assert fila.empty()  # rollback descarta os eventos agendados
+
+                CaixaService.finalizar_venda(caixa_aberto, [(arroz.id, 2)], 'dinheiro')
+                eventos = {e['tipo']: e['dados'] for e in (fila.get_nowait(), fila.get_nowait())}
+            finally:
+                EventoService.cancelar(fila)
+
+            assert eventos['caixa']['total_entradas'] == 16.0
+            assert eventos['estoque']['vendas'] == 16.0
+            assert eventos['estoque']['produtos'][0]['qtd'] == 4
+            assert [p['nome'] for p in eventos['estoque']['alertas']] == ['Arroz SSE']
+
+    def test_broker_arquivo_entre_processos(self, tmp_path):
+        """Testa o broker por arquivo: a thread de acompanhamento entrega o que foi publicado, inclusive após a troca do arquivo"""
+        from app.services.eventos_service import BrokerArquivo
+
+        caminho = str(tmp_path / 'eventos.log')
+        assinante = BrokerArquivo(caminho, intervalo=0.01)
+        fila = assinante.assinar()
+
+        # Outro worker: mesma configuração, instância própria
+        publicador = BrokerArquivo(caminho, max_bytes=400)
+        publicador.publicar({'tipo': 'caixa', 'dados': {'saldo': 10.0}})
+        assert fila.get(timeout=2)['dados'] == {'saldo': 10.0}
+
+        for i in range(5):
+            publicador.publicar({'tipo': 'estoque', 'dados': {'n': i, 'texto': 'x' * 80}})
+        assert [fila.get(timeout=2)['dados']['n'] for _ in range(5)] == list(range(5))
+        assert os.path.getsize(caminho) <= 400  # o arquivo foi trocado no meio
+
 
 class TestCaixaModel:
     """Testes para o modelo Caixa"""
@@ -460,4 +460,39 @@ class TestFluxoRecuperacaoErros:
         assert response.status_code == 302
         
         response = client.get('/relatorios/')
-        assert response.status_code == 302
\ No newline at end of file
+        assert response.status_code == 302
+
+class TestDadosSinteticos:
+    """Testes do gerador de histórico (flask seed)"""
+
+    def test_seed_deterministico_e_consistente(self, runner, app):
+        """Mesma semente gera os mesmos dados, com caixas e resumo coerentes"""
+        argumentos = ['seed', '--dias', '10', '--ate', '2024-12-20', '--produtos', '50', '--vendas-por-dia', '40', '--limpar']
+
+        primeira = runner.invoke(args=argumentos)
+        assert primeira.exit_code == 0, primeira.output
+        segunda = runner.invoke(args=argumentos)
+        assert segunda.exit_code == 0, segunda.output
+        assert primeira.output.splitlines()[0] == segunda.output.splitlines()[0]
+        assert primeira.output.split('assinatura ')[1] == segunda.output.split('assinatura ')[1]
+
+        assert runner.invoke(args=argumentos[:-1]).exit_code != 0  # sem --limpar não sobrescreve
+
+        with app.app_context():
+            # Caixas sem produtos também contam como dados existentes (ids colidiriam)
+            db.session.execute(db.delete(MovimentoCaixa))
+            db.session.execute(db.delete(Movimento))
+            db.session.execute(db.delete(Produto))
+            db.session.commit()
+        assert runner.invoke(args=argumentos[:-1]).exit_code != 0
+        assert runner.invoke(args=argumentos).exit_code == 0
+
+        with app.app_context():
+            from app.models import MovimentoResumoDiario
+            assert Produto.query.count() == 50
+            assert Caixa.query.count() == 30
+            assert Produto.query.filter(Produto.qtd < 0).count() == 0
+            for caixa in Caixa.query.all():
+                entradas = sum(m.valor for m in caixa.movimentos if m.tipo == 'entrada')
+                assert caixa.soma_entradas == pytest.approx(entradas)
+            assert db.session.query(db.func.sum(MovimentoResumoDiario.registros)).scalar() == Movimento.query.count()
@@ -165,6 +165,39 @@ class TestMovimentosBlueprint:
         assert response.status_code == 200
         assert b'erro' in response.data.lower() or b'insuficiente' in response.data.lower()
 
+    def test_saida_e_listagem_dentro_do_orcamento(self, authenticated_admin_client, app, limite_consultas):
+        """Testa o orçamento de consultas da saída e da listagem JSON (produto sem lazy load por linha)"""
+        with app.app_context():
+            produto = Produto(nome='Produto Orçamento', valor_compra=1.0, valor_venda=2.0, qtd=100)
+            db.session.add(produto)
+            db.session.commit()
+            produto_id = produto.id
+
+        for _ in range(5):
+            with limite_consultas(15):
+                response = authenticated_admin_client.post('/movimentos/saida', data={
+                    'produto_id': str(produto_id), 'quantidade': '1', 'forma_pagamento': 'dinheiro'
+                })
+            assert response.status_code == 302
+
+        with limite_consultas(5):
+            response = authenticated_admin_client.get('/movimentos/api?limite=20')
+        assert response.status_code == 200
+        assert all(m['produto_nome'] for m in response.get_json()['movimentos'])
+        assert 'desc="' in response.headers['Server-Timing']
+
+    def test_listagem_limite_invalido(self, authenticated_admin_client, app, produto_teste):
+        """Testa que limite zero ou negativo vira uma página de uma linha"""
+        with app.app_context():
+            db.session.add(Movimento(produto_id=produto_teste, tipo='entrada', quantidade=1, valor_unitario=1.0))
+            db.session.commit()
+
+        for limite in ('0', '-1'):
+            response = authenticated_admin_client.get(f'/movimentos/api?limite={limite}')
+            assert response.status_code == 200
+            assert len(response.get_json()['movimentos']) == 1
+            assert authenticated_admin_client.get(f'/movimentos/?limite={limite}').status_code == 200
+
 
 class TestMovimentoService:
     """Testes para o serviço de movimentos"""
@@ -202,7 +235,102 @@ class TestMovimentoService:
             
             for movimento in movimentos:
                 assert ontem <= movimento.data_movimento.date() <= hoje
-    
+
+    def test_paginar_movimentos_por_cursor(self, app):
+        """Testa a paginação por keyset em (data, id) com token de próxima página"""
+        with app.app_context():
+            produto = Produto(nome='Produto Cursor', valor_compra=10.0, valor_venda=15.0, qtd=0)
+            db.session.add(produto)
+            db.session.commit()
+
+            base = datetime(2024, 1, 1, 12, 0)
+            for i in range(7):
+                # Dois movimentos por instante para exercitar o desempate por id
+                db.session.add(Movimento(produto_id=produto.id, tipo='entrada', quantidade=1,
+                                         valor_unitario=10.0, data=base + timedelta(minutes=i // 2)))
+            db.session.add(Movimento(produto_id=produto.id, tipo='saida', quantidade=1,
+                                     valor_unitario=15.0, data=base))
+            db.session.commit()
+
+            vistos = []
+            cursor = None
+            while True:
+                pagina, cursor = MovimentoService.paginar_movimentos(
+                    produto_id=produto.id, tipo='entrada', cursor=cursor, limite=3
+                )
+                vistos.extend(pagina)
+                if not cursor:
+                    break
+
+            assert len(vistos) == 7
+            assert all(m.tipo == 'entrada' for m in vistos)
+            chaves = [(m.data, m.id) for m in vistos]
+            assert chaves == sorted(chaves, reverse=True)
+
+            # Token inválido volta para a primeira página
+            primeira, _ = MovimentoService.paginar_movimentos(produto_id=produto.id, limite=3)
+            pagina, _ = MovimentoService.paginar_movimentos(produto_id=produto.id, cursor='lixo', limite=3)
+            assert [m.id for m in pagina] == [m.id for m in primeira]
+
+    def test_registrar_lote(self, app, authenticated_admin_client, produto_teste):
+        """Testa entradas/saídas em lote: tudo ou nada, com o resultado por linha"""
+        with app.app_context():
+            outro = Produto(nome='Outro Produto', valor_compra=2.0, valor_venda=3.0, qtd=5, estoque_minimo=1)
+            db.session.add(outro)
+            db.session.commit()
+            outro_id = outro.id
+
+            resultado = MovimentoService.registrar_lote('entrada', [
+                (produto_teste, 10, '12,50'), {'produto_id': outro_id, 'quantidade': 4}, (produto_teste, 5)
+            ], motivo='Recebimento NF 123')
+            assert resultado.aplicado
+            assert [l.qtd_atual for l in resultado.linhas] == [115, 9, 115]
+            assert [l.valor_unitario for l in resultado.linhas] == [12.5, 2.0, 10.0]
+            assert resultado.total == 10 * 12.5 + 4 * 2.0 + 5 * 10.0
+            assert Movimento.query.filter_by(motivo='Recebimento NF 123').count() == 3
+
+            # Uma linha sem estoque recusa o lote inteiro
+            resultado = MovimentoService.registrar_lote('saida', [(produto_teste, 15), (outro_id, 10)])
+            assert not resultado.aplicado
+            assert [l.status for l in resultado.linhas] == ['nao_aplicada', 'erro']
+            assert 'insuficiente' in resultado.linhas[1].mensagem
+            assert db.session.get(Produto, produto_teste).qtd == 115
+            assert Movimento.query.filter_by(tipo='saida').count() == 0
+
+        response = authenticated_admin_client.post('/movimentos/lote', json={
+            'tipo': 'saida', 'linhas': [{'produto_id': produto_teste, 'quantidade': 15}, {'produto_id': 9999, 'quantidade': 1}]
+        })
+        assert response.status_code == 422
+        assert response.get_json()['linhas'][1]['mensagem'] == 'Produto não encontrado'
+
+        with app.app_context():
+            from app.services import CaixaService
+            caixa = CaixaService.obter_caixa_aberto() or CaixaService.abrir_caixa(0.0)
+            caixa_id, entradas = caixa.id, caixa.soma_entradas or 0.0
+
+        # Tipo em outra grafia também é venda: o total entra no caixa aberto
+        response = authenticated_admin_client.post('/movimentos/lote', json={
+            'tipo': ' SAIDA ', 'linhas': [{'produto_id': produto_teste, 'quantidade': 15, 'valor_unitario': 2.0}]
+        })
+        assert response.status_code == 200
+        assert response.get_json()['linhas'][0]['qtd_atual'] == 100
+        with app.app_context():
+            from app.models import Caixa
+            assert db.session.get(Caixa, caixa_id).soma_entradas == pytest.approx(entradas + 30.0)
+
+        assert authenticated_admin_client.post(f'/produtos/update_qtd/{produto_teste}', data={'qtd_adicional': '3'}).status_code == 204
+        with app.app_context():
+            assert db.session.get(Produto, produto_teste).qtd == 103
+            assert Movimento.query.filter_by(motivo='Reposição via painel de produto').count() == 1
+
+        # Entrada inválida é 400 e só produto inexistente é 404, sempre com JSON
+        resposta = authenticated_admin_client.post(f'/produtos/update_qtd/{produto_teste}', data={'qtd_adicional': 'abc'})
+        assert resposta.status_code == 400 and 'erro' in resposta.get_json()
+        assert authenticated_admin_client.post(f'/produtos/update_qtd/{produto_teste}', data={'qtd_adicional': '0'}).status_code == 400
+        resposta = authenticated_admin_client.post('/produtos/update_qtd/999999', data={'qtd_adicional': '3'})
+        assert resposta.status_code == 404
+        assert resposta.get_json() == {'erro': 'Produto não encontrado'}
+
     def test_registrar_entrada(self, app, produto_teste):
         """Testa registro de entrada"""
         with app.app_context():
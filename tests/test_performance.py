@@ -359,4 +359,91 @@ class TestMemoryUsage:
             print(f"Memória inicial: {memory_start:.2f} MB")
             print(f"Memória após dados: {memory_after_data:.2f} MB")
             print(f"Memória após consultas: {memory_after_queries:.2f} MB")
-            print(f"Aumento total: {memory_increase:.2f} MB")
\ No newline at end of file
+            print(f"Aumento total: {memory_increase:.2f} MB")
+
+class TestPerfilSQLite:
+    """Testes do perfil de produção do SQLite"""
+
+    def test_pragmas_aplicados_em_cada_conexao(self, tmp_path):
+        """Testa WAL, busy_timeout e demais PRAGMAs do ProductionConfig"""
+        from sqlalchemy import create_engine, text
+        from app.utils.sqlite import aplicar_pragmas
+        from config import ProductionConfig
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'perfil.db'}")
+        aplicar_pragmas(engine, ProductionConfig.SQLITE_PRAGMAS)
+
+        with engine.connect() as conn:
+            assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert conn.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+            assert conn.execute(text('PRAGMA busy_timeout')).scalar() == ProductionConfig.SQLITE_PRAGMAS['busy_timeout']
+            assert conn.execute(text('PRAGMA temp_store')).scalar() == 2  # MEMORY
+        engine.dispose()
+
+    def test_repetir_se_ocupado(self, app):
+        """Testa a repetição da unidade de trabalho quando o banco está travado"""
+        from sqlalchemy.exc import OperationalError
+        from app.utils.sqlite import repetir_se_ocupado
+
+        chamadas = []
+
+        @repetir_se_ocupado(espera=0)
+        def venda():
+            chamadas.append(1)
+            if len(chamadas) < 3:
+                raise OperationalError('COMMIT', {}, Exception('database is locked'))
+            return 'ok'
+
+        @repetir_se_ocupado(espera=0)
+        def erro_de_sql():
+            chamadas.append(1)
+            raise OperationalError('SELECT', {}, Exception('no such table: x'))
+
+        with app.app_context():
+            assert venda() == 'ok'
+            assert len(chamadas) == 3
+
+            chamadas.clear()
+            with pytest.raises(OperationalError):
+                erro_de_sql()
+            assert len(chamadas) == 1
+
+
+class TestPerfilGunicorn:
+    """Testes do perfil de produção do gunicorn (gunicorn.conf.py)"""
+
+    def test_configuracao_padrao(self, monkeypatch):
+        """Testa preload, gthread e reciclagem com jitter"""
+        import runpy
+        for variavel in ('WEB_CONCURRENCY', 'GUNICORN_WORKER_CLASS', 'GUNICORN_MAX_REQUESTS'):
+            monkeypatch.delenv(variavel, raising=False)
+        monkeypatch.setenv('GUNICORN_MAX_WORKERS', '3')
+        caminho = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+        perfil = runpy.run_path(caminho)
+        assert perfil['preload_app'] is True
+        assert perfil['worker_class'] == 'gthread' and perfil['threads'] > 1
+        assert 1 <= perfil['workers'] <= 3
+        assert 0 < perfil['max_requests_jitter'] < perfil['max_requests']
+
+        monkeypatch.setenv('GUNICORN_WORKER_CLASS', 'sync')
+        monkeypatch.setenv('WEB_CONCURRENCY', '5')
+        perfil = runpy.run_path(caminho)
+        assert perfil['workers'] == 5 and perfil['threads'] == 1
+
+    def test_descartar_conexoes_apos_fork(self, app):
+        """Testa que o worker não reaproveita a conexão aberta no mestre"""
+        from app.models import db
+        from app.utils import descartar_conexoes
+
+        with app.app_context():
+            with db.engine.connect() as conn:
+                herdada = conn.connection.dbapi_connection
+            assert db.engine.pool.checkedin() == 1
+
+        descartar_conexoes(app, fechar=False)
+
+        with app.app_context():
+            assert db.engine.pool.checkedin() == 0
+            with db.engine.connect() as conn:
+                assert conn.connection.dbapi_connection is not herdada
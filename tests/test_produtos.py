@@ -256,6 +256,131 @@ class TestProdutoService:
             produto = Produto.query.get(produto_teste)
             assert produto.quantidade == estoque_inicial + 10
 
+    def test_cache_do_catalogo(self, app, produto_teste, caixa_aberto):
+        """Testa o catálogo em cache: sem consultas enquanto a versão não muda"""
+        from sqlalchemy import event
+        from app.services.caixa_service import CaixaService
+
+        with app.app_context():
+            consultas = []
+            registrar = lambda *args: consultas.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', registrar)
+            try:
+                ProdutoService.listar_produtos()
+                consultas.clear()
+                produtos = ProdutoService.listar_produtos()
+                assert consultas == []
+                assert produtos[0].nome == 'Produto Teste'
+                assert produtos[0].estoque_baixo is False
+
+                # Alterações pelo ORM invalidam depois do commit
+                ProdutoService.atualizar_produto(produto_teste, nome='Produto Renomeado')
+                assert ProdutoService.listar_produtos()[0].nome == 'Produto Renomeado'
+
+                # Baixa em lote (UPDATE fora do ORM) também invalida
+                CaixaService.finalizar_venda(caixa_aberto, [(produto_teste, 5)], 'dinheiro')
+                assert ProdutoService.listar_produtos()[0].qtd == 95
+
+                ProdutoService.excluir_produto(produto_teste)
+                assert ProdutoService.listar_produtos() == ()
+                assert len(ProdutoService.listar_produtos(incluir_inativos=True)) == 1
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', registrar)
+
+    def test_importar_produtos_csv(self, app, authenticated_admin_client, produto_teste):
+        """Testa a importação em lote: upsert pelo nome normalizado, movimentos e linhas inválidas"""
+        import io
+        from app.models import Movimento
+        from app.services.importacao_service import ImportacaoService
+
+        csv = (
+            "Nome;Valor Compra;Valor Venda;Quantidade\n"
+            "  PRODUTO   teste ;11,00;16,50;120\n"
+            "Café Pilão;12;18;30\n"
+            "Sem Preço;;5;1\n"
+            "Arroz Tipo 1;20;25;\n"
+            "cafe pilao;1.012,50;1.500,00;40\n"
+        )
+        with app.app_context():
+            resultado = ImportacaoService.importar_produtos(io.StringIO(csv), lote=2)
+            assert resultado[:3] == (2, 2, 1)
+            assert resultado.erros == [(4, 'valor_compra vazio')]
+
+            existente = db.session.get(Produto, produto_teste)
+            assert (existente.nome, existente.valor_venda, existente.qtd) == ('PRODUTO teste', 16.5, 120)
+            cafe = Produto.query.filter_by(nome='cafe pilao').one()
+            assert (cafe.valor_compra, cafe.qtd) == (1012.5, 40)
+            assert Produto.query.filter_by(nome='Arroz Tipo 1').one().qtd == 0
+
+            movimentos = sorted((m.produto_id, m.tipo, m.quantidade) for m in Movimento.query.all())
+            assert movimentos == [(produto_teste, 'entrada', 20), (cafe.id, 'entrada', 10), (cafe.id, 'entrada', 30)]
+            assert len(ProdutoService.listar_produtos()) == 3
+
+        # Pelo upload, repetir o arquivo não duplica produtos nem movimentos
+        response = authenticated_admin_client.post('/produtos/importar', data={
+            'arquivo': (io.BytesIO(csv.encode('utf-8')), 'produtos.csv')
+        }, content_type='multipart/form-data')
+        assert response.status_code == 200
+        assert '0 inserido(s), 3 atualizado(s)' in response.get_data(as_text=True)
+        with app.app_context():
+            assert Produto.query.count() == 3
+            assert Movimento.query.count() == 3
+
+    def test_importar_csv_malformado(self, app, authenticated_admin_client):
+        """Testa que linha ilegível para o csv (campo acima do limite) vira erro da linha, não erro 500"""
+        import io
+        from app.services.importacao_service import ImportacaoService
+
+        gigante = 'x' * 200_000
+        csv = f"nome,valor_compra,valor_venda\n{gigante},1,2\nFeijão Malformado,3,4\n"
+        with app.app_context():
+            resultado = ImportacaoService.importar_produtos(io.StringIO(csv))
+            assert resultado[:3] == (1, 0, 1)
+            assert resultado.erros[0][0] == 2 and 'malformada' in resultado.erros[0][1]
+
+        response = authenticated_admin_client.post('/produtos/importar', data={
+            'arquivo': (io.BytesIO(f"{gigante},valor_compra,valor_venda\n".encode()), 'produtos.csv')
+        }, content_type='multipart/form-data')
+        assert response.status_code == 200
+        assert 'Erro na importação' in response.get_data(as_text=True)
+
+    def test_buscar_produtos(self, app, authenticated_admin_client):
+        """Testa a busca por nome: sem acentos, por prefixo, só ativos e em sincronia com as alterações"""
+        with app.app_context():
+            refinado = ProdutoService.criar_produto('Açúcar Refinado União', 3.0, 5.0)
+            mascavo = ProdutoService.criar_produto('Açúcar Mascavo', 6.0, 9.0)
+            ProdutoService.criar_produto('Acerola Congelada', 4.0, 7.0)
+            ProdutoService.excluir_produto(mascavo.id)
+
+            assert [p.nome for p in ProdutoService.buscar_produtos('acucar')] == ['Açúcar Refinado União']
+            assert [p.nome for p in ProdutoService.buscar_produtos('AÇU ref')] == ['Açúcar Refinado União']
+            assert len(ProdutoService.buscar_produtos('ac')) == 2
+            assert ProdutoService.buscar_produtos('"*') == []
+
+            ProdutoService.atualizar_produto(refinado.id, nome='Açúcar Cristal')
+            assert ProdutoService.buscar_produtos('refinado') == []
+            assert ProdutoService.buscar_produtos('cristal')[0].id == refinado.id
+
+        response = authenticated_admin_client.get('/produtos/search?q=acero')
+        assert response.status_code == 200
+        assert b'Acerola Congelada' in response.data
+        assert b'Cristal' not in response.data
+
+    def test_buscar_produtos_janela_por_relevancia(self, app, monkeypatch):
+        """Testa que a janela do ranking guarda os resultados mais relevantes, não os primeiros cadastrados"""
+        from app.services import produto_service
+
+        monkeypatch.setattr(produto_service, 'JANELA_RANKING', 3)
+        with app.app_context():
+            db.session.add_all([
+                Produto(nome=f'Quiabo Congelado Pacote Econômico Grande {i}', valor_compra=1.0, valor_venda=2.0)
+                for i in range(5)
+            ])
+            db.session.add(Produto(nome='Quiabo', valor_compra=1.0, valor_venda=2.0))
+            db.session.commit()
+
+            assert [p.nome for p in ProdutoService.buscar_produtos('quiabo', limite=1)] == ['Quiabo']
+
 
 class TestProdutoModel:
     """Testes para o modelo Produto"""
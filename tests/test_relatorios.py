@@ -69,6 +69,20 @@ class TestRelatoriosBlueprint:
         assert response.status_code == 200
         assert b'fluxo' in response.data.lower() or b'di' in response.data.lower()
     
+    def test_relatorio_fluxo_diario_com_lancamento_de_caixa(self, authenticated_admin_client, app, caixa_aberto):
+        """Testa o fluxo diário com um lançamento de caixa no dia (projeção de movimento_caixa)"""
+        from app.models import Caixa, MovimentoCaixa, db
+
+        with app.app_context():
+            caixa = Caixa.query.filter_by(status='aberto').first()
+            db.session.add(MovimentoCaixa(caixa_id=caixa.id, tipo='entrada', categoria='suprimento',
+                                          descricao='Suprimento do fluxo', valor=42.5, data=datetime.utcnow()))
+            db.session.commit()
+
+        response = authenticated_admin_client.get('/relatorios/fluxo-diario')
+        assert response.status_code == 200
+        assert 'Suprimento do fluxo' in response.get_data(as_text=True)
+
     def test_relatorio_caixa_geral(self, authenticated_admin_client):
         """Testa relatório geral de caixa"""
         response = authenticated_admin_client.get('/relatorios/caixa')
@@ -81,6 +95,123 @@ class TestRelatoriosBlueprint:
         assert response.status_code == 200
         assert b'caixa' in response.data.lower()
 
+    def test_exportar_movimentos(self, authenticated_admin_client, app):
+        """Testa a exportação em streaming (CSV, NDJSON e gzip) dos movimentos"""
+        import gzip
+        import json
+        from app.models import db, Produto, Movimento
+
+        with app.app_context():
+            produto = Produto(nome='Produto Exportado', valor_compra=10.0, valor_venda=15.0, qtd=0)
+            db.session.add(produto)
+            db.session.flush()
+            agora = datetime.utcnow()
+            for i in range(3):
+                db.session.add(Movimento(produto_id=produto.id, tipo='saida', quantidade=2,
+                                         valor_unitario=15.0, data=agora - timedelta(hours=i)))
+            db.session.add(Movimento(produto_id=produto.id, tipo='entrada', quantidade=1,
+                                     valor_unitario=10.0, data=agora - timedelta(days=3)))
+            db.session.commit()
+
+        inicio = (agora - timedelta(days=1)).isoformat()
+        filtro = f'periodo=personalizado&data_inicio={inicio}&data_fim={agora.isoformat()}'
+
+        response = authenticated_admin_client.get(f'/relatorios/exportar/movimentos.csv?{filtro}')
+        assert response.status_code == 200
+        assert response.is_streamed
+        linhas = response.get_data(as_text=True).splitlines()
+        assert linhas[0].startswith('id,data,produto_id,produto_nome')
+        assert len(linhas) == 4
+        assert 'Produto Exportado' in linhas[1]
+
+        response = authenticated_admin_client.get(f'/relatorios/exportar/movimentos.ndjson?{filtro}&gzip=1')
+        assert response.mimetype == 'application/gzip'
+        registros = [json.loads(l) for l in gzip.decompress(response.data).decode().splitlines()]
+        assert [r['valor_total'] for r in registros] == [30.0, 30.0, 30.0]
+
+        assert authenticated_admin_client.get('/relatorios/exportar/movimentos.xls').status_code == 404
+
+
+    def test_tarefa_relatorio_em_segundo_plano(self, authenticated_admin_client, app, tmp_path):
+        """Testa a tarefa de relatório: pedidos iguais compartilham a execução, progresso e download"""
+        import json
+        import time
+        from app.models import db, Produto, Movimento
+        from app.services import ResumoService
+
+        app.config.update(RELATORIOS_PASTA=str(tmp_path), RELATORIOS_PROCESSOS=1)
+        with app.app_context():
+            produto = Produto(nome='Produto Tarefa', valor_compra=10.0, valor_venda=15.0, qtd=0)
+            db.session.add(produto)
+            db.session.flush()
+            agora = datetime.now()
+            for i in range(5):
+                db.session.add(Movimento(produto_id=produto.id, tipo='saida', quantidade=1,
+                                         valor_unitario=15.0, data=agora - timedelta(days=30 * i)))
+            db.session.commit()
+            ResumoService.reconstruir()
+
+        pedido = {'tipo': 'movimentos', 'formato': 'json',
+                  'data_inicio': (agora - timedelta(days=365)).date().isoformat(),
+                  'data_fim': agora.date().isoformat()}
+        try:
+            primeira = authenticated_admin_client.post('/relatorios/tarefas', json=pedido)
+            segunda = authenticated_admin_client.post('/relatorios/tarefas', json=pedido)
+            assert primeira.status_code == 202
+            assert primeira.json['id'] == segunda.json['id']
+            assert segunda.headers['Location'].endswith(f"/relatorios/tarefas/{primeira.json['id']}")
+
+            limite = time.time() + 60
+            while True:
+                tarefa = authenticated_admin_client.get(segunda.headers['Location']).json
+                if tarefa['status'] not in ('pendente', 'executando') or time.time() > limite:
+                    break
+                time.sleep(0.2)
+            assert tarefa['status'] == 'concluido', tarefa
+            assert tarefa['linhas'] == 5
+
+            fragmento = authenticated_admin_client.get(segunda.headers['Location'], headers={'HX-Request': 'true'})
+            assert b'Baixar JSON' in fragmento.data
+
+            download = authenticated_admin_client.get(f"/relatorios/tarefas/{tarefa['id']}/download")
+            resultado = json.loads(download.data)
+            assert resultado['resumo']['saida']['registros'] == 5
+            assert {m['produto_nome'] for m in resultado['movimentos']} == {'Produto Tarefa'}
+        finally:
+            app.extensions['tarefas'].executor.shutdown()
+
+        assert authenticated_admin_client.post('/relatorios/tarefas', json={**pedido, 'formato': 'xls'}).status_code == 400
+        assert authenticated_admin_client.get('/relatorios/tarefas/../../etc').status_code == 404
+
+    def test_tarefa_na_fila_e_limpeza_de_vencidas(self, app, tmp_path):
+        """Testa que tarefa na fila não vence pela idade e que resultados vencidos são apagados"""
+        import json
+        import socket
+        import subprocess
+        import time
+        from app.services import TarefaService
+
+        app.config.update(RELATORIOS_PASTA=str(tmp_path), RELATORIOS_TEMPO_MAXIMO=1, RELATORIOS_VALIDADE=60)
+        morto = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                               capture_output=True, text=True).stdout.strip()
+        antigo = time.time() - 3600
+
+        with app.app_context():
+            dono = {'host': socket.gethostname(), 'pid': os.getpid()}
+            na_fila = {'status': 'pendente', 'atualizado_em': antigo, 'dono': dono}
+            assert not TarefaService._vencida(na_fila)
+            assert TarefaService._vencida({**na_fila, 'dono': {**dono, 'pid': int(morto)}})
+            assert TarefaService._vencida({'status': 'executando', 'atualizado_em': antigo})
+
+            vencida, recente = 'a' * 40, 'b' * 40
+            for tarefa_id, concluido_em in ((vencida, antigo), (recente, time.time())):
+                (tmp_path / f'{tarefa_id}.csv').write_text('id\n')
+                (tmp_path / f'{tarefa_id}.status.json').write_text(json.dumps({
+                    'id': tarefa_id, 'status': 'concluido', 'concluido_em': concluido_em, 'arquivo': f'{tarefa_id}.csv'
+                }))
+            TarefaService._limpar_vencidas(str(tmp_path))
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == [f'{recente}.csv', f'{recente}.status.json']
 
 class TestRelatorioService:
     """Testes para o serviço de relatórios"""
@@ -99,6 +230,134 @@ class TestRelatorioService:
             
             assert dashboard['total_produtos'] >= 1
     
+    def test_periodos_fechados_em_cache(self, app):
+        """Testa que dias fechados vêm do cache e só um movimento retroativo os invalida"""
+        with app.app_context():
+            from app.models import db, Produto, Movimento
+            from app.services.resumo_service import ResumoService
+            from app.utils import agora_utc
+
+            produto = Produto(nome='Produto Período', qtd=100, valor_compra=5.0, valor_venda=10.0)
+            db.session.add(produto)
+            db.session.commit()
+            hoje = agora_utc().replace(hour=12, minute=0, second=0, microsecond=0)
+            for dias_atras in (0, 3, 40):
+                m = Movimento(produto_id=produto.id, tipo='saida', quantidade=1,
+                              valor_unitario=10.0, data=hoje - timedelta(days=dias_atras))
+                db.session.add(m)
+                ResumoService.acumular([m])
+            db.session.commit()
+
+            inicio = (hoje - timedelta(days=365)).date()
+            assert dict((t, v) for t, _, v, _ in ResumoService.totais_periodo(inicio, hoje.date())) == {'saida': 30.0}
+
+            # Alteração sem passar pelo serviço: os dias fechados continuam do cache, hoje não
+            db.session.execute(db.text("UPDATE movimento_resumo_diario SET valor_total = valor_total + 100"))
+            db.session.commit()
+            assert ResumoService.totais_periodo(inicio, hoje.date())[0][2] == 130.0
+
+            # Movimento retroativo num dia fechado invalida o cache
+            m = Movimento(produto_id=produto.id, tipo='saida', quantidade=1,
+                          valor_unitario=10.0, data=hoje - timedelta(days=3))
+            db.session.add(m)
+            ResumoService.acumular([m])
+            db.session.commit()
+            assert ResumoService.totais_periodo(inicio, hoje.date())[0][2] == 340.0
+
+            # Hoje, fração do dia, é lido da tabela movimento (sem os +100 da projeção)
+            relatorio = RelatorioService.relatorio_movimentos(datetime.combine(inicio, datetime.min.time()), agora_utc())
+            assert relatorio['resumo']['total_saidas'] == 240.0
+            assert relatorio['resumo']['quantidade_movimentos'] == 4
+
+    def test_dia_fechado_pelo_relogio_utc(self, app, monkeypatch):
+        """Testa a virada do dia UTC: o dia corrente nunca vem do cache e só o anterior é retroativo"""
+        from datetime import date
+        from app.models import db, Produto, Movimento
+        from app.services import resumo_service
+        from app.services.resumo_service import ResumoService
+
+        hoje, ontem = date(2031, 3, 2), date(2031, 3, 1)
+        monkeypatch.setattr(resumo_service, 'hoje_utc', lambda: hoje)
+
+        with app.app_context():
+            produto = Produto(nome='Produto Virada', qtd=100, valor_compra=5.0, valor_venda=10.0)
+            db.session.add(produto)
+            db.session.commit()
+
+            def vender(data):
+                m = Movimento(produto_id=produto.id, tipo='saida', quantidade=1, valor_unitario=10.0, data=data)
+                db.session.add(m)
+                ResumoService.acumular([m])
+                alterado = db.session.info.get('periodos_alterados', False)
+                db.session.commit()
+                return alterado
+
+            # 00:05 UTC de hoje não é retroativo; 23:55 de ontem é
+            assert not vender(datetime(2031, 3, 2, 0, 5))
+            assert vender(datetime(2031, 3, 1, 23, 55))
+            assert dict((t, v) for t, _, v, _ in ResumoService.totais_periodo(ontem, hoje)) == {'saida': 20.0}
+
+            # Mais uma venda hoje aparece na hora: o dia corrente não foi guardado como fechado
+            assert not vender(datetime(2031, 3, 2, 23, 59))
+            assert dict((t, v) for t, _, v, _ in ResumoService.totais_periodo(ontem, hoje)) == {'saida': 30.0}
+
+    def test_dashboard_snapshot(self, app, produto_teste, caixa_aberto, monkeypatch):
+        """Testa o snapshot do dashboard: um cálculo para leitores simultâneos e recálculo após escritas"""
+        import threading
+        import time
+        from app.services.caixa_service import CaixaService
+        from app.services.dashboard_service import DashboardService
+
+        calculos = []
+        original = RelatorioService.dashboard
+
+        def dashboard_lento():
+            calculos.append(1)
+            time.sleep(0.2)
+            return original()
+
+        monkeypatch.setattr(RelatorioService, 'dashboard', staticmethod(dashboard_lento))
+
+        resultados = []
+
+        def ler():
+            with app.app_context():
+                resultados.append(DashboardService.obter())
+
+        leitores = [threading.Thread(target=ler) for _ in range(5)]
+        for t in leitores:
+            t.start()
+        for t in leitores:
+            t.join()
+
+        assert len(calculos) == 1
+        assert all(r is resultados[0] for r in resultados)
+        assert resultados[0]['estoque_critico'] == []
+
+        with app.app_context():
+            # Snapshot válido: servido sem recalcular
+            assert DashboardService.obter() is resultados[0]
+
+            # Depois de uma escrita o leitor recebe o snapshot anterior e o novo vem em segundo plano
+            CaixaService.registrar_venda(caixa_aberto, 50.0, 'dinheiro')
+            from app.models import db
+            db.session.commit()
+            estado = DashboardService._estado()
+            if estado.calculo:
+                estado.calculo.wait(5)
+            assert len(calculos) == 2
+            assert DashboardService.obter()['saldo_caixa'] == resultados[0]['saldo_caixa'] + 50.0
+
+            # Rajada de commits: o primeiro dispara o cálculo, os demais pedem uma única rodada a mais
+            antes = len(calculos)
+            for _ in range(10):
+                CaixaService.registrar_venda(caixa_aberto, 1.0, 'dinheiro')
+                db.session.commit()
+            while (evento := estado.calculo) is not None:
+                evento.wait(5)
+            assert 1 <= len(calculos) - antes <= 2
+            assert DashboardService.obter()['saldo_caixa'] == resultados[0]['saldo_caixa'] + 60.0
+
     def test_relatorio_estoque(self, app, produto_teste):
         """Testa relatório de estoque"""
         with app.app_context():
@@ -115,7 +374,67 @@ class TestRelatorioService:
             assert 'total_produtos' in resumo
             assert 'valor_total_estoque' in resumo
             assert 'produtos_estoque_baixo' in resumo
-    
+
+    def test_relatorio_estoque_ordenado_e_paginado(self, app):
+        """Testa os totais agregados no banco e a tabela ordenada e paginada"""
+        with app.app_context():
+            from app.models import db, Produto
+
+            db.session.add_all([
+                Produto(nome='Caro', qtd=10, valor_compra=100.0, valor_venda=110.0, estoque_minimo=5),
+                Produto(nome='Margem', qtd=1, valor_compra=10.0, valor_venda=30.0, estoque_minimo=2),
+                Produto(nome='Folgado', qtd=40, valor_compra=1.0, valor_venda=1.5, estoque_minimo=2),
+                Produto(nome='Inativo', qtd=999, valor_compra=999.0, valor_venda=999.0, ativo=False),
+            ])
+            db.session.commit()
+
+            relatorio = RelatorioService.relatorio_estoque(por_pagina=2)
+            assert relatorio['resumo'] == {
+                'total_produtos': 3,
+                'valor_total_estoque': 1000.0 + 10.0 + 40.0,
+                'valor_total_venda': 1100.0 + 30.0 + 60.0,
+                'lucro_potencial': 1190.0 - 1050.0,
+                'produtos_estoque_baixo': 1
+            }
+            assert [p['nome'] for p in relatorio['produtos']] == ['Caro', 'Folgado']
+            assert relatorio['paginacao']['paginas'] == 2
+
+            segunda = RelatorioService.relatorio_estoque(pagina=2, por_pagina=2)
+            assert [p['nome'] for p in segunda['produtos']] == ['Margem']
+
+            margem = RelatorioService.relatorio_estoque(ordem='margem')
+            assert [p['nome'] for p in margem['produtos']] == ['Margem', 'Folgado', 'Caro']
+
+            cobertura = RelatorioService.relatorio_estoque(ordem='cobertura')
+            assert [p['nome'] for p in cobertura['produtos']] == ['Margem', 'Caro', 'Folgado']
+
+            with pytest.raises(ValueError):
+                RelatorioService.relatorio_estoque(ordem='nome')
+
+            # Os totais ficam em cache até o próximo commit que altere produtos
+            Produto.query.filter_by(nome='Folgado').one().qtd = 0
+            db.session.commit()
+            assert RelatorioService.resumo_estoque()['produtos_estoque_baixo'] == 2
+
+    def test_estoque_baixo_mesmo_predicado(self, app):
+        """Testa que resumo, dashboard e listagem contam o estoque baixo pela mesma regra (nulos como zero)"""
+        with app.app_context():
+            from app.models import db, Produto
+            from app.services import ProdutoService
+
+            sem_minimo = Produto(nome='Sem Mínimo', qtd=0, valor_compra=1.0, valor_venda=2.0, estoque_minimo=None)
+            db.session.add_all([
+                sem_minimo,
+                Produto(nome='Baixo Inativo', qtd=0, valor_compra=1.0, valor_venda=2.0, ativo=False),
+            ])
+            db.session.commit()
+
+            baixos = ProdutoService.produtos_estoque_baixo()
+            assert sem_minimo.id in {p.id for p in baixos}
+            assert all(p.ativo for p in baixos)
+            assert RelatorioService.resumo_estoque()['produtos_estoque_baixo'] == len(baixos)
+            assert RelatorioService.dashboard()['produtos_estoque_baixo'] == len(baixos)
+
     def test_relatorio_diario(self, app, produto_teste, movimento_teste):
         """Testa relatório diário"""
         with app.app_context():
@@ -282,6 +601,106 @@ class TestRelatorioService:
             assert produto_vendido['quantidade_vendida'] == 20
             assert produto_vendido['receita_total'] == 300.0
     
+    def test_relatorio_movimentos_resumo_agregado(self, app):
+        """Testa totais agregados no banco e paginação do detalhamento"""
+        with app.app_context():
+            from app.models import db, Produto, Movimento
+
+            produto = Produto(nome='Produto Resumo', valor_compra=10.0, valor_venda=15.0, qtd=100)
+            db.session.add(produto)
+            db.session.flush()
+
+            agora = datetime.utcnow()
+            for i in range(5):
+                db.session.add(Movimento(produto_id=produto.id, tipo='entrada', quantidade=4,
+                                         valor_unitario=10.0, data=agora - timedelta(minutes=i)))
+                db.session.add(Movimento(produto_id=produto.id, tipo='saida', quantidade=2,
+                                         valor_unitario=15.0, data=agora - timedelta(minutes=i)))
+            db.session.commit()
+
+            inicio = agora - timedelta(hours=1)
+            relatorio = RelatorioService.relatorio_movimentos(inicio, agora, pagina=2, por_pagina=4)
+
+            assert relatorio['total_entradas'] == 200.0
+            assert relatorio['total_saidas'] == 150.0
+            assert relatorio['lucro'] == -50.0
+            assert relatorio['quantidade_entradas'] == 20
+            assert relatorio['quantidade_saidas'] == 10
+            assert relatorio['resumo']['quantidade_movimentos'] == 10
+
+            assert len(relatorio['movimentos']) == 4
+            assert relatorio['movimentos'][0]['produto_nome'] == 'Produto Resumo'
+            assert relatorio['paginacao'] == {'pagina': 2, 'por_pagina': 4, 'total': 10, 'paginas': 3}
+
+    def test_relatorios_por_projecao(self, app, limite_consultas):
+        """Testa que os relatórios leem linhas projetadas: consultas constantes e nada no identity map"""
+        with app.app_context():
+            from app.models import db, Produto, Movimento
+            from app.services.movimento_service import MovimentoLinha
+
+            produtos = [Produto(nome=f'Projeção {i}', valor_compra=1.0, valor_venda=2.0, qtd=10) for i in range(30)]
+            db.session.add_all(produtos)
+            db.session.flush()
+            nomes = {p.nome for p in produtos}
+            agora = datetime.utcnow()
+            db.session.add_all([
+                Movimento(produto_id=p.id, tipo='saida', quantidade=1, valor_unitario=2.0, data=agora)
+                for p in produtos
+            ])
+            db.session.commit()
+            db.session.expunge_all()
+
+            with limite_consultas(3):
+                linhas = RelatorioService.listar_movimentos_periodo(agora - timedelta(minutes=1), agora)
+            assert len(linhas) >= 30
+            assert all(isinstance(m, MovimentoLinha) for m in linhas)
+            assert {m.produto_nome for m in linhas} >= nomes
+
+            with limite_consultas(6):
+                fluxo = RelatorioService.relatorio_fluxo_diario()
+            assert len(fluxo['movimentos_estoque']) >= 30
+            assert all(m['produto_nome'] for m in fluxo['movimentos_estoque'])
+            assert not any(isinstance(obj, Movimento) for obj in db.session.identity_map.values())
+
+    def test_resumo_diario_mantido_na_escrita(self, app):
+        """Testa a projeção diária atualizada pelo MovimentoService e a reconstrução"""
+        with app.app_context():
+            from app.models import db, Produto, MovimentoResumoDiario
+            from app.services.movimento_service import MovimentoService
+            from app.services.resumo_service import ResumoService
+
+            produto = Produto(nome='Produto Resumo Diario', valor_compra=10.0, valor_venda=15.0, qtd=100)
+            db.session.add(produto)
+            db.session.commit()
+
+            MovimentoService.registrar_entrada(produto.id, 10, 10.0, 'Compra')
+            MovimentoService.registrar_saida(produto.id, 3, 15.0, 'Venda 1')
+            MovimentoService.registrar_saida(produto.id, 2, 15.0, 'Venda 2')
+            db.session.commit()
+
+            saida = MovimentoResumoDiario.query.filter_by(produto_id=produto.id, tipo='saida').one()
+            assert saida.quantidade == 5
+            assert saida.valor_total == 75.0
+            assert saida.registros == 2
+
+            dashboard = RelatorioService.dashboard()
+            assert dashboard['vendas_hoje'] == 75.0
+            assert dashboard['compras_hoje'] == 100.0
+            assert dashboard['produtos_mais_vendidos'][0] == {'nome': 'Produto Resumo Diario', 'quantidade': 5}
+
+            # Dias inteiros lidos da projeção devem bater com a agregação crua
+            hoje = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            relatorio = RelatorioService.relatorio_movimentos(hoje - timedelta(days=2), hoje + timedelta(days=1))
+            assert relatorio['total_saidas'] == 75.0
+            assert relatorio['total_entradas'] == 100.0
+            assert relatorio['resumo']['quantidade_movimentos'] == 3
+
+            MovimentoResumoDiario.query.delete()
+            db.session.commit()
+            assert ResumoService.reconstruir() == 2
+            saida = MovimentoResumoDiario.query.filter_by(produto_id=produto.id, tipo='saida').one()
+            assert (saida.quantidade, saida.valor_total, saida.registros) == (5, 75.0, 2)
+
     def test_relatorio_com_dados_vazios(self, app):
         """Testa relatórios com dados vazios"""
         with app.app_context():